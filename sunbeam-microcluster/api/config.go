@@ -2,8 +2,10 @@ package api
 
 import (
 	"bytes"
+	"fmt"
 	"net/http"
 	"net/url"
+	"strconv"
 
 	"github.com/canonical/lxd/lxd/response"
 	"github.com/canonical/lxd/shared/api"
@@ -14,6 +16,18 @@ import (
 	"github.com/openstack-snaps/snap-openstack/sunbeam-microcluster/sunbeam"
 )
 
+const (
+	defaultConfigPageSize = 100
+	maxConfigPageSize     = 1000
+)
+
+// /1.0/config endpoint.
+var configListCmd = rest.Endpoint{
+	Path: "config",
+
+	Get: rest.EndpointAction{Handler: cmdConfigList, ProxyTarget: true},
+}
+
 // /1.0/config/<name> endpoint.
 var configCmd = rest.Endpoint{
 	Path: "config/{key}",
@@ -23,13 +37,39 @@ var configCmd = rest.Endpoint{
 	Delete: rest.EndpointAction{Handler: cmdConfigDelete, ProxyTarget: true},
 }
 
+func cmdConfigList(s *state.State, r *http.Request) response.Response {
+	query := r.URL.Query()
+	prefix := query.Get("prefix")
+	after := query.Get("after")
+	withValues := query.Get("values") == "true"
+
+	limit := defaultConfigPageSize
+	if query.Has("limit") {
+		var err error
+		limit, err = strconv.Atoi(query.Get("limit"))
+		if err != nil || limit <= 0 {
+			return response.BadRequest(fmt.Errorf("Invalid limit %q", query.Get("limit")))
+		}
+	}
+	if limit > maxConfigPageSize {
+		limit = maxConfigPageSize
+	}
+
+	page, err := sunbeam.ListConfig(s, prefix, after, limit, withValues)
+	if err != nil {
+		return response.InternalError(err)
+	}
+
+	return response.SyncResponse(true, page)
+}
+
 func cmdConfigGet(s *state.State, r *http.Request) response.Response {
 	var key string
 	key, err := url.PathUnescape(mux.Vars(r)["key"])
 	if err != nil {
 		return response.InternalError(err)
 	}
-	config, err := sunbeam.GetConfig(s, key)
+	config, revision, err := sunbeam.GetConfigWithRevision(s, key)
 	if err != nil {
 		if err, ok := err.(api.StatusError); ok {
 			if err.Status() == http.StatusNotFound {
@@ -39,7 +79,7 @@ func cmdConfigGet(s *state.State, r *http.Request) response.Response {
 		return response.InternalError(err)
 	}
 
-	return response.SyncResponse(true, config)
+	return response.SyncResponseHeaders(true, config, map[string]string{"ETag": revisionETag(revision)})
 }
 
 func cmdConfigPut(s *state.State, r *http.Request) response.Response {
@@ -54,12 +94,41 @@ func cmdConfigPut(s *state.State, r *http.Request) response.Response {
 		return response.InternalError(err)
 	}
 
-	err = sunbeam.UpdateConfig(s, key, body.String())
+	// If-Match only writes over the given revision of the item, and
+	// If-None-Match: * only creates it, otherwise the item is overwritten
+	ifMatch := r.Header.Get("If-Match")
+	ifNoneMatch := r.Header.Get("If-None-Match")
+	if ifMatch == "" && ifNoneMatch == "" {
+		err = sunbeam.UpdateConfig(s, key, body.String())
+		if err != nil {
+			return response.InternalError(err)
+		}
+
+		return response.EmptySyncResponse
+	}
+
+	var revision *int64
+	if ifMatch != "" {
+		revisions := etagRevisions(ifMatch)
+		if len(revisions) != 1 {
+			return response.BadRequest(fmt.Errorf("Invalid If-Match %q", ifMatch))
+		}
+		revision = &revisions[0]
+	} else if ifNoneMatch != "*" {
+		return response.BadRequest(fmt.Errorf("Invalid If-None-Match %q", ifNoneMatch))
+	}
+
+	newRevision, err := sunbeam.UpdateConfigIfRevision(s, key, body.String(), revision)
 	if err != nil {
+		if err, ok := err.(api.StatusError); ok {
+			if err.Status() == http.StatusPreconditionFailed {
+				return response.ErrorResponse(http.StatusPreconditionFailed, err.Error())
+			}
+		}
 		return response.InternalError(err)
 	}
 
-	return response.EmptySyncResponse
+	return response.SyncResponseHeaders(true, nil, map[string]string{"ETag": revisionETag(newRevision)})
 }
 
 func cmdConfigDelete(s *state.State, r *http.Request) response.Response {
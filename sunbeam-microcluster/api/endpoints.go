@@ -10,12 +10,17 @@ import (
 var Endpoints = []rest.Endpoint{
 	nodesCmd,
 	nodeCmd,
+	nodeCountsCmd,
+	summaryCmd,
 	terraformStateListCmd,
 	terraformStateCmd,
 	terraformLockListCmd,
 	terraformLockCmd,
 	terraformUnlockCmd,
+	terraformLeaseCmd,
 	jujuusersCmd,
 	jujuuserCmd,
+	configListCmd,
 	configCmd,
+	watchConfigCmd,
 }
@@ -2,6 +2,7 @@ package api
 
 import (
 	"encoding/json"
+	"fmt"
 	"net/http"
 	"net/url"
 
@@ -23,6 +24,13 @@ var nodesCmd = rest.Endpoint{
 	Post: rest.EndpointAction{Handler: cmdNodesPost, ProxyTarget: true},
 }
 
+// /1.0/nodecounts endpoint.
+var nodeCountsCmd = rest.Endpoint{
+	Path: "nodecounts",
+
+	Get: rest.EndpointAction{Handler: cmdNodeCountsGet, ProxyTarget: true},
+}
+
 // /1.0/nodes/<name> endpoint.
 var nodeCmd = rest.Endpoint{
 	Path: "nodes/{name}",
@@ -34,8 +42,12 @@ var nodeCmd = rest.Endpoint{
 
 func cmdNodesGetAll(s *state.State, r *http.Request) response.Response {
 	roles := r.URL.Query()["role"]
+	matchAny, err := roleMatchAny(r)
+	if err != nil {
+		return response.BadRequest(err)
+	}
 
-	nodes, err := sunbeam.ListNodes(s, roles)
+	nodes, err := sunbeam.ListNodes(s, roles, matchAny)
 	if err != nil {
 		return response.InternalError(err)
 	}
@@ -43,6 +55,34 @@ func cmdNodesGetAll(s *state.State, r *http.Request) response.Response {
 	return response.SyncResponse(true, nodes)
 }
 
+func cmdNodeCountsGet(s *state.State, r *http.Request) response.Response {
+	roles := r.URL.Query()["role"]
+	matchAny, err := roleMatchAny(r)
+	if err != nil {
+		return response.BadRequest(err)
+	}
+
+	counts, err := sunbeam.CountNodes(s, roles, matchAny)
+	if err != nil {
+		return response.InternalError(err)
+	}
+
+	return response.SyncResponse(true, counts)
+}
+
+// roleMatchAny reads the match query parameter: "all" (default) selects
+// nodes having every given role, "any" nodes having at least one.
+func roleMatchAny(r *http.Request) (bool, error) {
+	switch match := r.URL.Query().Get("match"); match {
+	case "", "all":
+		return false, nil
+	case "any":
+		return true, nil
+	default:
+		return false, fmt.Errorf("Invalid match %q, expected all or any", match)
+	}
+}
+
 func cmdNodesGet(s *state.State, r *http.Request) response.Response {
 	var name string
 	name, err := url.PathUnescape(mux.Vars(r)["name"])
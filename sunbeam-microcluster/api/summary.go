@@ -0,0 +1,27 @@
+package api
+
+import (
+	"net/http"
+
+	"github.com/canonical/lxd/lxd/response"
+	"github.com/canonical/microcluster/rest"
+	"github.com/canonical/microcluster/state"
+
+	"github.com/openstack-snaps/snap-openstack/sunbeam-microcluster/sunbeam"
+)
+
+// /1.0/summary endpoint.
+var summaryCmd = rest.Endpoint{
+	Path: "summary",
+
+	Get: rest.EndpointAction{Handler: cmdSummaryGet, ProxyTarget: true},
+}
+
+func cmdSummaryGet(s *state.State, _ *http.Request) response.Response {
+	summary, err := sunbeam.GetClusterSummary(s)
+	if err != nil {
+		return response.InternalError(err)
+	}
+
+	return response.SyncResponse(true, summary)
+}
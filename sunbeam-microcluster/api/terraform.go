@@ -3,8 +3,12 @@ package api
 import (
 	"bytes"
 	"encoding/json"
+	"fmt"
+	"io"
 	"net/http"
 	"net/url"
+	"strconv"
+	"strings"
 
 	"github.com/canonical/lxd/lxd/response"
 	"github.com/canonical/lxd/lxd/util"
@@ -56,6 +60,15 @@ var terraformLockCmd = rest.Endpoint{
 	Put: rest.EndpointAction{Handler: cmdLockPut, AllowUntrusted: true},
 }
 
+// /1.0/terraformlease/{name} endpoint.
+// Renews the lease on a terraform lock, used by sunbeam while terraform
+// runs, so not exposed to untrusted clients.
+var terraformLeaseCmd = rest.Endpoint{
+	Path: "terraformlease/{name}",
+
+	Put: rest.EndpointAction{Handler: cmdLeasePut, ProxyTarget: true},
+}
+
 // /1.0/terraformunlock/{name} endpoint.
 var terraformUnlockCmd = rest.Endpoint{
 	Path: "terraformunlock/{name}",
@@ -81,7 +94,7 @@ func cmdStateGet(s *state.State, r *http.Request) response.Response {
 		return response.InternalError(err)
 	}
 
-	state, err := sunbeam.GetTerraformState(s, name)
+	state, revision, modified, err := sunbeam.GetTerraformStateIfModified(s, name, etagRevisions(r.Header.Get("If-None-Match")))
 	if err != nil {
 		if err, ok := err.(api.StatusError); ok {
 			if err.Status() == http.StatusNotFound {
@@ -91,16 +104,20 @@ func cmdStateGet(s *state.State, r *http.Request) response.Response {
 		return response.InternalError(err)
 	}
 
-	var jsonState map[string]interface{}
-	err = json.Unmarshal([]byte(state), &jsonState)
-	if err != nil {
-		return response.InternalError(err)
-	}
-
 	// Just send state data instead of SyncResponse Json object as
-	// terraform expects just state data.
+	// terraform expects just state data. The state is stored as sent by
+	// terraform, pass it through as is.
 	return response.ManualResponse(func(w http.ResponseWriter) error {
-		return util.WriteJSON(w, jsonState, nil)
+		w.Header().Set("ETag", revisionETag(revision))
+		if !modified {
+			w.WriteHeader(http.StatusNotModified)
+			return nil
+		}
+
+		w.Header().Set("Content-Type", "application/json")
+		w.Header().Set("Content-Length", strconv.Itoa(len(state)))
+		_, err := io.WriteString(w, state)
+		return err
 	})
 }
 
@@ -114,13 +131,21 @@ func cmdStatePut(s *state.State, r *http.Request) response.Response {
 
 	lockID := r.URL.Query().Get("ID")
 
-	var body bytes.Buffer
-	_, err = body.ReadFrom(r.Body)
+	var body strings.Builder
+	if r.ContentLength > 0 {
+		body.Grow(int(r.ContentLength))
+	}
+	_, err = io.Copy(&body, r.Body)
 	if err != nil {
 		return response.InternalError(err)
 	}
 
-	dbLock, err := sunbeam.UpdateTerraformState(s, name, lockID, body.String())
+	// Terraform sends valid JSON, only check when asked to
+	if r.URL.Query().Get("validate") == "true" && !json.Valid([]byte(body.String())) {
+		return response.BadRequest(fmt.Errorf("Invalid JSON in state of %q", name))
+	}
+
+	dbLock, revision, err := sunbeam.UpdateTerraformState(s, name, lockID, body.String())
 	if err != nil {
 		if err, ok := err.(api.StatusError); ok {
 			if err.Status() == http.StatusConflict {
@@ -138,7 +163,26 @@ func cmdStatePut(s *state.State, r *http.Request) response.Response {
 		return response.InternalError(err)
 	}
 
-	return response.EmptySyncResponse
+	return response.SyncResponseHeaders(true, nil, map[string]string{"ETag": revisionETag(revision)})
+}
+
+// revisionETag returns the entity tag of a terraform state or config item at revision
+func revisionETag(revision int64) string {
+	return fmt.Sprintf("%q", strconv.FormatInt(revision, 10))
+}
+
+// etagRevisions returns the revisions listed in an If-Match or If-None-Match header
+func etagRevisions(header string) []int64 {
+	revisions := []int64{}
+	for _, tag := range strings.Split(header, ",") {
+		tag = strings.Trim(strings.TrimPrefix(strings.TrimSpace(tag), "W/"), `"`)
+		revision, err := strconv.ParseInt(tag, 10, 64)
+		if err == nil {
+			revisions = append(revisions, revision)
+		}
+	}
+
+	return revisions
 }
 
 func cmdStateDelete(s *state.State, r *http.Request) response.Response {
@@ -269,3 +313,36 @@ func cmdUnlockPut(s *state.State, r *http.Request) response.Response {
 
 	return response.EmptySyncResponse
 }
+
+func cmdLeasePut(s *state.State, r *http.Request) response.Response {
+	var name string
+
+	name, err := url.PathUnescape(mux.Vars(r)["name"])
+	if err != nil {
+		return response.InternalError(err)
+	}
+
+	var body bytes.Buffer
+	_, err = body.ReadFrom(r.Body)
+	if err != nil {
+		return response.InternalError(err)
+	}
+
+	dbLock, err := sunbeam.RenewTerraformLock(s, name, body.String())
+	if err != nil {
+		if err, ok := err.(api.StatusError); ok {
+			if err.Status() == http.StatusNotFound {
+				return response.NotFound(err)
+			}
+			if err.Status() == http.StatusConflict {
+				return response.ManualResponse(func(w http.ResponseWriter) error {
+					w.WriteHeader(http.StatusConflict)
+					return util.WriteJSON(w, dbLock, nil)
+				})
+			}
+		}
+		return response.InternalError(err)
+	}
+
+	return response.SyncResponse(true, dbLock)
+}
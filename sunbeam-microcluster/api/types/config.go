@@ -0,0 +1,20 @@
+// Package types provides shared types and structs.
+package types
+
+// ConfigRevision holds the revision of a config item or prefix
+type ConfigRevision struct {
+	Revision int64 `json:"revision" yaml:"revision"`
+}
+
+// ConfigItem holds a config key, and its value when requested
+type ConfigItem struct {
+	Key   string  `json:"key" yaml:"key"`
+	Value *string `json:"value,omitempty" yaml:"value,omitempty"`
+}
+
+// ConfigPage holds a page of config items in key order, and the cursor to
+// pass as after to get the next page, empty on the last page
+type ConfigPage struct {
+	Items []ConfigItem `json:"items" yaml:"items"`
+	Next  string       `json:"next" yaml:"next"`
+}
@@ -10,3 +10,10 @@ type Node struct {
 	Role      []string `json:"role" yaml:"role"`
 	MachineID int      `json:"machineid" yaml:"machineid"`
 }
+
+// NodeCounts holds the number of nodes per role and the number of nodes
+// matching a role filter
+type NodeCounts struct {
+	Roles map[string]int `json:"roles" yaml:"roles"`
+	Nodes int            `json:"nodes" yaml:"nodes"`
+}
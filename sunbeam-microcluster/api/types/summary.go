@@ -0,0 +1,17 @@
+// Package types provides shared types and structs.
+package types
+
+// ClusterSummary holds the cluster members and the number of nodes per role
+type ClusterSummary struct {
+	Members []ClusterMember `json:"members" yaml:"members"`
+	Roles   map[string]int  `json:"roles" yaml:"roles"`
+}
+
+// ClusterMember structure to hold a member with its status, role and machine id
+type ClusterMember struct {
+	Name      string   `json:"name" yaml:"name"`
+	Address   string   `json:"address" yaml:"address"`
+	Status    string   `json:"status" yaml:"status"`
+	Role      []string `json:"role" yaml:"role"`
+	MachineID int      `json:"machineid" yaml:"machineid"`
+}
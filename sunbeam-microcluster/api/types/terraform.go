@@ -14,4 +14,7 @@ type Lock struct {
 	Version   string    `json:"Version" yaml:"Version"`
 	Created   time.Time `json:"Created" yaml:"Created"`
 	Path      string    `json:"Path" yaml:"Path"`
+	// Expires is set by clusterd: the lock can be taken over after it
+	// unless the lease is renewed.
+	Expires time.Time `json:"Expires" yaml:"Expires"`
 }
@@ -0,0 +1,66 @@
+package api
+
+import (
+	"fmt"
+	"net/http"
+	"strconv"
+	"time"
+
+	"github.com/canonical/lxd/lxd/response"
+	"github.com/canonical/microcluster/rest"
+	"github.com/canonical/microcluster/state"
+
+	"github.com/openstack-snaps/snap-openstack/sunbeam-microcluster/api/types"
+	"github.com/openstack-snaps/snap-openstack/sunbeam-microcluster/sunbeam"
+)
+
+const (
+	defaultWatchTimeout = 30 * time.Second
+	maxWatchTimeout     = 5 * time.Minute
+)
+
+// /1.0/watch/config endpoint.
+// Long-polls until the config item named by key, or every config item
+// starting with key when prefix is set, changes after revision.
+var watchConfigCmd = rest.Endpoint{
+	Path: "watch/config",
+
+	Get: rest.EndpointAction{Handler: cmdWatchConfigGet, ProxyTarget: true},
+}
+
+func cmdWatchConfigGet(s *state.State, r *http.Request) response.Response {
+	query := r.URL.Query()
+	key := query.Get("key")
+	prefix := query.Get("prefix") == "true"
+	if key == "" && !prefix {
+		return response.BadRequest(fmt.Errorf("key is required unless watching a prefix"))
+	}
+
+	var revision int64
+	var err error
+	if query.Has("revision") {
+		revision, err = strconv.ParseInt(query.Get("revision"), 10, 64)
+		if err != nil {
+			return response.BadRequest(fmt.Errorf("Invalid revision: %w", err))
+		}
+	}
+
+	timeout := defaultWatchTimeout
+	if query.Has("timeout") {
+		seconds, err := strconv.Atoi(query.Get("timeout"))
+		if err != nil || seconds < 0 {
+			return response.BadRequest(fmt.Errorf("Invalid timeout %q", query.Get("timeout")))
+		}
+		timeout = time.Duration(seconds) * time.Second
+	}
+	if timeout > maxWatchTimeout {
+		timeout = maxWatchTimeout
+	}
+
+	current, err := sunbeam.WatchConfig(r.Context(), s, key, prefix, revision, timeout)
+	if err != nil {
+		return response.InternalError(err)
+	}
+
+	return response.SyncResponse(true, types.ConfigRevision{Revision: current})
+}
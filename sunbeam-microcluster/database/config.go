@@ -3,11 +3,20 @@ package database
 import (
 	"context"
 	"database/sql"
+	"errors"
 	"fmt"
+	"net/http"
+	"strings"
 
 	"github.com/canonical/lxd/lxd/db/query"
+	"github.com/canonical/lxd/shared/api"
 )
 
+// maxConfigTombstones is how many deletions are remembered. Older tombstones
+// are pruned, a watcher only misses the deletion of a key if this many other
+// keys are deleted before it reads the revision again.
+const maxConfigTombstones = 1000
+
 //go:generate -command mapper lxd-generate db mapper -t config.mapper.go
 //go:generate mapper reset
 //
@@ -46,8 +55,9 @@ func GetConfigItemKeys(ctx context.Context, tx *sql.Tx, prefix *string) ([]strin
 	args := make([]any, 0)
 
 	if prefix != nil {
-		stmt += ` WHERE config.key LIKE ?`
-		args = append(args, *prefix+"%")
+		where, prefixArgs := configKeyFilter(*prefix, true)
+		stmt += where
+		args = append(args, prefixArgs...)
 	}
 
 	configs := make([]string, 0)
@@ -71,3 +81,181 @@ func GetConfigItemKeys(ctx context.Context, tx *sql.Tx, prefix *string) ([]strin
 
 	return configs, nil
 }
+
+// ListConfigItems returns up to limit ConfigItems whose key starts with prefix
+// and sorts after the key after, in key order. Values are only read if
+// withValues is set.
+func ListConfigItems(ctx context.Context, tx *sql.Tx, prefix string, after string, limit int, withValues bool) ([]ConfigItem, error) {
+	columns := "config.key"
+	if withValues {
+		columns += ", config.value"
+	}
+
+	where, args := configKeyFilter(prefix, true)
+	if after != "" {
+		where += " AND config.key > ?"
+		args = append(args, after)
+	}
+
+	stmt := fmt.Sprintf("SELECT %s FROM config%s ORDER BY config.key LIMIT ?", columns, where)
+	args = append(args, limit)
+
+	items := make([]ConfigItem, 0)
+
+	dest := func(scan func(dest ...any) error) error {
+		item := ConfigItem{}
+		var err error
+		if withValues {
+			err = scan(&item.Key, &item.Value)
+		} else {
+			err = scan(&item.Key)
+		}
+		if err != nil {
+			return err
+		}
+
+		items = append(items, item)
+
+		return nil
+	}
+
+	err := query.Scan(ctx, tx, stmt, dest, args...)
+	if err != nil {
+		return nil, fmt.Errorf("Failed to fetch from \"config\" table: %w", err)
+	}
+
+	return items, nil
+}
+
+// GetConfigItemRevision returns the revision of the last write of the
+// ConfigItem with the given key.
+func GetConfigItemRevision(ctx context.Context, tx *sql.Tx, key string) (int64, error) {
+	var revision int64
+	err := tx.QueryRowContext(ctx, "SELECT config.revision FROM config WHERE config.key = ?", key).Scan(&revision)
+	if errors.Is(err, sql.ErrNoRows) {
+		return 0, api.StatusErrorf(http.StatusNotFound, "ConfigItem not found")
+	}
+	if err != nil {
+		return 0, fmt.Errorf("Failed to fetch from \"config\" table: %w", err)
+	}
+
+	return revision, nil
+}
+
+// SetConfigItemRevision records a write of the ConfigItem with the given key
+// at a new config revision, and returns that revision.
+func SetConfigItemRevision(ctx context.Context, tx *sql.Tx, key string) (int64, error) {
+	revision, err := bumpConfigRevision(ctx, tx)
+	if err != nil {
+		return 0, err
+	}
+
+	_, err = tx.ExecContext(ctx, "UPDATE config SET revision = ? WHERE key = ?", revision, key)
+	if err != nil {
+		return 0, fmt.Errorf("Failed to update \"config\" table: %w", err)
+	}
+
+	_, err = tx.ExecContext(ctx, "DELETE FROM config_tombstones WHERE key = ?", key)
+	if err != nil {
+		return 0, fmt.Errorf("Failed to delete from \"config_tombstones\" table: %w", err)
+	}
+
+	return revision, nil
+}
+
+// RecordConfigItemDeletion records the deletion of the ConfigItem with the
+// given key at a new config revision, and returns that revision. Only the
+// latest maxConfigTombstones deletions are kept.
+func RecordConfigItemDeletion(ctx context.Context, tx *sql.Tx, key string) (int64, error) {
+	revision, err := bumpConfigRevision(ctx, tx)
+	if err != nil {
+		return 0, err
+	}
+
+	stmt := `
+INSERT INTO config_tombstones (key, revision) VALUES (?, ?)
+  ON CONFLICT (key) DO UPDATE SET revision = excluded.revision
+`
+	_, err = tx.ExecContext(ctx, stmt, key, revision)
+	if err != nil {
+		return 0, fmt.Errorf("Failed to insert into \"config_tombstones\" table: %w", err)
+	}
+
+	stmt = `
+DELETE FROM config_tombstones WHERE revision <= (
+  SELECT revision FROM config_tombstones ORDER BY revision DESC LIMIT 1 OFFSET ?
+)`
+	_, err = tx.ExecContext(ctx, stmt, maxConfigTombstones)
+	if err != nil {
+		return 0, fmt.Errorf("Failed to delete from \"config_tombstones\" table: %w", err)
+	}
+
+	return revision, nil
+}
+
+// GetConfigRevision returns the revision of the last write or deletion of the
+// ConfigItem with the given key, or of any ConfigItem whose key starts with it
+// if prefix is set. Keys never written have revision 0.
+func GetConfigRevision(ctx context.Context, tx *sql.Tx, key string, prefix bool) (int64, error) {
+	where, args := configKeyFilter(key, prefix)
+	stmt := fmt.Sprintf(`
+SELECT COALESCE(MAX(revision), 0) FROM (
+  SELECT config.revision FROM config%s
+  UNION ALL
+  SELECT config_tombstones.revision FROM config_tombstones%s
+)`, where, strings.ReplaceAll(where, "config.key", "config_tombstones.key"))
+
+	var revision int64
+	err := tx.QueryRowContext(ctx, stmt, append(args, args...)...).Scan(&revision)
+	if err != nil {
+		return 0, fmt.Errorf("Failed to fetch config revision: %w", err)
+	}
+
+	return revision, nil
+}
+
+// bumpConfigRevision increments the cluster wide config revision and returns it.
+func bumpConfigRevision(ctx context.Context, tx *sql.Tx) (int64, error) {
+	_, err := tx.ExecContext(ctx, "UPDATE config_revision SET revision = revision + 1 WHERE id = 0")
+	if err != nil {
+		return 0, fmt.Errorf("Failed to update \"config_revision\" table: %w", err)
+	}
+
+	var revision int64
+	err = tx.QueryRowContext(ctx, "SELECT revision FROM config_revision WHERE id = 0").Scan(&revision)
+	if err != nil {
+		return 0, fmt.Errorf("Failed to fetch from \"config_revision\" table: %w", err)
+	}
+
+	return revision, nil
+}
+
+// configKeyFilter returns a WHERE clause on config.key and its arguments,
+// matching key exactly or, if prefix is set, every key starting with it.
+// Prefixes are matched as a key range so the lookup uses the key index.
+func configKeyFilter(key string, prefix bool) (string, []any) {
+	if !prefix {
+		return " WHERE config.key = ?", []any{key}
+	}
+
+	upper, bounded := prefixUpperBound(key)
+	if !bounded {
+		return " WHERE config.key >= ?", []any{key}
+	}
+
+	return " WHERE config.key >= ? AND config.key < ?", []any{key, upper}
+}
+
+// prefixUpperBound returns the smallest string greater than every string
+// starting with prefix, if there is one.
+func prefixUpperBound(prefix string) (string, bool) {
+	b := []byte(prefix)
+	for i := len(b) - 1; i >= 0; i-- {
+		if b[i] < 0xff {
+			b[i]++
+			return string(b[:i+1]), true
+		}
+	}
+
+	return "", false
+}
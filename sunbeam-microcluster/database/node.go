@@ -6,6 +6,7 @@ import (
 	"fmt"
 	"strings"
 
+	"github.com/canonical/lxd/lxd/db/query"
 	"github.com/canonical/microcluster/cluster"
 )
 
@@ -47,8 +48,9 @@ type NodeFilter struct {
 	MachineID *int
 }
 
-// GetNodesFromRoles returns a slice of Nodes that match the given roles.
-func GetNodesFromRoles(ctx context.Context, tx *sql.Tx, roles []string) ([]Node, error) {
+// GetNodesFromRoles returns a slice of Nodes that have all the given roles,
+// or any of them if matchAny is set.
+func GetNodesFromRoles(ctx context.Context, tx *sql.Tx, roles []string, matchAny bool) ([]Node, error) {
 
 	stmt, err := cluster.StmtString(nodeObjects)
 
@@ -58,18 +60,8 @@ func GetNodesFromRoles(ctx context.Context, tx *sql.Tx, roles []string) ([]Node,
 
 	queryParts := strings.SplitN(stmt, "ORDER BY", 2)
 
-	args := make([]any, 0)
-
-	if len(roles) > 0 {
-		queryParts[0] += " WHERE"
-		for i, role := range roles {
-			if i > 0 {
-				queryParts[0] += " AND"
-			}
-			queryParts[0] += " instr(nodes.role, ?) > 0"
-			args = append(args, role)
-		}
-	}
+	where, args := nodeRolesFilter(roles, matchAny)
+	queryParts[0] += where
 
 	stmt = strings.Join(queryParts, " ORDER BY")
 
@@ -81,3 +73,117 @@ func GetNodesFromRoles(ctx context.Context, tx *sql.Tx, roles []string) ([]Node,
 	return nodes, nil
 
 }
+
+// CountNodesFromRoles returns the number of nodes that have all the given roles,
+// or any of them if matchAny is set.
+func CountNodesFromRoles(ctx context.Context, tx *sql.Tx, roles []string, matchAny bool) (int, error) {
+	where, args := nodeRolesFilter(roles, matchAny)
+
+	count := 0
+	dest := func(scan func(dest ...any) error) error {
+		return scan(&count)
+	}
+
+	err := query.Scan(ctx, tx, "SELECT COUNT(*) FROM nodes"+where, dest, args...)
+	if err != nil {
+		return 0, fmt.Errorf("Failed to count from \"nodes\" table: %w", err)
+	}
+
+	return count, nil
+}
+
+// CountNodeRoles returns the number of nodes holding each role.
+func CountNodeRoles(ctx context.Context, tx *sql.Tx) (map[string]int, error) {
+	stmt := `SELECT node_roles.role, COUNT(*) FROM node_roles GROUP BY node_roles.role`
+
+	counts := map[string]int{}
+
+	dest := func(scan func(dest ...any) error) error {
+		var role string
+		var count int
+		err := scan(&role, &count)
+		if err != nil {
+			return err
+		}
+
+		counts[role] = count
+
+		return nil
+	}
+
+	err := query.Scan(ctx, tx, stmt, dest)
+	if err != nil {
+		return nil, fmt.Errorf("Failed to fetch from \"node_roles\" table: %w", err)
+	}
+
+	return counts, nil
+}
+
+// SetNodeRoles replaces the roles recorded for the node with the given name.
+func SetNodeRoles(ctx context.Context, tx *sql.Tx, name string, roles []string) error {
+	id, err := GetNodeID(ctx, tx, name)
+	if err != nil {
+		return err
+	}
+
+	_, err = tx.ExecContext(ctx, "DELETE FROM node_roles WHERE node_id = ?", id)
+	if err != nil {
+		return fmt.Errorf("Failed to delete from \"node_roles\" table: %w", err)
+	}
+
+	for _, role := range uniqueRoles(roles) {
+		_, err = tx.ExecContext(ctx, "INSERT INTO node_roles (node_id, role) VALUES (?, ?)", id, role)
+		if err != nil {
+			return fmt.Errorf("Failed to insert into \"node_roles\" table: %w", err)
+		}
+	}
+
+	return nil
+}
+
+// DeleteNodeRoles deletes the roles recorded for the node with the given name.
+func DeleteNodeRoles(ctx context.Context, tx *sql.Tx, name string) error {
+	_, err := tx.ExecContext(ctx, "DELETE FROM node_roles WHERE node_id IN (SELECT id FROM nodes WHERE name = ?)", name)
+	if err != nil {
+		return fmt.Errorf("Failed to delete from \"node_roles\" table: %w", err)
+	}
+
+	return nil
+}
+
+// nodeRolesFilter returns a WHERE clause on nodes.id and its arguments, matching
+// nodes that have all the given roles, or any of them if matchAny is set.
+// The lookup goes through the node_roles index on role.
+func nodeRolesFilter(roles []string, matchAny bool) (string, []any) {
+	roles = uniqueRoles(roles)
+	if len(roles) == 0 {
+		return "", nil
+	}
+
+	args := make([]any, 0, len(roles)+1)
+	for _, role := range roles {
+		args = append(args, role)
+	}
+
+	where := " WHERE nodes.id IN (SELECT node_roles.node_id FROM node_roles WHERE node_roles.role IN " + query.Params(len(roles))
+	if !matchAny {
+		where += " GROUP BY node_roles.node_id HAVING COUNT(*) = ?"
+		args = append(args, len(roles))
+	}
+
+	return where + ") ", args
+}
+
+// uniqueRoles returns roles without duplicates, in their original order.
+func uniqueRoles(roles []string) []string {
+	seen := make(map[string]bool, len(roles))
+	unique := make([]string, 0, len(roles))
+	for _, role := range roles {
+		if !seen[role] {
+			seen[role] = true
+			unique = append(unique, role)
+		}
+	}
+
+	return unique
+}
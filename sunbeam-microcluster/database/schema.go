@@ -14,6 +14,8 @@ var SchemaExtensions = map[int]schema.Update{
 	1: NodesSchemaUpdate,
 	2: ConfigSchemaUpdate,
 	3: JujuUserSchemaUpdate,
+	4: NodeRolesSchemaUpdate,
+	5: ConfigRevisionSchemaUpdate,
 }
 
 // NodesSchemaUpdate is schema for table nodes
@@ -66,3 +68,50 @@ CREATE TABLE jujuuser (
 
 	return err
 }
+
+// NodeRolesSchemaUpdate is schema for table node_roles, one row per role of a node.
+// Roles of existing nodes are copied from the serialized nodes.role column.
+func NodeRolesSchemaUpdate(_ context.Context, tx *sql.Tx) error {
+	stmt := `
+CREATE TABLE node_roles (
+  id                            INTEGER  PRIMARY KEY AUTOINCREMENT NOT NULL,
+  node_id                       INTEGER  NOT  NULL,
+  role                          TEXT     NOT  NULL,
+  FOREIGN KEY (node_id) REFERENCES "nodes" (id) ON DELETE CASCADE
+  UNIQUE(node_id, role)
+);
+CREATE INDEX node_roles_role_node_id_idx ON node_roles (role, node_id);
+INSERT INTO node_roles (node_id, role)
+  SELECT nodes.id, json_each.value FROM nodes, json_each(nodes.role)
+  WHERE json_valid(nodes.role);
+  `
+
+	_, err := tx.Exec(stmt)
+
+	return err
+}
+
+// ConfigRevisionSchemaUpdate adds revisions to config items.
+// config_revision holds the cluster wide revision, bumped on every write or
+// deletion of a config item, config.revision the revision of the last write
+// of the item and config_tombstones the revision of the last deletion of a key.
+func ConfigRevisionSchemaUpdate(_ context.Context, tx *sql.Tx) error {
+	stmt := `
+ALTER TABLE config ADD COLUMN revision INTEGER NOT NULL DEFAULT 0;
+CREATE TABLE config_revision (
+  id                            INTEGER  PRIMARY KEY NOT NULL CHECK (id = 0),
+  revision                      INTEGER  NOT  NULL
+);
+INSERT INTO config_revision (id, revision) VALUES (0, 0);
+CREATE TABLE config_tombstones (
+  id                            INTEGER  PRIMARY KEY AUTOINCREMENT NOT NULL,
+  key                           TEXT     NOT  NULL,
+  revision                      INTEGER  NOT  NULL,
+  UNIQUE(key)
+);
+  `
+
+	_, err := tx.Exec(stmt)
+
+	return err
+}
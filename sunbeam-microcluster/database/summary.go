@@ -0,0 +1,49 @@
+package database
+
+import (
+	"context"
+	"database/sql"
+	"fmt"
+
+	"github.com/canonical/lxd/lxd/db/query"
+)
+
+// MemberNode is a cluster member along with the node information recorded for it.
+type MemberNode struct {
+	Name      string
+	Address   string
+	Role      sql.NullString
+	MachineID sql.NullInt64
+}
+
+// GetMemberNodes returns all cluster members joined with their nodes records.
+// Members without a nodes record yet have NULL Role and MachineID.
+func GetMemberNodes(ctx context.Context, tx *sql.Tx) ([]MemberNode, error) {
+	stmt := `
+SELECT internal_cluster_members.name, internal_cluster_members.address, nodes.role, nodes.machine_id
+  FROM internal_cluster_members
+  LEFT JOIN nodes ON nodes.name = internal_cluster_members.name
+  ORDER BY internal_cluster_members.name
+`
+
+	members := make([]MemberNode, 0)
+
+	dest := func(scan func(dest ...any) error) error {
+		m := MemberNode{}
+		err := scan(&m.Name, &m.Address, &m.Role, &m.MachineID)
+		if err != nil {
+			return err
+		}
+
+		members = append(members, m)
+
+		return nil
+	}
+
+	err := query.Scan(ctx, tx, stmt, dest)
+	if err != nil {
+		return nil, fmt.Errorf("Failed to fetch from \"internal_cluster_members\" table: %w", err)
+	}
+
+	return members, nil
+}
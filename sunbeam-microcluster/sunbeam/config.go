@@ -5,10 +5,13 @@ import (
 	"context"
 	"database/sql"
 	"fmt"
+	"net/http"
 	"strings"
 
+	"github.com/canonical/lxd/shared/api"
 	"github.com/canonical/microcluster/state"
 
+	"github.com/openstack-snaps/snap-openstack/sunbeam-microcluster/api/types"
 	"github.com/openstack-snaps/snap-openstack/sunbeam-microcluster/database"
 )
 
@@ -32,6 +35,29 @@ func GetConfig(s *state.State, key string) (string, error) {
 	return value, nil
 }
 
+// GetConfigWithRevision returns the value of the ConfigItem with the given key
+// and the revision of its last write
+func GetConfigWithRevision(s *state.State, key string) (string, int64, error) {
+	var value string
+	var revision int64
+
+	err := s.Database.Transaction(s.Context, func(ctx context.Context, tx *sql.Tx) error {
+		record, err := database.GetConfigItem(ctx, tx, key)
+		if err != nil {
+			return err
+		}
+		value = record.Value
+
+		revision, err = database.GetConfigItemRevision(ctx, tx, key)
+		return err
+	})
+	if err != nil {
+		return "", 0, err
+	}
+
+	return value, revision, nil
+}
+
 // GetConfigItemKeys returns the list of ConfigItem keys from the database
 func GetConfigItemKeys(s *state.State, prefix *string) ([]string, error) {
 	var keys []string
@@ -52,38 +78,135 @@ func GetConfigItemKeys(s *state.State, prefix *string) ([]string, error) {
 	return keys, nil
 }
 
+// ListConfig returns a page of at most limit ConfigItems whose key starts
+// with prefix, following the key after, with their values if withValues is set
+func ListConfig(s *state.State, prefix string, after string, limit int, withValues bool) (types.ConfigPage, error) {
+	page := types.ConfigPage{Items: []types.ConfigItem{}}
+
+	err := s.Database.Transaction(s.Context, func(ctx context.Context, tx *sql.Tx) error {
+		// One more than asked for tells whether there is a next page
+		records, err := database.ListConfigItems(ctx, tx, prefix, after, limit+1, withValues)
+		if err != nil {
+			return err
+		}
+
+		if len(records) > limit {
+			records = records[:limit]
+			page.Next = records[limit-1].Key
+		}
+
+		for _, record := range records {
+			item := types.ConfigItem{Key: record.Key}
+			if withValues {
+				value := record.Value
+				item.Value = &value
+			}
+			page.Items = append(page.Items, item)
+		}
+
+		return nil
+	})
+	if err != nil {
+		return types.ConfigPage{}, err
+	}
+
+	return page, nil
+}
+
 // CreateConfig adds a new ConfigItem to the database
 func CreateConfig(s *state.State, key string, value string) error {
 
-	return s.Database.Transaction(s.Context, func(ctx context.Context, tx *sql.Tx) error {
+	err := s.Database.Transaction(s.Context, func(ctx context.Context, tx *sql.Tx) error {
 		_, err := database.CreateConfigItem(ctx, tx, database.ConfigItem{Key: key, Value: value})
 		if err != nil {
 			return fmt.Errorf("Failed to record config item: %w", err)
 		}
-		return nil
+
+		_, err = database.SetConfigItemRevision(ctx, tx, key)
+		return err
 	})
+	if err != nil {
+		return err
+	}
+
+	configChanged.notify()
+	return nil
 }
 
 // UpdateConfig updates a ConfigItem in the database
 func UpdateConfig(s *state.State, key string, value string) error {
 	configItem := database.ConfigItem{Key: key, Value: value}
 
-	return s.Database.Transaction(s.Context, func(ctx context.Context, tx *sql.Tx) error {
-		err := database.UpdateConfigItem(ctx, tx, key, configItem)
-		if err != nil && strings.Contains(err.Error(), "ConfigItem not found") {
-			_, err = database.CreateConfigItem(ctx, tx, configItem)
+	err := s.Database.Transaction(s.Context, func(ctx context.Context, tx *sql.Tx) error {
+		_, err := updateConfigItem(ctx, tx, configItem)
+		return err
+	})
+	if err != nil {
+		return err
+	}
+
+	configChanged.notify()
+	return nil
+}
+
+// UpdateConfigIfRevision updates a ConfigItem in the database only if it has
+// not been written since revision, or, if revision is nil, creates it only if
+// it does not exist yet. It returns the new revision of the ConfigItem.
+func UpdateConfigIfRevision(s *state.State, key string, value string, revision *int64) (int64, error) {
+	configItem := database.ConfigItem{Key: key, Value: value}
+	var newRevision int64
+
+	err := s.Database.Transaction(s.Context, func(ctx context.Context, tx *sql.Tx) error {
+		current, err := database.GetConfigItemRevision(ctx, tx, key)
+		exists := err == nil
+		if err != nil && !api.StatusErrorCheck(err, http.StatusNotFound) {
+			return err
 		}
-		if err != nil {
-			return fmt.Errorf("Failed to record config item: %w", err)
+
+		if exists != (revision != nil) || (exists && current != *revision) {
+			return api.StatusErrorf(http.StatusPreconditionFailed, "ConfigItem revision mismatch")
 		}
 
-		return nil
+		newRevision, err = updateConfigItem(ctx, tx, configItem)
+		return err
 	})
+	if err != nil {
+		return 0, err
+	}
+
+	configChanged.notify()
+	return newRevision, nil
+}
+
+// updateConfigItem writes a ConfigItem within a transaction, creating it if missing,
+// and returns its new revision
+func updateConfigItem(ctx context.Context, tx *sql.Tx, configItem database.ConfigItem) (int64, error) {
+	err := database.UpdateConfigItem(ctx, tx, configItem.Key, configItem)
+	if err != nil && strings.Contains(err.Error(), "ConfigItem not found") {
+		_, err = database.CreateConfigItem(ctx, tx, configItem)
+	}
+	if err != nil {
+		return 0, fmt.Errorf("Failed to record config item: %w", err)
+	}
+
+	return database.SetConfigItemRevision(ctx, tx, configItem.Key)
 }
 
 // DeleteConfig deletes a ConfigItem from the database
 func DeleteConfig(s *state.State, key string) error {
-	return s.Database.Transaction(s.Context, func(ctx context.Context, tx *sql.Tx) error {
-		return database.DeleteConfigItem(ctx, tx, key)
+	err := s.Database.Transaction(s.Context, func(ctx context.Context, tx *sql.Tx) error {
+		err := database.DeleteConfigItem(ctx, tx, key)
+		if err != nil {
+			return err
+		}
+
+		_, err = database.RecordConfigItemDeletion(ctx, tx, key)
+		return err
 	})
+	if err != nil {
+		return err
+	}
+
+	configChanged.notify()
+	return nil
 }
@@ -14,12 +14,13 @@ import (
 )
 
 // ListNodes return all the nodes, filterable by role (Optional)
-func ListNodes(s *state.State, roles []string) (types.Nodes, error) {
+// Nodes must have all the roles, or any of them if matchAny is set.
+func ListNodes(s *state.State, roles []string, matchAny bool) (types.Nodes, error) {
 	nodes := types.Nodes{}
 
 	// Get the nodes from the database.
 	err := s.Database.Transaction(s.Context, func(ctx context.Context, tx *sql.Tx) error {
-		records, err := database.GetNodesFromRoles(ctx, tx, roles)
+		records, err := database.GetNodesFromRoles(ctx, tx, roles, matchAny)
 		if err != nil {
 			return fmt.Errorf("Failed to fetch nodes: %w", err)
 		}
@@ -45,6 +46,32 @@ func ListNodes(s *state.State, roles []string) (types.Nodes, error) {
 	return nodes, nil
 }
 
+// CountNodes returns the number of nodes per role along with the number of
+// nodes matching the role filter, read in a single transaction.
+func CountNodes(s *state.State, roles []string, matchAny bool) (types.NodeCounts, error) {
+	counts := types.NodeCounts{}
+
+	err := s.Database.Transaction(s.Context, func(ctx context.Context, tx *sql.Tx) error {
+		var err error
+		counts.Roles, err = database.CountNodeRoles(ctx, tx)
+		if err != nil {
+			return fmt.Errorf("Failed to count roles: %w", err)
+		}
+
+		counts.Nodes, err = database.CountNodesFromRoles(ctx, tx, roles, matchAny)
+		if err != nil {
+			return fmt.Errorf("Failed to count nodes: %w", err)
+		}
+
+		return nil
+	})
+	if err != nil {
+		return types.NodeCounts{}, err
+	}
+
+	return counts, nil
+}
+
 // GetNode returns a Node with the given name
 func GetNode(s *state.State, name string) (types.Node, error) {
 	node := types.Node{}
@@ -81,6 +108,11 @@ func AddNode(s *state.State, name string, role []string, machineid int) error {
 			return fmt.Errorf("Failed to record node: %w", err)
 		}
 
+		err = database.SetNodeRoles(ctx, tx, name, role)
+		if err != nil {
+			return fmt.Errorf("Failed to record node roles: %w", err)
+		}
+
 		return nil
 	})
 	if err != nil {
@@ -115,6 +147,13 @@ func UpdateNode(s *state.State, name string, role []string, machineid int) error
 			return fmt.Errorf("Failed to update record node: %w", err)
 		}
 
+		if role != nil {
+			err = database.SetNodeRoles(ctx, tx, name, role)
+			if err != nil {
+				return fmt.Errorf("Failed to update node roles: %w", err)
+			}
+		}
+
 		return nil
 	})
 	if err != nil {
@@ -128,7 +167,12 @@ func UpdateNode(s *state.State, name string, role []string, machineid int) error
 func DeleteNode(s *state.State, name string) error {
 	// Delete node from the database.
 	err := s.Database.Transaction(s.Context, func(ctx context.Context, tx *sql.Tx) error {
-		err := database.DeleteNode(ctx, tx, name)
+		err := database.DeleteNodeRoles(ctx, tx, name)
+		if err != nil {
+			return fmt.Errorf("Failed to delete node roles: %w", err)
+		}
+
+		err = database.DeleteNode(ctx, tx, name)
 		if err != nil {
 			return fmt.Errorf("Failed to delete node: %w", err)
 		}
@@ -0,0 +1,87 @@
+package sunbeam
+
+import (
+	"context"
+	"database/sql"
+	"fmt"
+
+	microTypes "github.com/canonical/microcluster/rest/types"
+	"github.com/canonical/microcluster/state"
+
+	"github.com/openstack-snaps/snap-openstack/sunbeam-microcluster/api/types"
+	"github.com/openstack-snaps/snap-openstack/sunbeam-microcluster/database"
+)
+
+// GetClusterSummary returns the cluster members with their status, roles and
+// machine IDs, along with the number of nodes per role. Members, roles and
+// machine IDs are read in a single transaction, member status is the one
+// reported by microcluster.
+func GetClusterSummary(s *state.State) (types.ClusterSummary, error) {
+	summary := types.ClusterSummary{Members: []types.ClusterMember{}}
+
+	statuses, err := memberStatuses(s)
+	if err != nil {
+		return types.ClusterSummary{}, err
+	}
+
+	err = s.Database.Transaction(s.Context, func(ctx context.Context, tx *sql.Tx) error {
+		records, err := database.GetMemberNodes(ctx, tx)
+		if err != nil {
+			return fmt.Errorf("Failed to fetch members: %w", err)
+		}
+
+		for _, record := range records {
+			member := types.ClusterMember{
+				Name:      record.Name,
+				Address:   record.Address,
+				Status:    statuses[record.Name],
+				Role:      []string{},
+				MachineID: int(record.MachineID.Int64),
+			}
+			if member.Status == "" {
+				// Joined after microcluster reported the member statuses.
+				member.Status = string(microTypes.MemberNotFound)
+			}
+			if record.Role.Valid {
+				member.Role, err = roleFromStr(record.Role.String)
+				if err != nil {
+					return err
+				}
+			}
+			summary.Members = append(summary.Members, member)
+		}
+
+		summary.Roles, err = database.CountNodeRoles(ctx, tx)
+		if err != nil {
+			return fmt.Errorf("Failed to count roles: %w", err)
+		}
+
+		return nil
+	})
+	if err != nil {
+		return types.ClusterSummary{}, err
+	}
+
+	return summary, nil
+}
+
+// memberStatuses returns the status microcluster reports for each cluster
+// member, by member name.
+func memberStatuses(s *state.State) (map[string]string, error) {
+	leader, err := s.Leader()
+	if err != nil {
+		return nil, fmt.Errorf("Failed to get a client for the leader: %w", err)
+	}
+
+	members, err := leader.GetClusterMembers(s.Context)
+	if err != nil {
+		return nil, fmt.Errorf("Failed to fetch cluster members: %w", err)
+	}
+
+	statuses := make(map[string]string, len(members))
+	for _, member := range members {
+		statuses[member.Name] = string(member.Status)
+	}
+
+	return statuses, nil
+}
@@ -1,19 +1,27 @@
 package sunbeam
 
 import (
+	"context"
+	"database/sql"
 	"encoding/json"
 	"net/http"
 	"strings"
+	"time"
 
 	"github.com/canonical/lxd/shared/api"
+	"github.com/canonical/lxd/shared/logger"
 	"github.com/canonical/microcluster/state"
 
 	"github.com/openstack-snaps/snap-openstack/sunbeam-microcluster/api/types"
+	"github.com/openstack-snaps/snap-openstack/sunbeam-microcluster/database"
 )
 
 const tfstatePrefix = "tfstate-"
 const tflockPrefix = "tflock-"
 
+// TerraformLockTTL is how long a terraform lock is held without renewal.
+const TerraformLockTTL = 5 * time.Minute
+
 // GetTerraformStates returns the list of terraform states from the database
 func GetTerraformStates(s *state.State) ([]string, error) {
 	prefix := tfstatePrefix
@@ -30,39 +38,71 @@ func GetTerraformStates(s *state.State) ([]string, error) {
 	return plans, nil
 }
 
-// GetTerraformState returns the terraform state from the database
-func GetTerraformState(s *state.State, name string) (string, error) {
+// GetTerraformStateIfModified returns the terraform state and its revision
+// from the database. If the revision is one of knownRevisions the state is
+// not read and modified is false.
+func GetTerraformStateIfModified(s *state.State, name string, knownRevisions []int64) (state string, revision int64, modified bool, err error) {
 	tfstateKey := tfstatePrefix + name
-	state, err := GetConfig(s, tfstateKey)
-	return state, err
+	err = s.Database.Transaction(s.Context, func(ctx context.Context, tx *sql.Tx) error {
+		revision, err = database.GetConfigRevision(ctx, tx, tfstateKey, false)
+		if err != nil {
+			return err
+		}
+
+		// A deleted state has the revision of its deletion, always newer
+		// than any revision it was served at. Revision 0 is shared by
+		// missing states and states not written since revisions exist.
+		for _, known := range knownRevisions {
+			if revision > 0 && known == revision {
+				return nil
+			}
+		}
+
+		record, err := database.GetConfigItem(ctx, tx, tfstateKey)
+		if err != nil {
+			return err
+		}
+
+		state = record.Value
+		modified = true
+		return nil
+	})
+
+	return state, revision, modified, err
 }
 
 // UpdateTerraformState updates the terraform state record in the database
-func UpdateTerraformState(s *state.State, name string, lockID string, state string) (types.Lock, error) {
+// if lockID holds the lock on the plan, and returns the new state revision.
+func UpdateTerraformState(s *state.State, name string, lockID string, state string) (types.Lock, int64, error) {
 	var dbLock types.Lock
+	var revision int64
 
 	tflockKey := tflockPrefix + name
-	lockInDb, err := GetConfig(s, tflockKey)
-	if err != nil {
-		return dbLock, err
-	}
+	tfstateKey := tfstatePrefix + name
+	err := s.Database.Transaction(s.Context, func(ctx context.Context, tx *sql.Tx) error {
+		record, err := database.GetConfigItem(ctx, tx, tflockKey)
+		if err != nil {
+			return err
+		}
 
-	err = json.Unmarshal([]byte(lockInDb), &dbLock)
-	if err != nil {
-		return dbLock, err
-	}
+		err = json.Unmarshal([]byte(record.Value), &dbLock)
+		if err != nil {
+			return err
+		}
 
-	if lockID != dbLock.ID {
-		return dbLock, api.StatusErrorf(http.StatusConflict, "Conflict in Lock ID")
-	}
+		if lockID != dbLock.ID {
+			return api.StatusErrorf(http.StatusConflict, "Conflict in Lock ID")
+		}
 
-	tfstateKey := tfstatePrefix + name
-	err = UpdateConfig(s, tfstateKey, state)
+		revision, err = updateConfigItem(ctx, tx, database.ConfigItem{Key: tfstateKey, Value: state})
+		return err
+	})
 	if err != nil {
-		return dbLock, err
+		return dbLock, 0, err
 	}
 
-	return dbLock, nil
+	configChanged.notify()
+	return dbLock, revision, nil
 }
 
 // DeleteTerraformState deletes the terraform state from the database
@@ -96,6 +136,8 @@ func GetTerraformLock(s *state.State, name string) (string, error) {
 }
 
 // UpdateTerraformLock updates the terraform lock record in the database
+// The lock is held for TerraformLockTTL unless renewed with RenewTerraformLock,
+// an expired lock is taken over by the next lock request.
 func UpdateTerraformLock(s *state.State, name string, lock string) (types.Lock, error) {
 	var reqLock types.Lock
 	var dbLock types.Lock
@@ -106,35 +148,106 @@ func UpdateTerraformLock(s *state.State, name string, lock string) (types.Lock,
 	}
 
 	tflockKey := tflockPrefix + name
-	lockInDb, err := GetConfig(s, tflockKey)
-	if err != nil {
-		if err, ok := err.(api.StatusError); ok {
-			// No Lock exists, add lock details in DB
-			if err.Status() == http.StatusNotFound {
-				j, err := json.Marshal(reqLock)
-				if err != nil {
-					return dbLock, err
-				}
+	err = s.Database.Transaction(s.Context, func(ctx context.Context, tx *sql.Tx) error {
+		now := time.Now().UTC()
+		record, err := database.GetConfigItem(ctx, tx, tflockKey)
+		if err == nil {
+			err = json.Unmarshal([]byte(record.Value), &dbLock)
+			if err != nil {
+				return err
+			}
+
+			// If the lock from DB and request are same, send http 423
+			if dbLock.ID == reqLock.ID && dbLock.Operation == reqLock.Operation && dbLock.Who == reqLock.Who {
+				return api.StatusErrorf(http.StatusLocked, "Already locked with same ID")
+			}
 
-				err = UpdateConfig(s, tflockKey, string(j))
-				return dbLock, err
+			// Already locked and request has different lockid, send http 409
+			if !lockExpired(dbLock, now) {
+				return api.StatusErrorf(http.StatusConflict, "Conflict in Lock ID")
 			}
+
+			logger.Warnf("Reclaiming lock %s on plan %s held by %s, expired at %s", dbLock.ID, name, dbLock.Who, lockExpiry(dbLock))
+		} else if !api.StatusErrorCheck(err, http.StatusNotFound) {
+			return err
 		}
+
+		// No live lock exists, add lock details in DB
+		reqLock.Expires = now.Add(TerraformLockTTL)
+		j, err := json.Marshal(reqLock)
+		if err != nil {
+			return err
+		}
+
+		_, err = updateConfigItem(ctx, tx, database.ConfigItem{Key: tflockKey, Value: string(j)})
+		return err
+	})
+	if err != nil {
 		return dbLock, err
 	}
 
-	err = json.Unmarshal([]byte(lockInDb), &dbLock)
+	configChanged.notify()
+	return dbLock, nil
+}
+
+// RenewTerraformLock extends the lease of the terraform lock by TerraformLockTTL
+// The lock in the request must hold the ID of the lock in the database.
+// Renewals do not change the config revision of the lock.
+func RenewTerraformLock(s *state.State, name string, lock string) (types.Lock, error) {
+	var reqLock types.Lock
+	var dbLock types.Lock
+
+	err := json.Unmarshal([]byte(lock), &reqLock)
 	if err != nil {
 		return dbLock, err
 	}
 
-	// If the lock from DB and request are same, send http 423
-	if dbLock.ID == reqLock.ID && dbLock.Operation == reqLock.Operation && dbLock.Who == reqLock.Who {
-		return dbLock, api.StatusErrorf(http.StatusLocked, "Already locked with same ID")
+	tflockKey := tflockPrefix + name
+	err = s.Database.Transaction(s.Context, func(ctx context.Context, tx *sql.Tx) error {
+		record, err := database.GetConfigItem(ctx, tx, tflockKey)
+		if err != nil {
+			return err
+		}
+
+		err = json.Unmarshal([]byte(record.Value), &dbLock)
+		if err != nil {
+			return err
+		}
+
+		// Renewing someone else's lock, or a lock already taken over, send http 409
+		if dbLock.ID != reqLock.ID {
+			return api.StatusErrorf(http.StatusConflict, "Conflict in Lock ID")
+		}
+
+		dbLock.Expires = time.Now().UTC().Add(TerraformLockTTL)
+		j, err := json.Marshal(dbLock)
+		if err != nil {
+			return err
+		}
+
+		// Keep the revision, watchers of the lock are not woken up by lease renewals
+		return database.UpdateConfigItem(ctx, tx, tflockKey, database.ConfigItem{Key: tflockKey, Value: string(j)})
+	})
+	if err != nil {
+		return dbLock, err
 	}
 
-	// Already locked and request has different lockid, send http 409
-	return dbLock, api.StatusErrorf(http.StatusConflict, "Conflict in Lock ID")
+	return dbLock, nil
+}
+
+// lockExpiry returns when the lease on lock ends
+func lockExpiry(lock types.Lock) time.Time {
+	if lock.Expires.IsZero() {
+		// Locks taken before leases were introduced
+		return lock.Created.Add(TerraformLockTTL)
+	}
+
+	return lock.Expires
+}
+
+// lockExpired returns whether the lease on lock ended before now
+func lockExpired(lock types.Lock, now time.Time) bool {
+	return now.After(lockExpiry(lock))
 }
 
 // DeleteTerraformLock deletes the terraform lock from the database
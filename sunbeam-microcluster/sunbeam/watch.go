@@ -0,0 +1,96 @@
+package sunbeam
+
+import (
+	"context"
+	"database/sql"
+	"sync"
+	"time"
+
+	"github.com/canonical/microcluster/state"
+
+	"github.com/openstack-snaps/snap-openstack/sunbeam-microcluster/database"
+)
+
+// watchPollInterval is how often watchers re-read the config revision when
+// not notified. Only writes made through other cluster members need it, so it
+// is a slow fallback.
+const watchPollInterval = 30 * time.Second
+
+// configChanged wakes up watchers when a config item is written or deleted
+// through this member.
+var configChanged = newNotifier()
+
+// notifier broadcasts a signal to every goroutine waiting on it.
+type notifier struct {
+	mu sync.Mutex
+	ch chan struct{}
+}
+
+func newNotifier() *notifier {
+	return &notifier{ch: make(chan struct{})}
+}
+
+// wait returns a channel closed on the next notify.
+func (n *notifier) wait() <-chan struct{} {
+	n.mu.Lock()
+	defer n.mu.Unlock()
+	return n.ch
+}
+
+func (n *notifier) notify() {
+	n.mu.Lock()
+	defer n.mu.Unlock()
+	close(n.ch)
+	n.ch = make(chan struct{})
+}
+
+// GetConfigRevision returns the revision of the last change to the ConfigItem
+// with the given key, or to any ConfigItem whose key starts with it if prefix is set.
+func GetConfigRevision(s *state.State, key string, prefix bool) (int64, error) {
+	var revision int64
+
+	err := s.Database.Transaction(s.Context, func(ctx context.Context, tx *sql.Tx) error {
+		var err error
+		revision, err = database.GetConfigRevision(ctx, tx, key, prefix)
+		return err
+	})
+	if err != nil {
+		return 0, err
+	}
+
+	return revision, nil
+}
+
+// WatchConfig blocks until the revision of key, or of the keys starting with
+// it if prefix is set, is greater than revision, or until timeout elapses.
+// It returns the current revision.
+func WatchConfig(ctx context.Context, s *state.State, key string, prefix bool, revision int64, timeout time.Duration) (int64, error) {
+	deadline := time.NewTimer(timeout)
+	defer deadline.Stop()
+
+	poll := time.NewTicker(watchPollInterval)
+	defer poll.Stop()
+
+	for {
+		// Subscribe before reading, so a change in between is not missed.
+		changed := configChanged.wait()
+
+		current, err := GetConfigRevision(s, key, prefix)
+		if err != nil {
+			return 0, err
+		}
+
+		if current > revision {
+			return current, nil
+		}
+
+		select {
+		case <-changed:
+		case <-poll.C:
+		case <-deadline.C:
+			return current, nil
+		case <-ctx.Done():
+			return current, ctx.Err()
+		}
+	}
+}
@@ -15,15 +15,29 @@
 
 import json
 import logging
-from typing import Any, List, Optional, Union
+from typing import Any, Iterator, List, Optional, Tuple, Union
 
 from requests import codes
-from requests.models import HTTPError
+from requests.models import HTTPError, Response
 
 from sunbeam.clusterd import service
 
 LOG = logging.getLogger(__name__)
 
+# Prefix of the config keys clusterd stores terraform states under
+TERRAFORM_STATE_PREFIX = "tfstate-"
+# Prefix of the config keys clusterd stores terraform locks under
+TERRAFORM_LOCK_PREFIX = "tflock-"
+# Seconds on top of the watch timeout before giving up on clusterd
+WATCH_GRACE = 10
+# Config items fetched per request when walking config keys
+CONFIG_PAGE_SIZE = 100
+
+
+def etag_revision(response: Response) -> int:
+    """Revision carried in the ETag of a clusterd response."""
+    return int(response.headers.get("ETag", '"0"').strip('"'))
+
 
 class MicroClusterService(service.BaseService):
     """Client for default MicroCluster Service API."""
@@ -164,32 +178,171 @@ class ExtendedAPIService(service.BaseService):
         """Update configuration in database, create if missing."""
         self._put(f"/1.0/config/{key}", data=value)
 
+    def get_config_with_revision(self, key: str) -> Tuple[Any, int]:
+        """Fetch configuration and the revision of its last write."""
+        response = self._response("get", f"/1.0/config/{key}", allow_redirects=True)
+        return response.json().get("metadata"), etag_revision(response)
+
+    def swap_config(self, key: str, value: Any, revision: Optional[int]) -> int:
+        """Update configuration only if it is still at revision.
+
+        A revision of None creates the configuration only if it is missing.
+        Returns the new revision.
+
+        :raises: ConfigItemConflictException if the configuration changed
+        """
+        if revision is None:
+            headers = {"If-None-Match": "*"}
+        else:
+            headers = {"If-Match": f'"{revision}"'}
+        response = self._response(
+            "put", f"/1.0/config/{key}", data=value, headers=headers
+        )
+        return etag_revision(response)
+
     def delete_config(self, key: str):
         """Remove configuration from database."""
         self._delete(f"/1.0/config/{key}")
 
-    def list_nodes_by_role(self, role: Union[str, List[str]]) -> list:
-        """List nodes by role."""
+    def iter_config(
+        self, prefix: str = "", values: bool = False, page_size: int = CONFIG_PAGE_SIZE
+    ) -> Iterator[dict]:
+        """Walk configuration keys starting with prefix, in key order.
+
+        Yields a dict with "key", and "value" if values, per item. Items
+        are fetched page_size at a time, each page following the last key
+        of the previous one, so only a page is held in memory.
+        """
+        params = {"prefix": prefix, "limit": page_size}
+        if values:
+            params["values"] = "true"
+        while True:
+            page = self._get("/1.0/config", params=params).get("metadata")
+            yield from page["items"]
+            if not page["next"]:
+                return
+            params = {**params, "after": page["next"]}
+
+    def get_config_revision(self, key: str, prefix: bool = False) -> int:
+        """Revision of the last change to key, or to any key starting with it.
+
+        Keys never written have revision 0.
+        """
+        return self._watch_config(key, prefix, revision=0, timeout=0)
+
+    def watch_config(
+        self, key: str, prefix: bool = False, revision: int = 0, timeout: int = 30
+    ) -> Iterator[int]:
+        """Watch configuration for changes.
+
+        Yields the revision of key, or of every key starting with key if
+        prefix, each time it moves past revision: straight away if it
+        already has. clusterd holds each request until a change or for
+        timeout seconds, the watch then goes on with a new request.
+        """
+        while True:
+            current = self._watch_config(key, prefix, revision, timeout)
+            if current > revision:
+                revision = current
+                yield revision
+
+    def _watch_config(self, key: str, prefix: bool, revision: int, timeout: int) -> int:
+        params = {"key": key, "revision": revision, "timeout": timeout}
+        if prefix:
+            params["prefix"] = "true"
+        result = self._get(
+            "/1.0/watch/config", params=params, timeout=timeout + WATCH_GRACE
+        )
+        return result.get("metadata", {}).get("revision", 0)
+
+    def list_nodes_by_role(
+        self, role: Union[str, List[str]], match_any: bool = False
+    ) -> list:
+        """List nodes by role.
+
+        Nodes must have all the given roles, or any of them if match_any.
+        """
         if isinstance(role, list):
             role = "&role=".join(role)
-        nodes = self._get(f"/1.0/nodes?role={role}")
+        match = "&match=any" if match_any else ""
+        nodes = self._get(f"/1.0/nodes?role={role}{match}")
         return nodes.get("metadata")
 
+    def count_nodes_by_role(
+        self, role: Union[str, List[str], None] = None, match_any: bool = False
+    ) -> dict:
+        """Count nodes per role.
+
+        Returns the number of nodes holding each role under "roles" and
+        the number of nodes matching role, all nodes if no role is given,
+        under "nodes".
+        """
+        roles = [role] if isinstance(role, str) else role or []
+        params = [f"role={r}" for r in roles]
+        if match_any:
+            params.append("match=any")
+        query = "&".join(params)
+        counts = self._get(f"/1.0/nodecounts?{query}" if query else "/1.0/nodecounts")
+        return counts.get("metadata")
+
+    def get_cluster_summary(self) -> dict:
+        """Fetch members, their node information and role counts.
+
+        Returns a dict with "members", each with name, address, status,
+        role and machineid, and "roles", the number of nodes per role.
+        Node information is read from clusterd in one transaction, member
+        status is the one reported by microcluster.
+        """
+        summary = self._get("/1.0/summary")
+        return summary.get("metadata")
+
     def list_terraform_plans(self) -> List[str]:
         """List all plans."""
-        plans = self._get("/1.0/terraformstate")
-        return plans.get("metadata")
+        return [
+            item["key"].removeprefix(TERRAFORM_STATE_PREFIX)
+            for item in self.iter_config(TERRAFORM_STATE_PREFIX)
+        ]
 
     def list_terraform_locks(self) -> List[str]:
         """List all locks."""
-        locks = self._get("/1.0/terraformlock")
-        return locks.get("metadata")
+        return [
+            item["key"].removeprefix(TERRAFORM_LOCK_PREFIX)
+            for item in self.iter_config(TERRAFORM_LOCK_PREFIX)
+        ]
+
+    def watch_terraform_locks(
+        self, revision: int = 0, timeout: int = 30
+    ) -> Iterator[int]:
+        """Yield a new revision each time a plan is locked or unlocked."""
+        return self.watch_config(
+            TERRAFORM_LOCK_PREFIX, prefix=True, revision=revision, timeout=timeout
+        )
 
     def get_terraform_lock(self, plan: str) -> dict:
         """Get lock information for plan."""
         lock = self._get(f"/1.0/terraformlock/{plan}")
         return json.loads(lock)
 
+    def renew_terraform_lock(self, plan: str, lock: dict) -> dict:
+        """Renew the lease on the lock of plan, returns the renewed lock."""
+        try:
+            renewed = self._put(f"/1.0/terraformlease/{plan}", data=json.dumps(lock))
+        except service.ConfigItemNotFoundException as e:
+            raise service.TerraformLockNotFoundException(
+                f"Plan {plan} is not locked"
+            ) from e
+        except HTTPError as e:
+            if e.response.status_code == codes.not_found:
+                raise service.TerraformLockNotFoundException(
+                    f"Plan {plan} is not locked"
+                ) from e
+            if e.response.status_code == codes.conflict:
+                raise service.TerraformLockConflictException(
+                    f"Lock on plan {plan} is held by someone else"
+                ) from e
+            raise e
+        return renewed.get("metadata")
+
     def unlock_terraform_plan(self, plan: str, lock: dict) -> None:
         """Unlock plan."""
         self._put(f"/1.0/terraformunlock/{plan}", data=json.dumps(lock))
@@ -13,8 +13,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import hashlib
+import json
 import logging
+import re
 from abc import ABC
+from typing import Any
 from urllib.parse import quote
 
 from requests.exceptions import ConnectionError, HTTPError
@@ -22,8 +26,98 @@ from requests.sessions import Session
 from requests_unixsocket import DEFAULT_SCHEME
 from snaphelpers import Snap
 
+from sunbeam.log import timed_event
+
 LOG = logging.getLogger(__name__)
 
+# Largest request or response body logged verbatim, larger bodies are
+# summarised as their size and hash.
+DEFAULT_LOG_BODY_LIMIT = 1024
+# Per endpoint limits, matched on the longest path prefix. Config items
+# hold answers, kubeconfigs and credentials, terraform state holds
+# everything terraform knows: never log them verbatim.
+LOG_BODY_LIMITS = {
+    "1.0/config": 0,
+    "1.0/terraformstate": 0,
+    "1.0/jujuusers": 0,
+    "cluster/1.0/tokens": 0,
+    "cluster/internal/tokens": 0,
+}
+REDACTED = "**REDACTED**"
+SECRET_FIELD = re.compile(
+    r"password|secret|token|credential|cert|key|kubeconfig", re.IGNORECASE
+)
+
+
+def _redact(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {
+            k: REDACTED if SECRET_FIELD.search(str(k)) else _redact(v)
+            for k, v in value.items()
+        }
+    if isinstance(value, list):
+        return [_redact(v) for v in value]
+    return value
+
+
+def summarize_body(body: Any, limit: int = DEFAULT_LOG_BODY_LIMIT) -> str:
+    """Render a request or response body for the debug log.
+
+    Bodies up to limit bytes are logged with secret fields redacted,
+    anything larger, or not redactable, as its size and hash.
+    """
+    if body is None:
+        return "None"
+    if not isinstance(body, (str, bytes)):
+        body = json.dumps(body)
+    raw = body.encode() if isinstance(body, str) else body
+    summary = f"<{len(raw)} bytes sha256:{hashlib.sha256(raw).hexdigest()[:12]}>"
+    if len(raw) > limit:
+        return summary
+    try:
+        return json.dumps(_redact(json.loads(raw)))
+    except ValueError:
+        pass
+    if SECRET_FIELD.search(raw.decode(errors="replace")):
+        return summary
+    return raw.decode(errors="replace")
+
+
+def log_body_limit(path: str) -> int:
+    """Body size logged verbatim for the endpoint at path."""
+    path = path.lstrip("/")
+    prefixes = [prefix for prefix in LOG_BODY_LIMITS if path.startswith(prefix)]
+    if not prefixes:
+        return DEFAULT_LOG_BODY_LIMIT
+    return LOG_BODY_LIMITS[max(prefixes, key=len)]
+
+
+class _LoggedBody:
+    """Body rendered by summarize_body only if the record is emitted."""
+
+    def __init__(self, body: Any, limit: int):
+        self.body = body
+        self.limit = limit
+
+    def __str__(self) -> str:
+        return summarize_body(self.body, self.limit)
+
+
+class _LoggedRequest:
+    """Request kwargs rendered with their payload summarised."""
+
+    def __init__(self, kwargs: dict, limit: int):
+        self.kwargs = kwargs
+        self.limit = limit
+
+    def __str__(self) -> str:
+        args = {}
+        for name, value in self.kwargs.items():
+            if name in ("data", "json") and value is not None:
+                value = summarize_body(value, self.limit)
+            args[name] = value
+        return str(args)
+
 
 class RemoteException(Exception):
     """An Exception raised when interacting with the remote microclusterd service"""
@@ -49,6 +143,24 @@ class ConfigItemNotFoundException(RemoteException):
     pass
 
 
+class ConfigItemConflictException(RemoteException):
+    """Raised when a ConfigItem changed since its revision was read"""
+
+    pass
+
+
+class TerraformLockNotFoundException(RemoteException):
+    """Raised when renewing the lease on a plan that is not locked"""
+
+    pass
+
+
+class TerraformLockConflictException(RemoteException):
+    """Raised when renewing the lease on a lock held by someone else"""
+
+    pass
+
+
 class NodeAlreadyExistsException(RemoteException):
     """Raised when the node already exists"""
 
@@ -108,15 +220,25 @@ class BaseService(ABC):
         self._socket_path = Snap().paths.common / "state" / "control.socket"
 
     def _request(self, method, path, **kwargs):
+        return self._response(method, path, **kwargs).json()
+
+    def _response(self, method, path, **kwargs):
         if path.startswith("/"):
             path = path[1:]
         netloc = quote(str(self._socket_path), safe="")
         url = f"{DEFAULT_SCHEME}{netloc}/{path}"
 
+        limit = log_body_limit(path)
         try:
-            LOG.debug("[%s] %s, args=%s", method, url, kwargs)
-            response = self.__session.request(method=method, url=url, **kwargs)
-            LOG.debug("Response(%s) = %s", response, response.text)
+            LOG.debug("[%s] %s, args=%s", method, url, _LoggedRequest(kwargs, limit))
+            with timed_event("clusterd", f"{method.upper()} /{path}") as event:
+                response = self.__session.request(method=method, url=url, **kwargs)
+                event["status"] = response.status_code
+                if not response.ok:
+                    event["outcome"] = "error"
+            LOG.debug(
+                "Response(%s) = %s", response, _LoggedBody(response.content, limit)
+            )
         except ConnectionError as e:
             msg = str(e)
             if "FileNotFoundError" in msg:
@@ -130,7 +252,8 @@ class BaseService(ABC):
             response.raise_for_status()
         except HTTPError as e:
             # Do some nice translating to sunbeamdexceptions
-            error = response.json().get("error")
+            # Some endpoints answer errors with a bare body, e.g. a lock.
+            error = response.json().get("error") or ""
             if "remote with name" in error:
                 raise NodeAlreadyExistsException(
                     "Already node exists in the sunbeam cluster"
@@ -171,9 +294,11 @@ class BaseService(ABC):
                 )
             elif "ConfigItem not found" in error:
                 raise ConfigItemNotFoundException("ConfigItem not found")
+            elif "ConfigItem revision mismatch" in error:
+                raise ConfigItemConflictException("ConfigItem revision mismatch")
             raise e
 
-        return response.json()
+        return response
 
     def _get(self, path, **kwargs):
         kwargs.setdefault("allow_redirects", True)
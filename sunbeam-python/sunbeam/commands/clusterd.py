@@ -194,17 +194,16 @@ class ClusterListNodeStep(BaseStep):
     def run(self, status: Optional[Status] = None) -> Result:
         """List nodes in the sunbeam cluster"""
         try:
-            members = self.client.cluster.get_cluster_members()
-            LOG.debug(f"Members: {members}")
-            nodes = self.client.cluster.list_nodes()
-            LOG.debug(f"Nodes: {nodes}")
+            summary = self.client.cluster.get_cluster_summary()
+            LOG.debug(f"Summary: {summary}")
 
             nodes_dict = {
-                member.get("name"): {"status": member.get("status")}
-                for member in members
+                member.get("name"): {
+                    "status": member.get("status"),
+                    "roles": member.get("role", []),
+                }
+                for member in summary.get("members", [])
             }
-            for node in nodes:
-                nodes_dict[node.get("name")].update({"roles": node.get("role", [])})
 
             return Result(result_type=ResultType.COMPLETED, message=nodes_dict)
         except ClusterServiceUnavailableException as e:
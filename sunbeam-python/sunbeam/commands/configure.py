@@ -19,13 +19,14 @@ import logging
 import os
 import shutil
 import subprocess
+import time
 from pathlib import Path
-from typing import Any, Optional, TextIO
+from typing import Any, Callable, Optional, TextIO
 
 import click
 from rich.console import Console
 from rich.prompt import InvalidResponse, PromptBase
-from snaphelpers import Snap
+from snaphelpers import Snap, SnapCtlError, UnknownConfigKey
 
 import sunbeam.jobs.questions
 from sunbeam import utils
@@ -52,8 +53,18 @@ from sunbeam.jobs.juju import (
     ModelNotFoundException,
     run_sync,
 )
+from sunbeam.log import timed_event
 
 CLOUD_CONFIG_SECTION = "CloudConfig"
+ADMIN_CREDENTIALS_FILE = "admin-credentials.json"
+ADMIN_CREDENTIALS_TTL = 3600
+# Errors of keystone and of the openstack terraform provider when the
+# credentials are rejected
+AUTH_FAILURE_MESSAGES = (
+    "(HTTP 401)",
+    "Authentication failed",
+    "requires authentication",
+)
 LOG = logging.getLogger(__name__)
 console = Console()
 
@@ -247,13 +258,85 @@ VARIABLE_DEFAULTS = {
 }
 
 
-def retrieve_admin_credentials(jhelper: JujuHelper, model: str) -> dict:
-    """Retrieve cloud admin credentials.
+def admin_credentials_ttl() -> int:
+    """Number of seconds cached admin credentials are considered fresh.
 
-    Retrieve cloud admin credentials from keystone and
-    return as a dict suitable for use with subprocess
-    commands.  Variables are prefixed with OS_.
+    Read from the ``credentials.ttl`` snap option, 0 disables the cache.
     """
+    try:
+        ttl = Snap().config.get("credentials.ttl")
+    except (UnknownConfigKey, SnapCtlError):
+        ttl = None
+    if ttl is None:
+        return ADMIN_CREDENTIALS_TTL
+    try:
+        return max(int(ttl), 0)
+    except (TypeError, ValueError):
+        LOG.debug(f"Ignoring invalid credentials.ttl value {ttl!r}")
+        return ADMIN_CREDENTIALS_TTL
+
+
+def _admin_credentials_file(data_location: Path) -> Path:
+    return Path(data_location) / ADMIN_CREDENTIALS_FILE
+
+
+def invalidate_admin_credentials(data_location: Path) -> None:
+    """Drop cached admin credentials, next lookup will query keystone."""
+    try:
+        _admin_credentials_file(data_location).unlink()
+    except FileNotFoundError:
+        pass
+
+
+def _load_admin_account(data_location: Path, ttl: int) -> Optional[dict]:
+    credentials_file = _admin_credentials_file(data_location)
+    try:
+        with credentials_file.open("r") as f:
+            cached = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        LOG.debug(f"Ignoring unreadable credentials cache: {e}")
+        return None
+    if not isinstance(cached, dict) or not isinstance(cached.get("account"), dict):
+        return None
+    age = time.time() - cached.get("timestamp", 0)
+    if age < 0 or age >= ttl:
+        LOG.debug("Cached admin credentials expired")
+        return None
+    return cached["account"]
+
+
+def _store_admin_account(data_location: Path, account: dict) -> None:
+    credentials_file = _admin_credentials_file(data_location)
+    # Credentials are secrets, never let the cache be readable by others.
+    fd = os.open(credentials_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    os.fchmod(fd, 0o600)
+    with os.fdopen(fd, "w") as f:
+        json.dump({"timestamp": time.time(), "account": account}, f)
+
+
+def get_admin_account(
+    jhelper: JujuHelper,
+    model: str,
+    refresh: bool = False,
+    ttl: Optional[int] = None,
+) -> dict:
+    """Retrieve the keystone admin account.
+
+    The result of the keystone get-admin-account action is cached under
+    the juju helper data location for ``ttl`` seconds so that commands
+    run in quick succession do not each round-trip to keystone.
+    """
+    if ttl is None:
+        ttl = admin_credentials_ttl()
+    data_location = jhelper.data_location
+    if not refresh and ttl > 0:
+        account = _load_admin_account(data_location, ttl)
+        if account is not None:
+            LOG.debug("Using cached admin credentials")
+            return account
+
     app = "keystone"
     action_cmd = "get-admin-account"
 
@@ -267,6 +350,27 @@ def retrieve_admin_credentials(jhelper: JujuHelper, model: str) -> dict:
         _message = "Unable to retrieve openrc from Keystone service"
         raise click.ClickException(_message)
 
+    if ttl > 0:
+        try:
+            _store_admin_account(data_location, action_result)
+        except OSError as e:
+            LOG.debug(f"Unable to cache admin credentials: {e}")
+    return action_result
+
+
+def retrieve_admin_credentials(
+    jhelper: JujuHelper, model: str, refresh: bool = False
+) -> dict:
+    """Retrieve cloud admin credentials.
+
+    Retrieve cloud admin credentials from keystone and
+    return as a dict suitable for use with subprocess
+    commands.  Variables are prefixed with OS_.
+
+    Credentials are served from the local cache when fresh,
+    set refresh to force a lookup against keystone.
+    """
+    action_result = get_admin_account(jhelper, model, refresh=refresh)
     return {
         "OS_USERNAME": action_result.get("username"),
         "OS_PASSWORD": action_result.get("password"),
@@ -279,6 +383,44 @@ def retrieve_admin_credentials(jhelper: JujuHelper, model: str) -> dict:
     }
 
 
+def refresh_admin_credentials(jhelper: JujuHelper, model: str) -> dict:
+    """Drop cached admin credentials and retrieve them again from keystone."""
+    invalidate_admin_credentials(jhelper.data_location)
+    return retrieve_admin_credentials(jhelper, model, refresh=True)
+
+
+def is_auth_failure(error: str) -> bool:
+    """Whether error reports credentials rejected by keystone."""
+    return any(message in error for message in AUTH_FAILURE_MESSAGES)
+
+
+def verify_admin_credentials(jhelper: JujuHelper, model: str) -> dict:
+    """Retrieve admin credentials keystone accepts.
+
+    Cached credentials keystone rejects, after a password rotation for
+    instance, are replaced by credentials retrieved from keystone.
+    """
+    # openstacksdk comes with the snap, not with sunbeam's requirements
+    import openstack
+
+    credentials = retrieve_admin_credentials(jhelper, model)
+    try:
+        openstack.connect(
+            auth_url=credentials["OS_AUTH_URL"],
+            username=credentials["OS_USERNAME"],
+            password=credentials["OS_PASSWORD"],
+            project_name=credentials["OS_PROJECT_NAME"],
+            user_domain_name=credentials["OS_USER_DOMAIN_NAME"],
+            project_domain_name=credentials["OS_PROJECT_DOMAIN_NAME"],
+        ).authorize()
+    except openstack.exceptions.SDKException as e:
+        if not is_auth_failure(str(e)):
+            raise click.ClickException(f"Unable to connect to OpenStack: {e}")
+        LOG.debug(f"Admin credentials rejected, refreshing: {e}")
+        credentials = refresh_admin_credentials(jhelper, model)
+    return credentials
+
+
 class SetHypervisorCharmConfigStep(BaseStep):
     """Update openstack-hypervisor charm config"""
 
@@ -383,13 +525,14 @@ class UserOpenRCStep(BaseStep):
             terraform = str(snap.paths.snap / "bin" / "terraform")
             cmd = [terraform, "output", "-json"]
             LOG.debug(f'Running command {" ".join(cmd)}')
-            process = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                check=True,
-                cwd=snap.paths.user_common / "etc" / "demo-setup",
-            )
+            with timed_event("subprocess", "terraform output"):
+                process = subprocess.run(
+                    cmd,
+                    capture_output=True,
+                    text=True,
+                    check=True,
+                    cwd=snap.paths.user_common / "etc" / "demo-setup",
+                )
             # Mask any passwords before printing process.stdout
             tf_output = json.loads(process.stdout)
             self._print_openrc(tf_output)
@@ -538,7 +681,12 @@ class UserQuestions(BaseStep):
                 self.variables["external_network"]["segmentation_id"] = 0
 
         sunbeam.jobs.questions.write_answers(
-            self.client, CLOUD_CONFIG_SECTION, self.variables
+            self.client,
+            CLOUD_CONFIG_SECTION,
+            {
+                "user": self.variables["user"],
+                "external_network": self.variables["external_network"],
+            },
         )
 
     def run(self, status: Optional[Status] = None) -> Result:
@@ -552,6 +700,7 @@ class DemoSetup(BaseStep):
         self,
         tfhelper: TerraformHelper,
         answer_file: str,
+        refresh_credentials: Optional[Callable[[], dict]] = None,
     ):
         super().__init__(
             "Create demonstration configuration",
@@ -559,6 +708,7 @@ class DemoSetup(BaseStep):
         )
         self.answer_file = answer_file
         self.tfhelper = tfhelper
+        self.refresh_credentials = refresh_credentials
         self.client = Client()
 
     def is_skip(self, status: Optional[Status] = None) -> Result:
@@ -585,6 +735,18 @@ class DemoSetup(BaseStep):
             self.tfhelper.apply()
             return Result(ResultType.COMPLETED)
         except TerraformException as e:
+            if self.refresh_credentials is None or not is_auth_failure(e.output):
+                LOG.exception("Error configuring cloud")
+                return Result(ResultType.FAILED, str(e))
+            # Cached credentials may have been rotated, retry once with
+            # credentials fetched from keystone.
+            LOG.debug(f"Retrying with refreshed admin credentials: {e}")
+
+        try:
+            self.tfhelper.env = self.refresh_credentials()
+            self.tfhelper.apply()
+            return Result(ResultType.COMPLETED)
+        except (TerraformException, click.ClickException) as e:
             LOG.exception("Error configuring cloud")
             return Result(ResultType.FAILED, str(e))
 
@@ -773,6 +935,9 @@ def configure(
         DemoSetup(
             tfhelper=tfhelper,
             answer_file=answer_file,
+            refresh_credentials=lambda: refresh_admin_credentials(
+                jhelper, OPENSTACK_MODEL
+            ),
         ),
         UserOpenRCStep(
             auth_url=admin_credentials["OS_AUTH_URL"],
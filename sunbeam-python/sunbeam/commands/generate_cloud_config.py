@@ -30,7 +30,11 @@ from snaphelpers import Snap
 
 import sunbeam.jobs.questions
 from sunbeam.clusterd.client import Client
-from sunbeam.commands.configure import CLOUD_CONFIG_SECTION, retrieve_admin_credentials
+from sunbeam.commands.configure import (
+    CLOUD_CONFIG_SECTION,
+    retrieve_admin_credentials,
+    verify_admin_credentials,
+)
 from sunbeam.commands.openstack import OPENSTACK_MODEL
 from sunbeam.jobs.checks import VerifyBootstrappedCheck
 from sunbeam.jobs.common import (
@@ -42,6 +46,7 @@ from sunbeam.jobs.common import (
     run_preflight_checks,
 )
 from sunbeam.jobs.juju import JujuHelper, ModelNotFoundException, run_sync
+from sunbeam.log import timed_event
 
 LOG = logging.getLogger(__name__)
 console = Console()
@@ -103,13 +108,14 @@ class GenerateCloudConfigStep(BaseStep):
                 terraform = str(snap.paths.snap / "bin" / "terraform")
                 cmd = [terraform, "output", "-json"]
                 LOG.debug(f'Running command {" ".join(cmd)}')
-                process = subprocess.run(
-                    cmd,
-                    capture_output=True,
-                    text=True,
-                    check=True,
-                    cwd=snap.paths.user_common / "etc" / "demo-setup",
-                )
+                with timed_event("subprocess", "terraform output"):
+                    process = subprocess.run(
+                        cmd,
+                        capture_output=True,
+                        text=True,
+                        check=True,
+                        cwd=snap.paths.user_common / "etc" / "demo-setup",
+                    )
                 # Mask any passwords before printing process.stdout
                 tf_output = json.loads(process.stdout)
                 self._print_cloud_config(tf_output)
@@ -263,7 +269,11 @@ def cloud_config(
     except ModelNotFoundException:
         LOG.error(f"Expected model {OPENSTACK_MODEL} missing")
         raise click.ClickException("Please run `sunbeam cluster bootstrap` first")
-    admin_credentials = retrieve_admin_credentials(jhelper, OPENSTACK_MODEL)
+    if admin:
+        # Admin credentials end up in clouds.yaml, make sure they still work
+        admin_credentials = verify_admin_credentials(jhelper, OPENSTACK_MODEL)
+    else:
+        admin_credentials = retrieve_admin_credentials(jhelper, OPENSTACK_MODEL)
     plan = [
         GenerateCloudConfigStep(
             admin_credentials=admin_credentials,
@@ -29,7 +29,7 @@ from sunbeam.commands.configure import (
     user_questions,
 )
 from sunbeam.commands.juju import BOOTSTRAP_CONFIG_KEY, bootstrap_questions
-from sunbeam.commands.microceph import microceph_questions
+from sunbeam.commands.microceph import load_microceph_answers, microceph_questions
 from sunbeam.commands.microk8s import (
     MICROK8S_ADDONS_CONFIG_KEY,
     microk8s_addons_questions,
@@ -123,10 +123,14 @@ def generate_preseed() -> None:
         section_description="Remote Access",
         comment_out=True,
     )
+    try:
+        variables = load_microceph_answers(client, name)
+    except ClusterServiceUnavailableException:
+        variables = {}
     microceph_config_bank = sunbeam.jobs.questions.QuestionBank(
         questions=microceph_questions(),
         console=console,
-        previous_answers=variables.get("microceph_config", {}).get(name),
+        previous_answers=variables,
     )
     show_questions(
         microceph_config_bank,
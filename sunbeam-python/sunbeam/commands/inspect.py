@@ -13,36 +13,572 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
 import datetime
+import gzip
+import io
+import json
 import logging
-import shutil
+import math
+import os
+import re
+import subprocess
 import tarfile
 import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
 
 import click
 import yaml
+import zstandard
+from juju.client.facade import Type, TypeEncoder
 from rich.console import Console
 from rich.table import Table
 from snaphelpers import Snap
 
 from sunbeam.clusterd.client import Client
+from sunbeam.clusterd.cluster import TERRAFORM_LOCK_PREFIX
 from sunbeam.clusterd.service import ConfigItemNotFoundException
-from sunbeam.commands.juju import WriteCharmLogStep, WriteJujuStatusStep
+from sunbeam.commands.juju import JujuStepHelper
 from sunbeam.commands.node import FORMAT_TABLE, FORMAT_YAML
 from sunbeam.commands.openstack import OPENSTACK_MODEL
+from sunbeam.commands.terraform import lock_expired, lock_expiry
 from sunbeam.jobs.checks import DaemonGroupCheck
-from sunbeam.jobs.common import run_plan, run_preflight_checks
-from sunbeam.jobs.juju import CONTROLLER_MODEL, JujuHelper
+from sunbeam.jobs.common import run_preflight_checks
+from sunbeam.jobs.juju import (
+    CONTROLLER_MODEL,
+    JujuHelper,
+    ModelNotFoundException,
+    run_sync,
+)
+from sunbeam.log import EVENT_LOG_FILE
 
 LOG = logging.getLogger(__name__)
 console = Console()
-snap = Snap()
+
+COMPRESSION_GZIP = "gzip"
+COMPRESSION_ZSTD = "zstd"
+COMPRESSION_NONE = "none"
+COMPRESSION_EXTENSIONS = {
+    COMPRESSION_GZIP: ".tar.gz",
+    COMPRESSION_ZSTD: ".tar.zst",
+    COMPRESSION_NONE: ".tar",
+}
+# (default, min, max) compression level
+COMPRESSION_LEVELS = {
+    COMPRESSION_GZIP: (9, 0, 9),
+    COMPRESSION_ZSTD: (3, 1, 22),
+}
+STATUS_FORMAT_JSON = "json"
+STATUS_FORMAT_NDJSON = "ndjson"
+STATUS_FORMAT_EXTENSIONS = {
+    STATUS_FORMAT_JSON: ".json",
+    STATUS_FORMAT_NDJSON: ".ndjson.gz",
+}
+# Status sections broken down into one entity per name
+STATUS_SECTIONS = {
+    "applications": "application",
+    "machines": "machine",
+    "remote-applications": "remote-application",
+    "offers": "offer",
+}
+# Status fields changing on every call, ignored when comparing snapshots
+VOLATILE_STATUS_FIELDS = {"controller-timestamp"}
+DEBUG_LOG_LEVELS = ["TRACE", "DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
+# Longest debug-log line read through the streaming filter.
+DEBUG_LOG_LINE_LIMIT = 1024 * 1024
+SINCE_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+SIZE_UNITS = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3}
+# "machine-0: 2023-10-19 14:22:05 INFO ..." as printed with --date --utc
+DEBUG_LOG_TIMESTAMP = re.compile(rb"^\S+: (\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})")
+
+
+def parse_since(
+    value: str, now: Optional[datetime.datetime] = None
+) -> datetime.datetime:
+    """Parse a relative (30m, 2h, 1d) or ISO 8601 start time to naive UTC."""
+    now = now or datetime.datetime.utcnow()
+    match = re.fullmatch(r"(\d+)([smhd])", value.strip())
+    if match:
+        amount, unit = match.groups()
+        return now - datetime.timedelta(seconds=int(amount) * SINCE_UNITS[unit])
+    try:
+        since = datetime.datetime.fromisoformat(value.strip())
+    except ValueError:
+        raise ValueError(
+            f"{value!r} is neither a duration like 30m, 2h, 1d nor an ISO date"
+        )
+    if since.tzinfo is not None:
+        since = since.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return since
+
+
+def parse_size(value: str) -> int:
+    """Parse a byte size with an optional K, M or G suffix."""
+    match = re.fullmatch(r"(\d+)([KMG]?)I?B?", value.strip().upper())
+    if not match:
+        raise ValueError(f"{value!r} is not a size like 512K, 100M or 2G")
+    amount, unit = match.groups()
+    return int(amount) * SIZE_UNITS[unit]
+
+
+@dataclass
+class DebugLogFilter:
+    """Restrict the debug-log captured for each model.
+
+    Entity and level filters are applied by the controller, the time
+    window and byte budget are applied while streaming the output.
+    """
+
+    since: Optional[datetime.datetime] = None
+    include: List[str] = field(default_factory=list)
+    exclude: List[str] = field(default_factory=list)
+    level: Optional[str] = None
+    max_bytes: Optional[int] = None
+
+    def juju_args(self) -> List[str]:
+        """Server side debug-log arguments."""
+        args = []
+        for entity in self.include:
+            args.extend(["--include", entity])
+        for entity in self.exclude:
+            args.extend(["--exclude", entity])
+        if self.level:
+            args.extend(["--level", self.level])
+        if self.since is not None:
+            # Full UTC timestamps are needed to compare against since.
+            args.extend(["--date", "--utc"])
+        return args
+
+    @property
+    def streaming(self) -> bool:
+        """Whether the output needs to go through filter_stream."""
+        return self.since is not None or self.max_bytes is not None
+
+    async def filter_stream(self, reader: asyncio.StreamReader, out: BinaryIO) -> bool:
+        """Copy lines from reader to out, applying time window and budget.
+
+        Lines without a timestamp, e.g. tracebacks, follow the line they
+        belong to.
+
+        :return: whether the output was truncated by the byte budget
+        """
+        since = None
+        if self.since is not None:
+            since = self.since.strftime("%Y-%m-%d %H:%M:%S").encode()
+        keep = since is None
+        written = 0
+        while line := await reader.readline():
+            if since is not None:
+                match = DEBUG_LOG_TIMESTAMP.match(line)
+                if match:
+                    keep = match.group(1) >= since
+            if not keep:
+                continue
+            if self.max_bytes is not None and written + len(line) > self.max_bytes:
+                notice = f"... truncated at {self.max_bytes} bytes\n"
+                out.write(notice.encode())
+                return True
+            out.write(line)
+            written += len(line)
+        return False
+
+
+class InspectionArchive:
+    """Tar archive that collectors append members to as soon as they complete.
+
+    Writes are serialised with a lock so that collectors can hand their
+    output over from worker threads without staging it in a directory first.
+    """
+
+    def __init__(self, tar: tarfile.TarFile):
+        self.tar = tar
+        self.members: List[str] = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _tarinfo(name: str, size: int) -> tarfile.TarInfo:
+        info = tarfile.TarInfo(name=f"./{name}")
+        info.size = size
+        info.mtime = int(time.time())
+        info.mode = 0o640
+        return info
+
+    def _addfile(self, info: tarfile.TarInfo, fileobj: BinaryIO) -> None:
+        with self._lock:
+            self.tar.addfile(info, fileobj)
+            self.members.append(info.name)
+
+    def add_bytes(self, name: str, data: bytes) -> None:
+        """Add an in-memory document as a member."""
+        self._addfile(self._tarinfo(name, len(data)), io.BytesIO(data))
+
+    def add_fileobj(self, name: str, fileobj: BinaryIO) -> None:
+        """Add the whole content of a seekable file object as a member."""
+        size = fileobj.seek(0, os.SEEK_END)
+        fileobj.seek(0)
+        self._addfile(self._tarinfo(name, size), fileobj)
+
+    def add_path(self, path: Path, name: str) -> None:
+        """Add a file or directory tree straight from its source location."""
+        with self._lock:
+            self.tar.add(path, arcname=f"./{name}")
+            self.members.append(f"./{name}")
+
+
+def validate_compression_level(compression: str, level: Optional[int] = None) -> int:
+    """Validate level for compression, returning the default when unset."""
+    if compression not in COMPRESSION_LEVELS:
+        if level is not None:
+            raise ValueError(f"no compression level with {compression} compression")
+        return 0
+    default, minimum, maximum = COMPRESSION_LEVELS[compression]
+    if level is None:
+        return default
+    if not minimum <= level <= maximum:
+        raise ValueError(
+            f"{compression} compression level must be between {minimum} and {maximum}"
+        )
+    return level
+
+
+@contextmanager
+def open_archive(
+    path: Path, compression: str = COMPRESSION_GZIP, level: Optional[int] = None
+) -> Iterator[tarfile.TarFile]:
+    """Open a tar archive for writing with the requested compression.
+
+    zstd compresses on all available cores, the tar stream is written
+    through the compressor without seeking.
+    """
+    level = validate_compression_level(compression, level)
+    if compression == COMPRESSION_NONE:
+        with tarfile.open(path, "w") as tar:
+            yield tar
+    elif compression == COMPRESSION_GZIP:
+        with tarfile.open(path, "w:gz", compresslevel=level) as tar:
+            yield tar
+    else:
+        compressor = zstandard.ZstdCompressor(level=level, threads=-1)
+        with path.open("wb") as f, compressor.stream_writer(f) as writer:
+            with tarfile.open(fileobj=writer, mode="w|") as tar:
+                yield tar
+
+
+async def _in_thread(func, *args) -> None:
+    await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+
+async def collect_model_status(
+    jhelper: JujuHelper, model: str, archive: InspectionArchive
+) -> None:
+    """Add the juju status of model to the archive."""
+    LOG.debug(f"Getting juju status for model {model}")
+    status = await jhelper.get_model_status_full(model)
+    data = status.to_json()
+    await _in_thread(archive.add_bytes, f"juju_status_{model}.out", data.encode())
+
+
+async def collect_debug_log(
+    model: str,
+    model_uuid: str,
+    archive: InspectionArchive,
+    spool_dir: Optional[Path] = None,
+    log_filter: Optional[DebugLogFilter] = None,
+) -> None:
+    """Add the replayed debug-log of model to the archive.
+
+    Tar headers carry the member size, so the log is spooled to an
+    anonymous file next to the report and appended once complete.
+    """
+    LOG.debug(f"Getting debug logs for model {model}")
+    log_filter = log_filter or DebugLogFilter()
+    cmd = JujuStepHelper()._debug_log_cmd(model_uuid, *log_filter.juju_args())
+    with tempfile.TemporaryFile(dir=spool_dir) as spool:
+        if log_filter.streaming:
+            process = await asyncio.create_subprocess_exec(
+                *cmd, stdout=asyncio.subprocess.PIPE, limit=DEBUG_LOG_LINE_LIMIT
+            )
+            truncated = await log_filter.filter_stream(process.stdout, spool)
+            if truncated:
+                LOG.debug(f"Debug-log of model {model} truncated")
+                process.kill()
+        else:
+            process = await asyncio.create_subprocess_exec(*cmd, stdout=spool)
+            truncated = False
+        returncode = await process.wait()
+        if returncode != 0 and not truncated:
+            raise subprocess.CalledProcessError(returncode, cmd)
+        await _in_thread(archive.add_fileobj, f"debug_log_{model}.out", spool)
+
+
+async def collect_inspection_report(
+    jhelper: JujuHelper,
+    models: List[str],
+    archive: InspectionArchive,
+    log_dir: Optional[Path] = None,
+    spool_dir: Optional[Path] = None,
+    log_filter: Optional[DebugLogFilter] = None,
+) -> Dict[str, str]:
+    """Run all collectors concurrently, writing their output to archive.
+
+    :return: mapping of collector name to error for collectors that failed
+    """
+    # Resolve models one at a time: this also establishes the controller
+    # connection before the collectors fan out.
+    model_uuids = {}
+    for model in models:
+        try:
+            model_impl = await jhelper.get_model(model)
+        except ModelNotFoundException:
+            LOG.debug(f"Model {model} not found")
+            continue
+        model_uuids[model] = model_impl.info.uuid
+
+    collectors = {}
+    for model, model_uuid in model_uuids.items():
+        collectors[f"juju status {model}"] = collect_model_status(
+            jhelper, model, archive
+        )
+        collectors[f"debug-log {model}"] = collect_debug_log(
+            model, model_uuid, archive, spool_dir, log_filter
+        )
+    if log_dir is not None and log_dir.exists():
+        collectors["logs"] = _in_thread(archive.add_path, log_dir, "logs")
+
+    results = await asyncio.gather(*collectors.values(), return_exceptions=True)
+    failures = {}
+    for name, result in zip(collectors, results):
+        if isinstance(result, Exception):
+            LOG.debug(f"Collector {name!r} failed", exc_info=result)
+            failures[name] = str(result)
+    return failures
+
+
+StatusEntities = Dict[Tuple[str, str], Any]
+
+
+def _serialize(obj: Any) -> Any:
+    return obj.serialize() if isinstance(obj, Type) else obj
+
+
+def status_entities(status: Any) -> Iterator[Tuple[str, str, Any]]:
+    """Break a juju status down into (kind, name, document) entities.
+
+    Units are split out of their application so that a unit changing
+    state does not make its whole application differ.
+    """
+    for key, value in sorted(_serialize(status).items()):
+        if key in VOLATILE_STATUS_FIELDS:
+            continue
+        kind = STATUS_SECTIONS.get(key)
+        if kind is None:
+            if key == "relations":
+                for relation in value or []:
+                    relation = _serialize(relation)
+                    yield "relation", str(relation.get("id")), relation
+            else:
+                yield key, "", value
+            continue
+        for name, entity in sorted((value or {}).items()):
+            if kind == "application":
+                entity = dict(_serialize(entity))
+                units = entity.pop("units", None) or {}
+                yield kind, name, entity
+                for unit_name, unit in sorted(units.items()):
+                    yield "unit", unit_name, unit
+            else:
+                yield kind, name, entity
+
+
+def write_status_snapshot(status: Any, fileobj: BinaryIO, format: str) -> None:
+    """Serialise a juju status in a single pass.
+
+    The ndjson format is gzip compressed with one entity per line.
+    """
+    if format == STATUS_FORMAT_JSON:
+        fileobj.write(json.dumps(status, cls=TypeEncoder, sort_keys=True).encode())
+        return
+    with gzip.GzipFile(fileobj=fileobj, mode="wb") as gz:
+        for kind, name, document in status_entities(status):
+            line = {"kind": kind, "name": name, "status": document}
+            gz.write(json.dumps(line, cls=TypeEncoder, sort_keys=True).encode())
+            gz.write(b"\n")
+
+
+def load_status_snapshot(path: Path) -> StatusEntities:
+    """Load the entities of a snapshot written in either format."""
+    with path.open("rb") as f:
+        compressed = f.read(2) == b"\x1f\x8b"
+    if not compressed:
+        with path.open("rb") as f:
+            status = json.load(f)
+        return {(kind, name): doc for kind, name, doc in status_entities(status)}
+    entities = {}
+    with gzip.open(path, "rb") as gz:
+        for line in gz:
+            entity = json.loads(line)
+            entities[(entity["kind"], entity["name"])] = entity["status"]
+    return entities
+
+
+def _flatten(document: Any, prefix: str = "") -> Dict[str, Any]:
+    if not isinstance(document, dict) or not document:
+        return {prefix: document}
+    fields = {}
+    for key, value in document.items():
+        fields.update(_flatten(value, f"{prefix}.{key}" if prefix else key))
+    return fields
+
+
+def diff_status_snapshots(
+    old: StatusEntities, new: StatusEntities
+) -> List[Tuple[str, str, str, Any, Any]]:
+    """Compare two snapshots entity by entity.
+
+    Only entities which differ are walked field by field.
+
+    :return: list of (change, entity, field, old value, new value)
+    """
+    changes = []
+    for key in sorted(old.keys() | new.keys()):
+        entity = "/".join(part for part in key if part)
+        if key not in new:
+            changes.append(("removed", entity, "", None, None))
+        elif key not in old:
+            changes.append(("added", entity, "", None, None))
+        elif old[key] != new[key]:
+            old_fields = _flatten(old[key])
+            new_fields = _flatten(new[key])
+            for field_name in sorted(old_fields.keys() | new_fields.keys()):
+                old_value = old_fields.get(field_name)
+                new_value = new_fields.get(field_name)
+                if old_value != new_value:
+                    changes.append(
+                        ("changed", entity, field_name, old_value, new_value)
+                    )
+    return changes
+
+
+def load_events(paths: List[Path]) -> Iterator[dict]:
+    """Read event records from JSON-lines files, skipping bad lines."""
+    for path in paths:
+        with path.open("r") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(event, dict) and "duration" in event:
+                    yield event
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of sorted values."""
+    rank = max(math.ceil(pct / 100 * len(values)), 1)
+    return values[rank - 1]
+
+
+def aggregate_timings(events: Iterator[dict], kind: Optional[str] = None) -> List[dict]:
+    """Duration percentiles per event kind and name, slowest first."""
+    durations: Dict[Tuple[str, str], List[float]] = {}
+    errors: Dict[Tuple[str, str], int] = {}
+    invocations: Dict[Tuple[str, str], set] = {}
+    for event in events:
+        if kind is not None and event.get("kind") != kind:
+            continue
+        key = (event.get("kind", ""), event.get("name", ""))
+        durations.setdefault(key, []).append(float(event["duration"]))
+        invocations.setdefault(key, set()).add(event.get("invocation"))
+        if event.get("outcome") in ("error", "failed"):
+            errors[key] = errors.get(key, 0) + 1
+
+    timings = []
+    for key, values in durations.items():
+        values.sort()
+        timings.append(
+            {
+                "kind": key[0],
+                "name": key[1],
+                "count": len(values),
+                "runs": len(invocations[key]),
+                "errors": errors.get(key, 0),
+                "p50": percentile(values, 50),
+                "p90": percentile(values, 90),
+                "p99": percentile(values, 99),
+                "max": values[-1],
+                "total": sum(values),
+            }
+        )
+    return sorted(timings, key=lambda timing: timing["total"], reverse=True)
+
+
+def _parse_option(parser):
+    def callback(ctx: click.Context, param: click.Parameter, value):
+        if value is None:
+            return None
+        try:
+            return parser(value)
+        except ValueError as e:
+            raise click.BadParameter(str(e))
+
+    return callback
 
 
 @click.group(invoke_without_command=True)
+@click.option(
+    "--since",
+    callback=_parse_option(parse_since),
+    help="Only capture debug-log entries newer than this, "
+    "a duration (30m, 2h, 1d) or an ISO 8601 date.",
+)
+@click.option(
+    "--include",
+    multiple=True,
+    help="Only capture debug-log entries of this application, unit or machine.",
+)
+@click.option(
+    "--exclude",
+    multiple=True,
+    help="Skip debug-log entries of this application, unit or machine.",
+)
+@click.option(
+    "--level",
+    type=click.Choice(DEBUG_LOG_LEVELS, case_sensitive=False),
+    help="Only capture debug-log entries of this severity or above.",
+)
+@click.option(
+    "--max-log-size",
+    callback=_parse_option(parse_size),
+    help="Maximum debug-log size captured per model, e.g. 100M.",
+)
+@click.option(
+    "--compression",
+    type=click.Choice(list(COMPRESSION_EXTENSIONS)),
+    default=COMPRESSION_GZIP,
+    show_default=True,
+    help="Compression of the report tarball.",
+)
+@click.option(
+    "--compression-level",
+    type=int,
+    help="Compression level, 0-9 for gzip (default 9), 1-22 for zstd (default 3).",
+)
 @click.pass_context
-def inspect(ctx: click.Context) -> None:
+def inspect(
+    ctx: click.Context,
+    since: Optional[datetime.datetime] = None,
+    include: tuple = (),
+    exclude: tuple = (),
+    level: Optional[str] = None,
+    max_log_size: Optional[int] = None,
+    compression: str = COMPRESSION_GZIP,
+    compression_level: Optional[int] = None,
+) -> None:
     """Inspect the sunbeam installation.
 
     This script will inspect your installation. It will report any issue
@@ -56,37 +592,44 @@ def inspect(ctx: click.Context) -> None:
     if ctx.invoked_subcommand is not None:
         return
 
+    snap = Snap()
     data_location = snap.paths.user_data
     jhelper = JujuHelper(data_location)
 
     time_stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    file_name = f"sunbeam-inspection-report-{time_stamp}.tar.gz"
+    extension = COMPRESSION_EXTENSIONS[compression]
+    file_name = f"sunbeam-inspection-report-{time_stamp}{extension}"
     dump_file: Path = Path(snap.paths.user_common) / file_name
+    models = [CONTROLLER_MODEL.split("/")[-1], OPENSTACK_MODEL]
+    log_dir = snap.paths.user_common / "logs"
 
-    plan = []
-    with tempfile.TemporaryDirectory() as tmpdirname:
-        for model in [CONTROLLER_MODEL.split("/")[-1], OPENSTACK_MODEL]:
-            status_file = Path(tmpdirname) / f"juju_status_{model}.out"
-            debug_file = Path(tmpdirname) / f"debug_log_{model}.out"
-            plan.extend(
-                [
-                    WriteJujuStatusStep(jhelper, model, status_file),
-                    WriteCharmLogStep(jhelper, model, debug_file),
-                ]
-            )
-
-        run_plan(plan, console)
-
-        with console.status("[bold green]Copying logs..."):
-            log_dir = snap.paths.user_common / "logs"
-            if log_dir.exists():
-                shutil.copytree(log_dir, Path(tmpdirname) / "logs")
+    try:
+        validate_compression_level(compression, compression_level)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--compression-level")
 
-        with console.status("[bold green]Creating tarball..."), tarfile.open(
-            dump_file, "w:gz"
-        ) as tar:
-            tar.add(tmpdirname, arcname="./")
+    with console.status("[bold green]Collecting inspection report..."), open_archive(
+        dump_file, compression, compression_level
+    ) as tar:
+        failures = run_sync(
+            collect_inspection_report(
+                jhelper,
+                models,
+                InspectionArchive(tar),
+                log_dir=log_dir,
+                spool_dir=dump_file.parent,
+                log_filter=DebugLogFilter(
+                    since=since,
+                    include=list(include),
+                    exclude=list(exclude),
+                    level=level.upper() if level else None,
+                    max_bytes=max_log_size,
+                ),
+            )
+        )
 
+    for name, error in failures.items():
+        console.print(f"[yellow]Unable to collect {name}: {error}[/yellow]")
     console.print(f"[green]Output file written to {dump_file}[/green]")
 
 
@@ -98,9 +641,29 @@ def inspect(ctx: click.Context) -> None:
     default=FORMAT_TABLE,
     help="Output format.",
 )
-def plans(format: str):
+@click.option(
+    "--watch",
+    is_flag=True,
+    default=False,
+    help="List the plans again each time a plan is locked or unlocked.",
+)
+def plans(format: str, watch: bool):
     """List terraform plans and their lock status."""
     client = Client()
+    if not watch:
+        print_plans(client, format)
+        return
+
+    revision = client.cluster.get_config_revision(TERRAFORM_LOCK_PREFIX, prefix=True)
+    print_plans(client, format)
+    try:
+        for _ in client.cluster.watch_terraform_locks(revision):
+            print_plans(client, format)
+    except KeyboardInterrupt:
+        pass
+
+
+def print_plans(client: Client, format: str) -> None:
     plans = client.cluster.list_terraform_plans()
     locks = client.cluster.list_terraform_locks()
     if format == FORMAT_TABLE:
@@ -135,20 +698,166 @@ def unlock_plan(plan: str, force: bool):
         lock = client.cluster.get_terraform_lock(plan)
     except ConfigItemNotFoundException as e:
         raise click.ClickException(f"Lock for {plan!r} not found") from e
-    if not force:
-        lock_creation_time = datetime.datetime.strptime(
-            lock["Created"][:-4] + "Z", "%Y-%m-%dT%H:%M:%S.%fZ"
+    if not force and not lock_expired(lock):
+        click.confirm(
+            f"Plan {plan!r} is locked by {lock.get('Who')!r} with a lease"
+            f" renewed until {lock_expiry(lock):%Y-%m-%d %H:%M:%S %Z},"
+            " are you sure you want to unlock it?",
+            abort=True,
         )
-        if datetime.datetime.utcnow() - lock_creation_time < datetime.timedelta(
-            hours=1
-        ):
-            click.confirm(
-                f"Plan {plan!r} was locked less than an hour ago,"
-                " are you sure you want to unlock it?",
-                abort=True,
-            )
     try:
         client.cluster.unlock_terraform_plan(plan, lock)
     except ConfigItemNotFoundException as e:
         raise click.ClickException(f"Lock for {plan!r} not found") from e
     console.print(f"Unlocked plan {plan!r}")
+
+
+@inspect.command()
+@click.option(
+    "-m",
+    "--model",
+    default=OPENSTACK_MODEL,
+    show_default=True,
+    help="Model to capture the status of.",
+)
+@click.option(
+    "--snapshot-format",
+    type=click.Choice(list(STATUS_FORMAT_EXTENSIONS)),
+    default=STATUS_FORMAT_JSON,
+    show_default=True,
+    help="Snapshot format, ndjson is gzip compressed with one entity per line.",
+)
+@click.option(
+    "-o",
+    "--output",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="Snapshot file to write.",
+)
+@click.option(
+    "--diff",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    help="Previous snapshot to compare the current status against.",
+)
+@click.option(
+    "-f",
+    "--format",
+    type=click.Choice([FORMAT_TABLE, FORMAT_YAML]),
+    default=FORMAT_TABLE,
+    help="Output format of the comparison.",
+)
+def status(
+    model: str,
+    snapshot_format: str,
+    output: Optional[Path],
+    diff: Optional[Path],
+    format: str,
+):
+    """Snapshot the status of a model, optionally comparing it to an older one."""
+    snap = Snap()
+    jhelper = JujuHelper(snap.paths.user_data)
+    if output is None:
+        time_stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        extension = STATUS_FORMAT_EXTENSIONS[snapshot_format]
+        output = Path(snap.paths.user_common) / (
+            f"sunbeam-status-{model}-{time_stamp}{extension}"
+        )
+
+    try:
+        with console.status(f"[bold green]Getting status of model {model}..."):
+            model_status = run_sync(jhelper.get_model_status_full(model))
+    except ModelNotFoundException as e:
+        raise click.ClickException(str(e))
+    with output.open("wb") as f:
+        write_status_snapshot(model_status, f, snapshot_format)
+    console.print(f"[green]Status snapshot written to {output}[/green]")
+
+    if diff is None:
+        return
+    changes = diff_status_snapshots(
+        load_status_snapshot(diff), load_status_snapshot(output)
+    )
+    if format == FORMAT_TABLE:
+        table = Table()
+        table.add_column("Change", justify="left")
+        table.add_column("Entity", justify="left")
+        table.add_column("Field", justify="left")
+        table.add_column("Old", justify="left")
+        table.add_column("New", justify="left")
+        for change, entity, field_name, old_value, new_value in changes:
+            table.add_row(
+                change,
+                entity,
+                field_name,
+                "" if old_value is None else str(old_value),
+                "" if new_value is None else str(new_value),
+            )
+        console.print(table)
+    elif format == FORMAT_YAML:
+        console.print(
+            yaml.dump(
+                [
+                    {
+                        "change": change,
+                        "entity": entity,
+                        "field": field_name,
+                        "old": old_value,
+                        "new": new_value,
+                    }
+                    for change, entity, field_name, old_value, new_value in changes
+                ],
+                sort_keys=False,
+            )
+        )
+
+
+@inspect.command()
+@click.option("--kind", help="Only report events of this kind, e.g. step.")
+@click.option(
+    "--events",
+    "paths",
+    multiple=True,
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    help="Event log to read, defaults to the local event log.",
+)
+@click.option(
+    "-f",
+    "--format",
+    type=click.Choice([FORMAT_TABLE, FORMAT_YAML]),
+    default=FORMAT_TABLE,
+    help="Output format.",
+)
+def timings(kind: Optional[str], paths: Tuple[Path, ...], format: str):
+    """Aggregate timings recorded in the event log.
+
+    Event logging is enabled with `snap set openstack logging.events=true`.
+    """
+    if not paths:
+        log_dir = Path(Snap().paths.user_common) / "logs"
+        # Rotated backups first, oldest to newest.
+        paths = tuple(sorted(log_dir.glob(f"{EVENT_LOG_FILE}.*"), reverse=True))
+        paths += tuple(log_dir.glob(EVENT_LOG_FILE))
+    if not paths:
+        raise click.ClickException(
+            "No event log found, enable it with "
+            "`snap set openstack logging.events=true`"
+        )
+
+    results = aggregate_timings(load_events(list(paths)), kind)
+    if format == FORMAT_TABLE:
+        table = Table()
+        table.add_column("Kind", justify="left")
+        table.add_column("Name", justify="left")
+        for column in ("Count", "Runs", "Errors", "p50", "p90", "p99", "Max"):
+            table.add_column(column, justify="right")
+        for timing in results:
+            table.add_row(
+                timing["kind"],
+                timing["name"],
+                str(timing["count"]),
+                str(timing["runs"]),
+                str(timing["errors"]),
+                *(f"{timing[column]:.3f}s" for column in ("p50", "p90", "p99", "max")),
+            )
+        console.print(table)
+    elif format == FORMAT_YAML:
+        console.print(yaml.dump(results, sort_keys=False))
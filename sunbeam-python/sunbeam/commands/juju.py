@@ -22,7 +22,7 @@ import shutil
 import subprocess
 import tempfile
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 
 import pexpect
 import pwgen
@@ -44,6 +44,7 @@ from sunbeam.jobs.juju import (
     ModelNotFoundException,
     run_sync,
 )
+from sunbeam.log import timed_event
 
 LOG = logging.getLogger(__name__)
 PEXPECT_TIMEOUT = 60
@@ -57,6 +58,22 @@ class JujuStepHelper:
         juju_binary = snap.paths.snap / "juju" / "bin" / "juju"
         return str(juju_binary)
 
+    def _debug_log_cmd(self, model_uuid: str, *args: str) -> List[str]:
+        """Command replaying the debug-log of a model to stdout.
+
+        :param args: extra debug-log arguments, e.g. server side filters
+        """
+        # libjuju model.debug_log is broken.
+        return [
+            self._get_juju_binary(),
+            "debug-log",
+            "--model",
+            model_uuid,
+            "--replay",
+            "--no-tail",
+            *args,
+        ]
+
     def _juju_cmd(self, *args):
         """Runs the specified juju command line command
 
@@ -80,9 +97,10 @@ class JujuStepHelper:
         cmd.extend(["--format", "json"])
 
         LOG.debug(f'Running command {" ".join(cmd)}')
-        process = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        with timed_event("subprocess", f"juju {args[0]}" if args else "juju"):
+            process = subprocess.run(cmd, capture_output=True, text=True, check=True)
         LOG.debug(
-            f"Command finished. stdout={process.stdout}, " "stderr={process.stderr}"
+            "Command finished. stdout=%s, stderr=%s", process.stdout, process.stderr
         )
 
         return json.loads(process.stdout.strip())
@@ -164,9 +182,12 @@ class JujuStepHelper:
                 "--client",
             ]
             LOG.debug(f'Running command {" ".join(cmd)}')
-            process = subprocess.run(cmd, capture_output=True, text=True, check=True)
+            with timed_event("subprocess", f"juju {cmd[1]}"):
+                process = subprocess.run(
+                    cmd, capture_output=True, text=True, check=True
+                )
             LOG.debug(
-                f"Command finished. stdout={process.stdout}, stderr={process.stderr}"
+                "Command finished. stdout=%s, stderr=%s", process.stdout, process.stderr
             )
 
         return True
@@ -234,7 +255,9 @@ class BootstrapJujuStep(BaseStep, JujuStepHelper):
         ] = bootstrap_bank.management_cidr.ask()
 
         LOG.debug(self.variables)
-        questions.write_answers(self.client, self._CONFIG, self.variables)
+        questions.write_answers(
+            self.client, self._CONFIG, {"bootstrap": self.variables["bootstrap"]}
+        )
 
     def has_prompts(self) -> bool:
         """Returns true if the step has prompts that it can ask the user.
@@ -286,9 +309,12 @@ class BootstrapJujuStep(BaseStep, JujuStepHelper):
                 self.controller,
             ]
             LOG.debug(f'Running command {" ".join(cmd)}')
-            process = subprocess.run(cmd, capture_output=True, text=True, check=True)
+            with timed_event("subprocess", f"juju {cmd[1]}"):
+                process = subprocess.run(
+                    cmd, capture_output=True, text=True, check=True
+                )
             LOG.debug(
-                f"Command finished. stdout={process.stdout}, stderr={process.stderr}"
+                "Command finished. stdout=%s, stderr=%s", process.stdout, process.stderr
             )
 
             return Result(ResultType.COMPLETED)
@@ -337,9 +363,12 @@ class CreateJujuUserStep(BaseStep, JujuStepHelper):
         try:
             cmd = [self._get_juju_binary(), "add-user", self.username]
             LOG.debug(f'Running command {" ".join(cmd)}')
-            process = subprocess.run(cmd, capture_output=True, text=True, check=True)
+            with timed_event("subprocess", f"juju {cmd[1]}"):
+                process = subprocess.run(
+                    cmd, capture_output=True, text=True, check=True
+                )
             LOG.debug(
-                f"Command finished. stdout={process.stdout}, stderr={process.stderr}"
+                "Command finished. stdout=%s, stderr=%s", process.stdout, process.stderr
             )
 
             re_groups = re.search(
@@ -352,9 +381,12 @@ class CreateJujuUserStep(BaseStep, JujuStepHelper):
             # Grant superuser access to user.
             cmd = [self._get_juju_binary(), "grant", self.username, "superuser"]
             LOG.debug(f'Running command {" ".join(cmd)}')
-            process = subprocess.run(cmd, capture_output=True, text=True, check=True)
+            with timed_event("subprocess", f"juju {cmd[1]}"):
+                process = subprocess.run(
+                    cmd, capture_output=True, text=True, check=True
+                )
             LOG.debug(
-                f"Command finished. stdout={process.stdout}, stderr={process.stderr}"
+                "Command finished. stdout=%s, stderr=%s", process.stdout, process.stderr
             )
 
             # Grant write access to controller model
@@ -367,9 +399,12 @@ class CreateJujuUserStep(BaseStep, JujuStepHelper):
                 CONTROLLER_MODEL,
             ]
             LOG.debug(f'Running command {" ".join(cmd)}')
-            process = subprocess.run(cmd, capture_output=True, text=True, check=True)
+            with timed_event("subprocess", f"juju {cmd[1]}"):
+                process = subprocess.run(
+                    cmd, capture_output=True, text=True, check=True
+                )
             LOG.debug(
-                f"Command finished. stdout={process.stdout}, stderr={process.stderr}"
+                "Command finished. stdout=%s, stderr=%s", process.stdout, process.stderr
             )
 
             return Result(ResultType.COMPLETED, message=token)
@@ -417,9 +452,12 @@ class JujuGrantModelAccessStep(BaseStep, JujuStepHelper):
                 model_with_owner,
             ]
             LOG.debug(f'Running command {" ".join(cmd)}')
-            process = subprocess.run(cmd, capture_output=True, text=True, check=True)
+            with timed_event("subprocess", f"juju {cmd[1]}"):
+                process = subprocess.run(
+                    cmd, capture_output=True, text=True, check=True
+                )
             LOG.debug(
-                f"Command finished. stdout={process.stdout}, stderr={process.stderr}"
+                "Command finished. stdout=%s, stderr=%s", process.stdout, process.stderr
             )
 
             return Result(ResultType.COMPLETED)
@@ -475,9 +513,12 @@ class RemoveJujuUserStep(BaseStep, JujuStepHelper):
         try:
             cmd = [self._get_juju_binary(), "remove-user", self.username, "--yes"]
             LOG.debug(f'Running command {" ".join(cmd)}')
-            process = subprocess.run(cmd, capture_output=True, text=True, check=True)
+            with timed_event("subprocess", f"juju {cmd[1]}"):
+                process = subprocess.run(
+                    cmd, capture_output=True, text=True, check=True
+                )
             LOG.debug(
-                f"Command finished. stdout={process.stdout}, stderr={process.stderr}"
+                "Command finished. stdout=%s, stderr=%s", process.stdout, process.stderr
             )
 
             return Result(ResultType.COMPLETED)
@@ -577,34 +618,36 @@ class RegisterJujuUserStep(BaseStep, JujuStepHelper):
             register_args.append("--replace")
 
         try:
-            child = pexpect.spawn(
-                self._get_juju_binary(),
-                register_args,
-                PEXPECT_TIMEOUT,
-            )
-            with open(log_file, "wb+") as f:
-                # Record the command output, but only the contents streaming from the
-                # process, don't record anything sent to the process as it may contain
-                # sensitive information.
-                child.logfile_read = f
-                while True:
-                    index = child.expect(expect_list, PEXPECT_TIMEOUT)
-                    LOG.debug(
-                        "Juju registraton: expect got regex related to "
-                        f"{expect_list[index]}"
-                    )
-                    if index in (0, 1, 3):
-                        child.sendline(self.juju_account.password)
-                    elif index == 2:
-                        child.sendline(self.controller)
-                    elif index == 4:
-                        result = child.before.decode()
-                        if "ERROR" in result:
-                            str_index = result.find("ERROR")
-                            return Result(ResultType.FAILED, result[str_index:])
-
-                        LOG.debug("User registration completed")
-                        break
+            with timed_event("subprocess", "juju register") as event:
+                child = pexpect.spawn(
+                    self._get_juju_binary(),
+                    register_args,
+                    PEXPECT_TIMEOUT,
+                )
+                with open(log_file, "wb+") as f:
+                    # Record the command output, but only the contents streaming
+                    # from the process, don't record anything sent to the process
+                    # as it may contain sensitive information.
+                    child.logfile_read = f
+                    while True:
+                        index = child.expect(expect_list, PEXPECT_TIMEOUT)
+                        LOG.debug(
+                            "Juju registraton: expect got regex related to "
+                            f"{expect_list[index]}"
+                        )
+                        if index in (0, 1, 3):
+                            child.sendline(self.juju_account.password)
+                        elif index == 2:
+                            child.sendline(self.controller)
+                        elif index == 4:
+                            result = child.before.decode()
+                            if "ERROR" in result:
+                                str_index = result.find("ERROR")
+                                event["outcome"] = "error"
+                                return Result(ResultType.FAILED, result[str_index:])
+
+                            LOG.debug("User registration completed")
+                            break
         except pexpect.TIMEOUT as e:
             LOG.exception(f"Error registering user {self.username} in Juju")
             LOG.warning(e)
@@ -659,32 +702,34 @@ class AddJujuMachineStep(BaseStep, JujuStepHelper):
         auth_message_re = "Are you sure you want to continue connecting"
         expect_list = [auth_message_re, pexpect.EOF]
         try:
-            child = pexpect.spawn(
-                self._get_juju_binary(),
-                ["add-machine", "-m", CONTROLLER_MODEL, f"ssh:{self.machine_ip}"],
-                PEXPECT_TIMEOUT * 5,  # 5 minutes
-            )
-            with open(log_file, "wb+") as f:
-                # Record the command output, but only the contents streaming from the
-                # process, don't record anything sent to the process as it may contain
-                # sensitive information.
-                child.logfile_read = f
-                while True:
-                    index = child.expect(expect_list)
-                    LOG.debug(
-                        "Juju add-machine: expect got regex related to "
-                        f"{expect_list[index]}"
-                    )
-                    if index == 0:
-                        child.sendline("yes")
-                    elif index == 1:
-                        result = child.before.decode()
-                        if "ERROR" in result:
-                            str_index = result.find("ERROR")
-                            return Result(ResultType.FAILED, result[str_index:])
-
-                        LOG.debug("Add machine successful")
-                        break
+            with timed_event("subprocess", "juju add-machine") as event:
+                child = pexpect.spawn(
+                    self._get_juju_binary(),
+                    ["add-machine", "-m", CONTROLLER_MODEL, f"ssh:{self.machine_ip}"],
+                    PEXPECT_TIMEOUT * 5,  # 5 minutes
+                )
+                with open(log_file, "wb+") as f:
+                    # Record the command output, but only the contents streaming
+                    # from the process, don't record anything sent to the process
+                    # as it may contain sensitive information.
+                    child.logfile_read = f
+                    while True:
+                        index = child.expect(expect_list)
+                        LOG.debug(
+                            "Juju add-machine: expect got regex related to "
+                            f"{expect_list[index]}"
+                        )
+                        if index == 0:
+                            child.sendline("yes")
+                        elif index == 1:
+                            result = child.before.decode()
+                            if "ERROR" in result:
+                                str_index = result.find("ERROR")
+                                event["outcome"] = "error"
+                                return Result(ResultType.FAILED, result[str_index:])
+
+                            LOG.debug("Add machine successful")
+                            break
 
             # TODO(hemanth): Need to wait until machine comes to started state
             # from planned state?
@@ -767,9 +812,12 @@ class RemoveJujuMachineStep(BaseStep, JujuStepHelper):
                 "--no-prompt",
             ]
             LOG.debug(f'Running command {" ".join(cmd)}')
-            process = subprocess.run(cmd, capture_output=True, text=True, check=True)
+            with timed_event("subprocess", f"juju {cmd[1]}"):
+                process = subprocess.run(
+                    cmd, capture_output=True, text=True, check=True
+                )
             LOG.debug(
-                f"Command finished. stdout={process.stdout}, stderr={process.stderr}"
+                "Command finished. stdout=%s, stderr=%s", process.stdout, process.stderr
             )
 
             return Result(ResultType.COMPLETED)
@@ -869,123 +917,6 @@ class SaveJujuUserLocallyStep(BaseStep):
         return Result(ResultType.COMPLETED)
 
 
-class WriteJujuStatusStep(BaseStep, JujuStepHelper):
-    """Get the status of the specified model."""
-
-    def __init__(
-        self,
-        jhelper: JujuHelper,
-        model: str,
-        file_path: Path,
-    ):
-        super().__init__("Write Model status", f"Recording status of model {model}")
-
-        self.jhelper = jhelper
-        self.model = model
-        self.file_path = file_path
-
-    def is_skip(self, status: Optional["Status"] = None) -> Result:
-        """Determines if the step should be skipped or not.
-
-        :return: ResultType.SKIPPED if the Step should be skipped,
-                 ResultType.COMPLETED or ResultType.FAILED otherwise
-        """
-        try:
-            run_sync(self.jhelper.get_model(self.model))
-            return Result(ResultType.COMPLETED)
-        except ModelNotFoundException:
-            LOG.debug(f"Model {self.model} not found")
-            return Result(ResultType.SKIPPED)
-
-    def run(self, status: Optional["Status"] = None) -> Result:
-        """Run the step to completion.
-
-        Invoked when the step is run and returns a ResultType to indicate
-
-        :return:
-        """
-        try:
-            LOG.debug(f"Getting juju status for model {self.model}")
-            _status = run_sync(self.jhelper.get_model_status_full(self.model))
-            # Running json.dump directly on the json returned by to_json
-            # results in a single line. There is probably a better way of
-            # doing this.
-            LOG.debug(_status)
-            status = json.loads(_status.to_json())
-
-            if not self.file_path.exists():
-                self.file_path.touch()
-            self.file_path.chmod(0o660)
-            with self.file_path.open("w") as file:
-                json.dump(status, file, ensure_ascii=False, indent=4)
-            return Result(ResultType.COMPLETED, "Inspecting Model Status")
-        except Exception as e:  # noqa
-            return Result(ResultType.FAILED, str(e))
-
-
-class WriteCharmLogStep(BaseStep, JujuStepHelper):
-    """Get logs for the specified model."""
-
-    def __init__(
-        self,
-        jhelper: JujuHelper,
-        model: str,
-        file_path: Path,
-    ):
-        super().__init__(
-            "Get charm logs model", f"Retrieving charm logs for {model} model"
-        )
-        self.jhelper = jhelper
-        self.model = model
-        self.file_path = file_path
-        self.model_uuid = None
-
-    def is_skip(self, status: Optional["Status"] = None) -> Result:
-        """Determines if the step should be skipped or not.
-
-        :return: ResultType.SKIPPED if the Step should be skipped,
-                 ResultType.COMPLETED or ResultType.FAILED otherwise
-        """
-        try:
-            model = run_sync(self.jhelper.get_model(self.model))
-            self.model_uuid = model.info.uuid
-            return Result(ResultType.COMPLETED)
-        except ModelNotFoundException:
-            LOG.debug(f"Model {self.model} not found")
-            return Result(ResultType.SKIPPED)
-
-    def run(self, status: Optional["Status"] = None) -> Result:
-        """Run the step to completion.
-
-        Invoked when the step is run and returns a ResultType to indicate
-
-        :return:
-        """
-        LOG.debug(f"Getting debug logs for model {self.model}")
-        try:
-            # libjuju model.debug_log is broken.
-            cmd = [
-                self._get_juju_binary(),
-                "debug-log",
-                "--model",
-                self.model_uuid,
-                "--replay",
-                "--no-tail",
-            ]
-            # Stream output directly to the file to avoid holding the entire
-            # blob of data in RAM.
-
-            if not self.file_path.exists():
-                self.file_path.touch()
-            self.file_path.chmod(0o660)
-            with self.file_path.open("wb") as file:
-                subprocess.check_call(cmd, stdout=file)
-        except subprocess.CalledProcessError as e:
-            return Result(ResultType.FAILED, str(e))
-
-        return Result(ResultType.COMPLETED, "Inspecting Charm Log")
-
-
 class JujuLoginStep(BaseStep, JujuStepHelper):
     """Login to Juju Controller"""
 
@@ -1016,11 +947,14 @@ class JujuLoginStep(BaseStep, JujuStepHelper):
         )
         LOG.debug(f"Running command {cmd}")
         expect_list = ["^please enter password", "{}", pexpect.EOF]
-        with pexpect.spawn(cmd) as process:
+        with timed_event("subprocess", "juju show-user") as event, pexpect.spawn(
+            cmd
+        ) as process:
             try:
                 index = process.expect(expect_list, timeout=PEXPECT_TIMEOUT)
             except pexpect.TIMEOUT as e:
                 LOG.debug("Process timeout")
+                event["outcome"] = "error"
                 return Result(ResultType.FAILED, str(e))
             LOG.debug(f"Command stdout={process.before}")
         if index in (0, 1):
@@ -1047,16 +981,19 @@ class JujuLoginStep(BaseStep, JujuStepHelper):
             ]
         )
         LOG.debug(f"Running command {cmd}")
-        process = pexpect.spawn(cmd)
-        try:
-            process.expect("^please enter password", timeout=PEXPECT_TIMEOUT)
-            process.sendline(self.juju_account.password)
-            process.expect(pexpect.EOF, timeout=PEXPECT_TIMEOUT)
-            process.close()
-        except pexpect.TIMEOUT as e:
-            LOG.debug("Process timeout")
-            return Result(ResultType.FAILED, str(e))
-        LOG.debug(f"Command stdout={process.before}")
-        if process.exitstatus != 0:
-            return Result(ResultType.FAILED, "Failed to login to Juju Controller")
+        with timed_event("subprocess", "juju login") as event:
+            process = pexpect.spawn(cmd)
+            try:
+                process.expect("^please enter password", timeout=PEXPECT_TIMEOUT)
+                process.sendline(self.juju_account.password)
+                process.expect(pexpect.EOF, timeout=PEXPECT_TIMEOUT)
+                process.close()
+            except pexpect.TIMEOUT as e:
+                LOG.debug("Process timeout")
+                event["outcome"] = "error"
+                return Result(ResultType.FAILED, str(e))
+            LOG.debug(f"Command stdout={process.before}")
+            if process.exitstatus != 0:
+                event["outcome"] = "error"
+                return Result(ResultType.FAILED, "Failed to login to Juju Controller")
         return Result(ResultType.COMPLETED)
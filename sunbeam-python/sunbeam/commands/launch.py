@@ -28,12 +28,27 @@ from snaphelpers import Snap
 from sunbeam.commands.configure import retrieve_admin_credentials
 from sunbeam.commands.openstack import OPENSTACK_MODEL
 from sunbeam.jobs.juju import JujuHelper, ModelNotFoundException, run_sync
+from sunbeam.log import timed_event
 
 LOG = logging.getLogger(__name__)
 console = Console()
 snap = Snap()
 
 
+def _connect(auth_url: str, tf_output: dict) -> openstack.connection.Connection:
+    """Connect as the demo user, authenticating straight away."""
+    conn = openstack.connect(
+        auth_url=auth_url,
+        username=tf_output["OS_USERNAME"]["value"],
+        password=tf_output["OS_PASSWORD"]["value"],
+        project_name=tf_output["OS_PROJECT_NAME"]["value"],
+        user_domain_name=tf_output["OS_USER_DOMAIN_NAME"]["value"],
+        project_domain_name=tf_output["OS_PROJECT_DOMAIN_NAME"]["value"],
+    )
+    conn.authorize()
+    return conn
+
+
 @click.command()
 @click.argument(
     "image_name",
@@ -71,13 +86,14 @@ def launch(image_name: str, key: str, name: Optional[str] = None) -> None:
             terraform = str(snap.paths.snap / "bin" / "terraform")
             cmd = [terraform, "output", "-json"]
             LOG.debug(f'Running command {" ".join(cmd)}')
-            process = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                check=True,
-                cwd=terraform_plan_location,
-            )
+            with timed_event("subprocess", "terraform output"):
+                process = subprocess.run(
+                    cmd,
+                    capture_output=True,
+                    text=True,
+                    check=True,
+                    cwd=terraform_plan_location,
+                )
             tf_output = json.loads(process.stdout)
 
         except subprocess.CalledProcessError:
@@ -86,14 +102,7 @@ def launch(image_name: str, key: str, name: Optional[str] = None) -> None:
 
     console.print("Launching an OpenStack instance ... ")
     try:
-        conn = openstack.connect(
-            auth_url=admin_auth_info.get("OS_AUTH_URL"),
-            username=tf_output["OS_USERNAME"]["value"],
-            password=tf_output["OS_PASSWORD"]["value"],
-            project_name=tf_output["OS_PROJECT_NAME"]["value"],
-            user_domain_name=tf_output["OS_USER_DOMAIN_NAME"]["value"],
-            project_domain_name=tf_output["OS_PROJECT_DOMAIN_NAME"]["value"],
-        )
+        conn = _connect(admin_auth_info["OS_AUTH_URL"], tf_output)
     except openstack.exceptions.SDKException:
         LOG.error("Could not authenticate to Keystone.")
         raise click.ClickException("Unable to connect to OpenStack")
@@ -14,23 +14,31 @@
 # limitations under the License.
 
 import ast
+import asyncio
+import json
 import logging
+import time
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional, Union
 
 import click
 from rich.console import Console
 from rich.status import Status
 
 from sunbeam.clusterd.client import Client
-from sunbeam.clusterd.service import NodeNotExistInClusterException
+from sunbeam.clusterd.service import (
+    ConfigItemNotFoundException,
+    NodeNotExistInClusterException,
+)
 from sunbeam.commands.terraform import TerraformException, TerraformHelper
 from sunbeam.jobs import questions
-from sunbeam.jobs.common import BaseStep, Result, ResultType
+from sunbeam.jobs.common import BaseStep, Result, ResultType, read_config, update_config
 from sunbeam.jobs.juju import (
     MODEL,
     ActionFailedException,
     ApplicationNotFoundException,
+    JujuException,
     JujuHelper,
     TimeoutException,
     UnitNotFoundException,
@@ -44,6 +52,16 @@ MICROCEPH_UNIT_TIMEOUT = (
     1200  # 15 minutes, adding / removing units can take a long time
 )
 OSD_PATH_PREFIX = "/dev/disk/by-id/"
+# Answers are kept per node, under MICROCEPH_CONFIG_KEY-<node>
+MICROCEPH_CONFIG_KEY = "TerraformVarsMicroceph"
+# Maximum number of add-osd actions in flight across all units
+OSD_ENROLLMENT_CONCURRENCY = 4
+# Number of devices handed to a single add-osd action
+OSD_ENROLLMENT_BATCH_SIZE = 4
+OSD_ADDED = "added"
+OSD_FAILED = "failed"
+DISK_INVENTORY_KEY_PREFIX = "DiskInventory-"
+DISK_INVENTORY_TTL = 3600  # 1 hour, disks rarely appear on a running node
 
 
 def microceph_questions():
@@ -54,6 +72,206 @@ def microceph_questions():
     }
 
 
+@dataclass
+class OSDEnrollmentResult:
+    """Outcome of enrolling a single device as an OSD."""
+
+    unit: str
+    device: str
+    status: str
+    message: str = ""
+
+
+@dataclass
+class OSDEnrollmentReport:
+    """Per-device outcome of an OSD enrollment run."""
+
+    results: List[OSDEnrollmentResult] = field(default_factory=list)
+
+    @property
+    def added(self) -> List[OSDEnrollmentResult]:
+        return [result for result in self.results if result.status == OSD_ADDED]
+
+    @property
+    def failed(self) -> List[OSDEnrollmentResult]:
+        return [result for result in self.results if result.status == OSD_FAILED]
+
+    def to_dict(self) -> Dict[str, Dict[str, dict]]:
+        """Report grouped by unit, then by device."""
+        report: Dict[str, Dict[str, dict]] = {}
+        for result in self.results:
+            report.setdefault(result.unit, {})[result.device] = {
+                "status": result.status,
+                "message": result.message,
+            }
+        return report
+
+    def __str__(self) -> str:
+        summary = f"{len(self.added)}/{len(self.results)} OSDs added"
+        failures = [
+            f"{result.unit} {result.device}: {result.message}" for result in self.failed
+        ]
+        if failures:
+            summary += ", failures: " + "; ".join(failures)
+        return summary
+
+
+def load_microceph_answers(client: Client, node: str) -> dict:
+    """Read the microceph answers of node from database."""
+    answers = questions.load_node_answers(client, MICROCEPH_CONFIG_KEY, node)
+    if not answers:
+        # Answers of all nodes used to be kept together under MICROCEPH_CONFIG_KEY
+        legacy = questions.load_answers(client, MICROCEPH_CONFIG_KEY)
+        answers = legacy.get("microceph_config", {}).get(node, {})
+    return answers
+
+
+def split_devices(devices: str) -> List[str]:
+    """Split a comma separated list of devices, preserving order."""
+    return list(
+        dict.fromkeys(device.strip() for device in devices.split(",") if device.strip())
+    )
+
+
+async def enroll_osds(
+    jhelper: JujuHelper,
+    devices: Dict[str, List[str]],
+    model: str = MODEL,
+    batch_size: int = OSD_ENROLLMENT_BATCH_SIZE,
+    concurrency: int = OSD_ENROLLMENT_CONCURRENCY,
+) -> OSDEnrollmentReport:
+    """Add OSDs on several units concurrently.
+
+    Devices of each unit are split in batches of batch_size, one add-osd
+    action is run per batch, with at most concurrency actions in flight.
+    A failed action marks every device of its batch as failed, other
+    batches are not affected.
+
+    :param devices: mapping of unit name to the devices to enroll
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _add_osds(unit: str, batch: List[str]) -> List[OSDEnrollmentResult]:
+        async with semaphore:
+            LOG.debug("Running action add-osd on %s for %s", unit, batch)
+            try:
+                action_result = await jhelper.run_action(
+                    unit,
+                    model,
+                    "add-osd",
+                    action_params={"device-id": ",".join(batch)},
+                )
+            except (UnitNotFoundException, ActionFailedException) as e:
+                LOG.debug("add-osd on %s failed for %s: %s", unit, batch, e)
+                return [
+                    OSDEnrollmentResult(unit, device, OSD_FAILED, str(e))
+                    for device in batch
+                ]
+            LOG.debug("Result after running action add-osd: %s", action_result)
+            return [OSDEnrollmentResult(unit, device, OSD_ADDED) for device in batch]
+
+    tasks = [
+        _add_osds(unit, unit_devices[i : i + batch_size])
+        for unit, unit_devices in devices.items()
+        for i in range(0, len(unit_devices), batch_size)
+    ]
+    report = OSDEnrollmentReport()
+    for results in await asyncio.gather(*tasks):
+        report.results.extend(results)
+    return report
+
+
+def disk_inventory_key(machine_id: str) -> str:
+    return f"{DISK_INVENTORY_KEY_PREFIX}{machine_id}"
+
+
+def parse_disks(raw: str) -> List[str]:
+    """Parse the disk list returned by the list-disks action.
+
+    The action result is expected to be a JSON list of disks, older charm
+    revisions return the python representation of the list instead.
+    """
+    try:
+        disks = json.loads(raw)
+    except json.JSONDecodeError:
+        LOG.debug("list-disks did not return JSON, falling back to literal_eval")
+        disks = ast.literal_eval(raw)
+    paths = [disk.get("path") for disk in disks]
+    # Remove duplicates if any, an empty by-id prefix is not a disk
+    return [path for path in dict.fromkeys(paths) if path and path != OSD_PATH_PREFIX]
+
+
+def load_disk_inventory(
+    client: Client, machine_id: str, ttl: int = DISK_INVENTORY_TTL
+) -> Optional[List[str]]:
+    """Return cached unpartitioned disks of machine, None if missing or stale."""
+    try:
+        inventory = read_config(client, disk_inventory_key(machine_id))
+    except ConfigItemNotFoundException:
+        return None
+    if time.time() - inventory.get("timestamp", 0) > ttl:
+        LOG.debug("Disk inventory of machine %s is stale", machine_id)
+        return None
+    return inventory.get("unpartitioned-disks", [])
+
+
+def store_disk_inventory(client: Client, machine_id: str, disks: List[str]) -> None:
+    update_config(
+        client,
+        disk_inventory_key(machine_id),
+        {"timestamp": time.time(), "unpartitioned-disks": disks},
+    )
+
+
+def invalidate_disk_inventory(client: Client, machine_id: str) -> None:
+    try:
+        client.cluster.delete_config(disk_inventory_key(machine_id))
+    except ConfigItemNotFoundException:
+        pass
+
+
+async def list_unpartitioned_disks(
+    jhelper: JujuHelper, machine_id: str, model: str = MODEL
+) -> List[str]:
+    """Run list-disks on the microceph unit of machine.
+
+    :raises: UnitNotFoundException, ActionFailedException
+    """
+    unit = await jhelper.get_unit_from_machine(APPLICATION, machine_id, model)
+    if unit is None:
+        raise UnitNotFoundException(
+            f"No {APPLICATION} unit found on machine {machine_id}"
+        )
+    LOG.debug("Running action list-disks on %s", unit.entity_id)
+    action_result = await jhelper.run_action(unit.entity_id, model, "list-disks")
+    LOG.debug("Result after running action list-disks: %s", action_result)
+    return parse_disks(action_result.get("unpartitioned-disks", "[]"))
+
+
+async def refresh_disk_inventories(
+    jhelper: JujuHelper, client: Client, machine_ids: List[str]
+) -> Dict[str, Union[List[str], JujuException]]:
+    """List disks of all machines concurrently and update the cache.
+
+    :returns: mapping of machine id to its disks, or to the error raised
+              while listing them
+    """
+    results = await asyncio.gather(
+        *(list_unpartitioned_disks(jhelper, machine_id) for machine_id in machine_ids),
+        return_exceptions=True,
+    )
+    inventories = {}
+    for machine_id, result in zip(machine_ids, results):
+        if isinstance(result, (UnitNotFoundException, ActionFailedException)):
+            LOG.debug("Failed to list disks on machine %s: %s", machine_id, result)
+        elif isinstance(result, BaseException):
+            raise result
+        else:
+            store_disk_inventory(client, machine_id, result)
+        inventories[machine_id] = result
+    return inventories
+
+
 class DeployMicrocephApplicationStep(BaseStep):
     """Deploy Microceph application using Terraform"""
 
@@ -227,7 +445,7 @@ class RemoveMicrocephUnitStep(BaseStep):
 class ConfigureMicrocephOSDStep(BaseStep):
     """Configure Microceph OSD disks"""
 
-    _CONFIG = "TerraformVarsMicroceph"
+    _CONFIG = MICROCEPH_CONFIG_KEY
 
     def __init__(
         self,
@@ -247,41 +465,39 @@ class ConfigureMicrocephOSDStep(BaseStep):
         self.disks = ""
 
     def microceph_config_questions(self):
-        disks = self.get_unpartitioned_disks()
-        disks_str = None
-        if len(disks) > 0:
-            disks_str = ",".join(disks)
-
         questions = microceph_questions()
-        # Specialise question with local disk information.
-        questions["osd_devices"].default_value = disks_str
+        # Specialise question with local disk information, only listed
+        # when neither a preseed nor a previous answer is available.
+        questions["osd_devices"].default_function = self.get_default_disks
         return questions
 
-    def get_unpartitioned_disks(self) -> list:
-        unpartitioned_disks = []
+    def get_default_disks(self) -> Optional[str]:
+        disks = self.get_unpartitioned_disks()
+        if len(disks) > 0:
+            return ",".join(disks)
+        return None
 
-        try:
+    def get_machine_id(self) -> str:
+        if not self.machine_id:
             node = self.client.cluster.get_node_info(self.name)
             self.machine_id = str(node.get("machineid"))
-            unit = run_sync(
-                self.jhelper.get_unit_from_machine(APPLICATION, self.machine_id, MODEL)
-            )
-            LOG.debug(f"Running action list-disks on {unit.entity_id}")
-            action_result = run_sync(
-                self.jhelper.run_action(unit.entity_id, MODEL, "list-disks")
-            )
-            LOG.debug(f"Result after running action list-disks: {action_result}")
+        return self.machine_id
 
-            disks = ast.literal_eval(action_result.get("unpartitioned-disks", "[]"))
-            unpartitioned_disks = [disk.get("path") for disk in disks]
-            # Remove duplicates if any
-            unpartitioned_disks = list(set(unpartitioned_disks))
-            if OSD_PATH_PREFIX in unpartitioned_disks:
-                unpartitioned_disks.remove(OSD_PATH_PREFIX)
+    def get_unpartitioned_disks(self) -> list:
+        machine_id = self.get_machine_id()
+        unpartitioned_disks = load_disk_inventory(self.client, machine_id)
+        if unpartitioned_disks is not None:
+            LOG.debug("Using cached disk inventory of machine %s", machine_id)
+            return unpartitioned_disks
 
+        try:
+            unpartitioned_disks = run_sync(
+                list_unpartitioned_disks(self.jhelper, machine_id)
+            )
         except (UnitNotFoundException, ActionFailedException) as e:
             LOG.debug(str(e))
             raise click.ClickException("Unable to list disks")
+        store_disk_inventory(self.client, machine_id, unpartitioned_disks)
 
         LOG.debug(f"Unpartitioned disks: {unpartitioned_disks}")
         return unpartitioned_disks
@@ -293,9 +509,8 @@ class ConfigureMicrocephOSDStep(BaseStep):
         running the step. Steps should not expect that the prompt will be
         available and should provide a reasonable default where possible.
         """
-        self.variables = questions.load_answers(self.client, self._CONFIG)
-        self.variables.setdefault("microceph_config", {})
-        self.variables["microceph_config"].setdefault(self.name, {"osd_devices": ""})
+        self.variables = load_microceph_answers(self.client, self.name)
+        self.variables.setdefault("osd_devices", "")
 
         if self.preseed_file:
             preseed = questions.read_preseed(self.preseed_file)
@@ -309,15 +524,17 @@ class ConfigureMicrocephOSDStep(BaseStep):
             questions=self.microceph_config_questions(),
             console=console,  # type: ignore
             preseed=preseed.get("microceph_config").get(self.name),
-            previous_answers=self.variables.get("microceph_config").get(self.name),
+            previous_answers=self.variables,
             accept_defaults=self.accept_defaults,
         )
         # Microceph configuration
         self.disks = microceph_config_bank.osd_devices.ask()
-        self.variables["microceph_config"][self.name]["osd_devices"] = self.disks
+        self.variables["osd_devices"] = self.disks
 
         LOG.debug(self.variables)
-        questions.write_answers(self.client, self._CONFIG, self.variables)
+        questions.write_node_answers(
+            self.client, self._CONFIG, self.name, self.variables
+        )
 
     def has_prompts(self) -> bool:
         """Returns true if the step has prompts that it can ask the user.
@@ -345,22 +562,28 @@ class ConfigureMicrocephOSDStep(BaseStep):
         """Configure local disks on microceph."""
         try:
             unit = run_sync(
-                self.jhelper.get_unit_from_machine(APPLICATION, self.machine_id, MODEL)
-            )
-            LOG.debug(f"Running action add-osd on {unit.entity_id}")
-            action_result = run_sync(
-                self.jhelper.run_action(
-                    unit.entity_id,
-                    MODEL,
-                    "add-osd",
-                    action_params={
-                        "device-id": self.disks,
-                    },
+                self.jhelper.get_unit_from_machine(
+                    APPLICATION, self.get_machine_id(), MODEL
                 )
             )
-            LOG.debug(f"Result after running action add-osd: {action_result}")
-        except (UnitNotFoundException, ActionFailedException) as e:
+        except (NodeNotExistInClusterException, UnitNotFoundException) as e:
             LOG.debug(str(e))
             return Result(ResultType.FAILED, str(e))
+        if unit is None:
+            return Result(
+                ResultType.FAILED,
+                f"No {APPLICATION} unit found on machine {self.machine_id}",
+            )
 
-        return Result(ResultType.COMPLETED)
+        if status is not None:
+            status.update(self.status + "adding OSDs")
+        report = run_sync(
+            enroll_osds(self.jhelper, {unit.entity_id: split_devices(self.disks)})
+        )
+        LOG.debug("OSD enrollment report: %s", report.to_dict())
+        # Added disks are no longer unpartitioned
+        invalidate_disk_inventory(self.client, self.machine_id)
+        if report.failed:
+            return Result(ResultType.FAILED, str(report))
+
+        return Result(ResultType.COMPLETED, report)
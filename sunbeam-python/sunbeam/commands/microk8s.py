@@ -130,7 +130,9 @@ class DeployMicrok8sApplicationStep(BaseStep, JujuStepHelper):
         self.variables["addons"]["hostpath-storage"] = ""
 
         LOG.debug(self.variables)
-        questions.write_answers(self.client, self._CONFIG, self.variables)
+        self.variables = questions.write_answers(
+            self.client, self._CONFIG, {"addons": self.variables["addons"]}
+        )
         # Write answers to terraform location as a separate variables file
         self.tfhelper.write_tfvars(self.variables, self.answer_file)
 
@@ -12,6 +12,7 @@
 # implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import asyncio
 import logging
 from typing import Optional
 
@@ -27,6 +28,13 @@ from sunbeam.jobs.juju import (
 )
 
 MAX_CONNECTIONS = 500
+SERVERCONFIG_USERNAME = "serverconfig"
+
+# Global variables set on every MySQL application once deployed.
+# All settings are applied with a single command per application.
+MYSQL_SETTINGS = {
+    "max_connections": MAX_CONNECTIONS,
+}
 
 LOG = logging.getLogger(__name__)
 
@@ -43,12 +51,20 @@ def get_mysqls(jhelper: JujuHelper) -> list[str]:
     return mysqls
 
 
+def settings_statement(settings: dict) -> str:
+    """Build the SQL statement applying settings as global variables."""
+    return "; ".join(
+        f"set global {variable} = {value}" for variable, value in settings.items()
+    )
+
+
 class ConfigureMySQLStep(BaseStep):
     """Post Deployment step to configure MySQL."""
 
-    def __init__(self, jhelper: JujuHelper):
+    def __init__(self, jhelper: JujuHelper, settings: Optional[dict] = None):
         super().__init__("Configure MySQL", "Configure MySQL")
         self.jhelper = jhelper
+        self.settings = MYSQL_SETTINGS if settings is None else settings
 
     def is_skip(self, status: Optional[Status] = None) -> Result:
         """Determines if the step should be skipped or not.
@@ -69,6 +85,69 @@ class ConfigureMySQLStep(BaseStep):
 
         return Result(ResultType.COMPLETED)
 
+    async def configure_mysql(self, mysql: str) -> None:
+        """Apply settings on the leader of a MySQL application."""
+        LOG.debug(f"Configuring {mysql}")
+        username = SERVERCONFIG_USERNAME
+        try:
+            leader = await self.jhelper.get_leader_unit(mysql, OPENSTACK_MODEL)
+        except JujuException:
+            LOG.debug(f"Failed to get {mysql} leader", exc_info=True)
+            raise
+        try:
+            result = await self.jhelper.run_action(
+                leader, OPENSTACK_MODEL, "get-password", {"username": username}
+            )
+        except JujuException:
+            LOG.debug(f"Failed to get {leader} password for {username}", exc_info=True)
+            raise
+        password = result.get("password")
+        if password is None:
+            raise JujuException(f"No password for {username} returned by {leader}")
+        cmd = " ".join(
+            [
+                "mysql",
+                "-u",
+                username,
+                # password cannot be separated from -p
+                f"-p{password}",
+                "-e",
+                # this is executed in shell script, quotes needed
+                f"'{settings_statement(self.settings)}'",
+            ]
+        )
+        try:
+            await self.jhelper.run_cmd_on_unit_payload(
+                leader, OPENSTACK_MODEL, cmd, "mysql"
+            )
+        except JujuException:
+            LOG.debug(f"Failed to apply settings on {mysql}", exc_info=True)
+            raise
+
+    async def configure_mysqls(self, mysqls: list[str]) -> dict:
+        """Configure all MySQL applications concurrently.
+
+        :returns: mapping of application name to the error raised while
+                  configuring it, empty if all succeeded
+        """
+        try:
+            # Resolve all leaders with one status call, configure_mysql
+            # then reads them from the cache.
+            await self.jhelper.get_leader_units(mysqls, OPENSTACK_MODEL)
+        except JujuException:
+            LOG.debug("Failed to prefetch MySQL leaders", exc_info=True)
+        results = await asyncio.gather(
+            *(self.configure_mysql(mysql) for mysql in mysqls),
+            return_exceptions=True,
+        )
+        errors = {}
+        for mysql, result in zip(mysqls, results):
+            if isinstance(result, JujuException):
+                errors[mysql] = result
+            elif isinstance(result, BaseException):
+                raise result
+        return errors
+
     def run(self, status: Optional[Status] = None) -> Result:
         """Runs the step.
 
@@ -80,46 +159,11 @@ class ConfigureMySQLStep(BaseStep):
         except JujuException as e:
             return Result(ResultType.FAILED, str(e))
 
-        username = "serverconfig"
-        for mysql in mysqls:
-            LOG.debug(f"Configuring {mysql}")
-            try:
-                leader = run_sync(self.jhelper.get_leader_unit(mysql, OPENSTACK_MODEL))
-            except JujuException as e:
-                LOG.debug(f"Failed to get {mysql} leader", exc_info=True)
-                return Result(ResultType.FAILED, str(e))
-            try:
-                result = run_sync(
-                    self.jhelper.run_action(
-                        leader, OPENSTACK_MODEL, "get-password", {"username": username}
-                    )
-                )
-            except JujuException as e:
-                LOG.debug(
-                    f"Failed to get {leader} password for {username}", exc_info=True
-                )
-                return Result(ResultType.FAILED, str(e))
-            password = result["password"]
-            cmd = " ".join(
-                [
-                    "mysql",
-                    "-u",
-                    username,
-                    # password cannot be separated from -p
-                    f"-p{password}",
-                    "-e",
-                    # this is executed in shell script, quotes needed
-                    f"'set global max_connections = {MAX_CONNECTIONS}'",
-                ]
+        errors = run_sync(self.configure_mysqls(mysqls))
+        if errors:
+            return Result(
+                ResultType.FAILED,
+                "; ".join(f"{mysql}: {error}" for mysql, error in errors.items()),
             )
-            try:
-                run_sync(
-                    self.jhelper.run_cmd_on_unit_payload(
-                        leader, OPENSTACK_MODEL, cmd, "mysql"
-                    )
-                )
-            except JujuException as e:
-                LOG.debug(f"Failed to set max_connections on {mysql}", exc_info=True)
-                return Result(ResultType.FAILED, str(e))
 
         return Result(ResultType.COMPLETED)
@@ -25,6 +25,7 @@ from rich.table import Table
 from snaphelpers import Snap
 
 from sunbeam import utils
+from sunbeam.clusterd.client import Client
 from sunbeam.commands.clusterd import (
     ClusterAddJujuUserStep,
     ClusterAddNodeStep,
@@ -51,6 +52,7 @@ from sunbeam.commands.microceph import (
     AddMicrocephUnitStep,
     ConfigureMicrocephOSDStep,
     RemoveMicrocephUnitStep,
+    refresh_disk_inventories,
 )
 from sunbeam.commands.microk8s import AddMicrok8sUnitStep, RemoveMicrok8sUnitStep
 from sunbeam.commands.openstack import OPENSTACK_MODEL
@@ -74,7 +76,7 @@ from sunbeam.jobs.common import (
     run_preflight_checks,
     validate_roles,
 )
-from sunbeam.jobs.juju import CONTROLLER, JujuHelper
+from sunbeam.jobs.juju import CONTROLLER, JujuHelper, run_sync
 
 LOG = logging.getLogger(__name__)
 console = Console()
@@ -351,3 +353,49 @@ def remove(name: str) -> None:
         f"Run command 'sudo /sbin/remove-juju-services' on node {name} "
         "to reuse the machine."
     )
+
+
+@click.command()
+@click.option(
+    "-f",
+    "--format",
+    type=click.Choice([FORMAT_TABLE, FORMAT_YAML]),
+    default=FORMAT_TABLE,
+    help="Output format.",
+)
+def refresh_disks(format: str) -> None:
+    """Refresh the cached disk inventory of all storage nodes."""
+    preflight_checks = [DaemonGroupCheck()]
+    run_preflight_checks(preflight_checks, console)
+
+    client = Client()
+    jhelper = JujuHelper(snap.paths.user_data)
+    nodes = {
+        str(node["machineid"]): node["name"]
+        for node in client.cluster.list_nodes_by_role("storage")
+    }
+    with console.status("Listing disks on storage nodes ... "):
+        inventories = run_sync(refresh_disk_inventories(jhelper, client, [*nodes]))
+
+    if format == FORMAT_TABLE:
+        table = Table()
+        table.add_column("Node", justify="left")
+        table.add_column("Unpartitioned disks", justify="left")
+        for machine_id, disks in inventories.items():
+            if isinstance(disks, Exception):
+                table.add_row(nodes[machine_id], f"[red]{disks}[/red]")
+            else:
+                table.add_row(nodes[machine_id], "\n".join(disks))
+        console.print(table)
+    elif format == FORMAT_YAML:
+        click.echo(
+            yaml.dump(
+                {
+                    nodes[machine_id]: (
+                        str(disks) if isinstance(disks, Exception) else disks
+                    )
+                    for machine_id, disks in inventories.items()
+                },
+                sort_keys=True,
+            )
+        )
@@ -19,6 +19,7 @@ import click
 from rich.console import Console
 from snaphelpers import Snap
 
+from sunbeam.commands.configure import get_admin_account
 from sunbeam.commands.openstack import OPENSTACK_MODEL
 from sunbeam.jobs import juju
 from sunbeam.jobs.checks import DaemonGroupCheck, VerifyBootstrappedCheck
@@ -30,7 +31,13 @@ snap = Snap()
 
 
 @click.command()
-def openrc() -> None:
+@click.option(
+    "--refresh",
+    is_flag=True,
+    default=False,
+    help="Ignore cached credentials and query the Keystone service.",
+)
+def openrc(refresh: bool = False) -> None:
     """Retrieve openrc for cloud admin account."""
     preflight_checks = []
     preflight_checks.append(DaemonGroupCheck())
@@ -41,19 +48,5 @@ def openrc() -> None:
     jhelper = juju.JujuHelper(data_location)
 
     with console.status("Retrieving openrc from Keystone service ... "):
-        # Retrieve config from juju actions
-        model = OPENSTACK_MODEL
-        app = "keystone"
-        action_cmd = "get-admin-account"
-        unit = juju.run_sync(jhelper.get_leader_unit(app, model))
-        if not unit:
-            _message = f"Unable to get {app} leader"
-            raise click.ClickException(_message)
-
-        action_result = juju.run_sync(jhelper.run_action(unit, model, action_cmd))
-
-        if action_result.get("return-code", 0) > 1:
-            _message = "Unable to retrieve openrc from Keystone service"
-            raise click.ClickException(_message)
-        else:
-            console.print(action_result.get("openrc"))
+        action_result = get_admin_account(jhelper, OPENSTACK_MODEL, refresh=refresh)
+        console.print(action_result.get("openrc"))
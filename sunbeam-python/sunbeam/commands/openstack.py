@@ -15,7 +15,8 @@
 
 import asyncio
 import logging
-from typing import List, Optional
+from fnmatch import fnmatch
+from typing import Iterable, List, Optional
 
 from juju.client.client import FullStatus
 from lightkube.core import exceptions
@@ -41,8 +42,8 @@ from sunbeam.jobs.common import (
     Result,
     ResultType,
     get_host_total_ram,
+    modify_config,
     read_config,
-    update_config,
 )
 from sunbeam.jobs.juju import (
     CONTROLLER_MODEL,
@@ -60,6 +61,65 @@ METALLB_ANNOTATION = "metallb.universe.tf/loadBalancerIPs"
 
 CONFIG_KEY = "TerraformVarsOpenstack"
 TOPOLOGY_KEY = "Topology"
+# Applications of the openstack plan known not to change with each scale
+# variable, per-service databases and routers are matched by the patterns.
+# Any other application is waited on after the variable changed.
+UNSCALED_APPLICATIONS = {
+    "ha-scale": [
+        "keystone",
+        "glance",
+        "nova",
+        "placement",
+        "neutron",
+        "horizon",
+        "cinder",
+        "cinder-ceph",
+        "ovn-relay",
+        "*-mysql-router",
+        "traefik",
+        "traefik-*",
+    ],
+    "os-api-scale": [
+        "mysql",
+        "*-mysql",
+        "rabbitmq",
+        "ovn-central",
+        "traefik",
+        "traefik-*",
+    ],
+    "ingress-scale": [
+        "mysql",
+        "*-mysql",
+        "*-mysql-router",
+        "rabbitmq",
+        "ovn-central",
+        "ovn-relay",
+        "keystone",
+        "glance",
+        "nova",
+        "placement",
+        "neutron",
+        "horizon",
+        "cinder",
+        "cinder-ceph",
+    ],
+    "ceph-osd-replication-count": [
+        "mysql",
+        "*-mysql",
+        "*-mysql-router",
+        "rabbitmq",
+        "ovn-central",
+        "ovn-relay",
+        "keystone",
+        "nova",
+        "placement",
+        "neutron",
+        "horizon",
+        "cinder",
+        "traefik",
+        "traefik-*",
+    ],
+}
 
 
 def determine_target_topology_at_bootstrap() -> str:
@@ -75,19 +135,24 @@ def determine_target_topology_at_bootstrap() -> str:
     return "multi"
 
 
-def determine_target_topology(client: Client) -> str:
+def determine_target_topology(client: Client, summary: Optional[dict] = None) -> str:
     """Determines the target topology.
 
     Use information from clusterdb to infer deployment
-    topology.
+    topology. summary is the cluster summary, fetched if
+    not given.
     """
-    control_nodes = client.cluster.list_nodes_by_role("control")
-    compute_nodes = client.cluster.list_nodes_by_role("compute")
-    combined = set(node["name"] for node in control_nodes + compute_nodes)
+    if summary is None:
+        summary = client.cluster.get_cluster_summary()
+    combined = sum(
+        1
+        for member in summary["members"]
+        if {"control", "compute"}.intersection(member["role"])
+    )
     host_total_ram = get_host_total_ram()
-    if len(combined) == 1 and host_total_ram < RAM_32_GB_IN_KB:
+    if combined == 1 and host_total_ram < RAM_32_GB_IN_KB:
         topology = "single"
-    elif len(combined) < 10:
+    elif combined < 10:
         topology = "multi"
     else:
         topology = "large"
@@ -123,6 +188,36 @@ def compute_ceph_replica_scale(topology: str, storage_nodes: int) -> int:
     return min(storage_nodes, 3)
 
 
+def compute_scale(topology: str, control_nodes: int, storage_nodes: int) -> dict:
+    """Terraform variables scaling the control plane for topology."""
+    return {
+        "ha-scale": compute_ha_scale(topology),
+        "os-api-scale": compute_os_api_scale(topology, control_nodes),
+        "ingress-scale": compute_ingress_scale(topology, control_nodes),
+        "ceph-osd-replication-count": compute_ceph_replica_scale(
+            topology, storage_nodes
+        ),
+    }
+
+
+def affected_applications(changed: Iterable[str], applications: List[str]) -> List[str]:
+    """Applications among applications that may change with the changed variables.
+
+    Only applications listed in UNSCALED_APPLICATIONS for every changed
+    variable are left out.
+    """
+
+    def unscaled(application: str, variable: str) -> bool:
+        patterns = UNSCALED_APPLICATIONS.get(variable, [])
+        return any(fnmatch(application, pattern) for pattern in patterns)
+
+    return [
+        application
+        for application in applications
+        if not all(unscaled(application, variable) for variable in changed)
+    ]
+
+
 class DeployControlPlaneStep(BaseStep, JujuStepHelper):
     """Deploy OpenStack using Terraform cloud"""
 
@@ -199,10 +294,14 @@ class DeployControlPlaneStep(BaseStep, JujuStepHelper):
         # - Enabling HA
         # - Enabling/disabling specific services
         # - Switch channels for the charmed operators
-        update_config(
+        modify_config(
             self.client,
             TOPOLOGY_KEY,
-            {"topology": self.topology, "database": self.database},
+            lambda config: {
+                **config,
+                "topology": self.topology,
+                "database": self.database,
+            },
         )
         tfvars = {
             "model": self.model,
@@ -215,7 +314,15 @@ class DeployControlPlaneStep(BaseStep, JujuStepHelper):
             "many-mysql": self.database == "multi",
         }
         tfvars.update(self.get_storage_tfvars())
-        update_config(self.client, self._CONFIG, tfvars)
+
+        def merge_tfvars(config: dict) -> dict:
+            # Keep the scale set by resize
+            config = {**config, **tfvars}
+            if not tfvars["enable-ceph"]:
+                config.pop("ceph-offer-url", None)
+            return config
+
+        tfvars = modify_config(self.client, self._CONFIG, merge_tfvars)
         self.tfhelper.write_tfvars(tfvars)
         if status is not None:
             status.update(self.status + "deploying services")
@@ -316,12 +423,12 @@ class ResizeControlPlaneStep(BaseStep, JujuStepHelper):
     def run(self, status: Optional[Status] = None) -> Result:
         """Execute configuration using terraform."""
         client = Client()
-        topology_dict = read_config(client, TOPOLOGY_KEY)
+        summary = client.cluster.get_cluster_summary()
         if self.topology == "auto":
-            topology = determine_target_topology(client)
+            topology = determine_target_topology(client, summary)
         else:
             topology = self.topology
-        topology_dict["topology"] = topology
+        topology_dict = read_config(client, TOPOLOGY_KEY)
         is_not_compatible = (
             topology_dict["database"] == "single" and topology == "large"
         )
@@ -333,25 +440,19 @@ class ResizeControlPlaneStep(BaseStep, JujuStepHelper):
                     " use -f/--force to override"
                 ),
             )
-        update_config(
-            client,
-            TOPOLOGY_KEY,
-            topology_dict,
-        )
-        tf_vars = read_config(client, self._CONFIG)
-        control_nodes = client.cluster.list_nodes_by_role("control")
-        storage_nodes = client.cluster.list_nodes_by_role("storage")
-        tf_vars.update(
-            {
-                "ha-scale": compute_ha_scale(topology),
-                "os-api-scale": compute_os_api_scale(topology, len(control_nodes)),
-                "ingress-scale": compute_ingress_scale(topology, len(control_nodes)),
-                "ceph-osd-replication-count": compute_ceph_replica_scale(
-                    topology, len(storage_nodes)
-                ),
-            }
+
+        control_nodes = summary["roles"].get("control", 0)
+        storage_nodes = summary["roles"].get("storage", 0)
+        scale = compute_scale(topology, control_nodes, storage_nodes)
+        # The topology model records the scale last applied
+        applied = (topology_dict.get("topology"), topology_dict.get("scale"))
+        if applied == (topology, scale):
+            LOG.debug(f"Control plane already scaled for {topology}: {scale}")
+            return Result(ResultType.COMPLETED)
+
+        tf_vars = modify_config(
+            client, self._CONFIG, lambda tf_vars: {**tf_vars, **scale}
         )
-        update_config(client, self._CONFIG, tf_vars)
         self.tfhelper.write_tfvars(tf_vars)
         try:
             self.tfhelper.apply()
@@ -364,18 +465,38 @@ class ResizeControlPlaneStep(BaseStep, JujuStepHelper):
             apps = run_sync(self.jhelper.get_application_names(self.model))
             if not storage_nodes and "cinder-ceph" in apps:
                 apps.remove("cinder-ceph")
-
-            run_sync(
-                self.jhelper.wait_until_active(
-                    self.model,
-                    apps,
-                    timeout=OPENSTACK_DEPLOY_TIMEOUT,
+            # Only wait on the applications scaled differently than last time
+            if (applied_scale := topology_dict.get("scale")) is not None:
+                changed = [
+                    variable
+                    for variable, value in scale.items()
+                    if applied_scale.get(variable) != value
+                ]
+                apps = affected_applications(changed, apps)
+            LOG.debug(f"Application monitored for readiness: {apps}")
+
+            # No applications would mean waiting on the whole model
+            if apps:
+                run_sync(
+                    self.jhelper.wait_until_active(
+                        self.model,
+                        apps,
+                        timeout=OPENSTACK_DEPLOY_TIMEOUT,
+                    )
                 )
-            )
         except (JujuWaitException, TimeoutException) as e:
             LOG.warning(str(e))
             return Result(ResultType.FAILED, str(e))
 
+        modify_config(
+            client,
+            TOPOLOGY_KEY,
+            lambda topology_dict: {
+                **topology_dict,
+                "topology": topology,
+                "scale": scale,
+            },
+        )
         return Result(ResultType.COMPLETED)
 
 
@@ -13,11 +13,16 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import contextlib
 import json
 import logging
 import os
+import pwd
+import re
+import socket
 import subprocess
-from datetime import datetime
+import threading
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from string import Template
 from typing import Optional
@@ -27,11 +32,23 @@ from snaphelpers import Snap
 
 from sunbeam import utils
 from sunbeam.clusterd.client import Client as clusterClient
+from sunbeam.clusterd.service import (
+    ConfigItemNotFoundException,
+    TerraformLockConflictException,
+    TerraformLockNotFoundException,
+)
 from sunbeam.jobs.common import BaseStep, Result, ResultType
 from sunbeam.jobs.juju import JujuAccount, JujuController
+from sunbeam.log import timed_event
 
 LOG = logging.getLogger(__name__)
 
+# Lease on terraform locks granted by clusterd, in seconds, an expired lock
+# is taken over by the next terraform run.
+LOCK_LEASE_TTL = 300
+# Seconds between renewals of the lease while terraform runs
+LOCK_HEARTBEAT_INTERVAL = 60
+
 http_backend_template = """
 terraform {
   backend "http" {
@@ -58,14 +75,109 @@ provider_installation {
 class TerraformException(Exception):
     """Terraform related exceptions"""
 
-    def __init__(self, message):
+    def __init__(self, message, output: str = ""):
         super().__init__()
         self.message = message
+        # stderr of the failed terraform command, if any
+        self.output = output
 
     def __str__(self) -> str:
         return self.message
 
 
+def parse_lock_time(value: str) -> datetime:
+    """Parse a timestamp of a terraform lock, as written by Go."""
+    # Go writes up to nanoseconds, datetime holds microseconds
+    value = re.sub(r"(\.\d{6})\d+", r"\1", value)
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def lock_expiry(lock: dict) -> datetime:
+    """When the lease on lock ends."""
+    expires = lock.get("Expires")
+    if expires and not expires.startswith("0001-01-01"):
+        return parse_lock_time(expires)
+    # Locks taken before clusterd granted leases
+    return parse_lock_time(lock["Created"]) + timedelta(seconds=LOCK_LEASE_TTL)
+
+
+def lock_expired(lock: dict) -> bool:
+    return datetime.now(timezone.utc) > lock_expiry(lock)
+
+
+def lock_owner() -> str:
+    """Who terraform records on the locks it takes from this process."""
+    # terraform writes user@hostname, the user looked up from the process uid
+    try:
+        user = pwd.getpwuid(os.getuid()).pw_name
+    except KeyError:
+        user = ""
+    return f"{user}@{socket.gethostname()}"
+
+
+class LockHeartbeat:
+    """Renew the lease on the lock of a plan while terraform runs.
+
+    terraform takes the lock itself: the heartbeat adopts the first lock on
+    the plan taken by this user and host after it started, and renews it
+    every interval seconds until stopped. Locks held by anybody else are
+    left alone.
+    """
+
+    def __init__(self, plan: str, interval: float = LOCK_HEARTBEAT_INTERVAL):
+        self.plan = plan
+        self.interval = interval
+        self.client = clusterClient()
+        self.lock: Optional[dict] = None
+        self.owner = lock_owner()
+        self._started = datetime.now(timezone.utc)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "LockHeartbeat":
+        self._started = datetime.now(timezone.utc)
+        self._thread = threading.Thread(
+            target=self._run, name=f"terraform-lease-{self.plan}", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.beat()
+            except (
+                TerraformLockNotFoundException,
+                TerraformLockConflictException,
+            ) as e:
+                # The lock was released or taken over, nothing left to renew.
+                LOG.warning("Stopped renewing lock on plan %s: %s", self.plan, e)
+                return
+            except Exception:
+                LOG.warning("Failed to renew lock on plan %s", self.plan, exc_info=True)
+
+    def beat(self) -> bool:
+        """Renew the lease, return whether there was a lock to renew."""
+        if self.lock is None:
+            try:
+                lock = self.client.cluster.get_terraform_lock(self.plan)
+            except ConfigItemNotFoundException:
+                return False
+            if lock.get("Who") != self.owner:
+                return False
+            if parse_lock_time(lock["Created"]) < self._started:
+                return False
+            self.lock = lock
+        self.lock = self.client.cluster.renew_terraform_lock(self.plan, self.lock)
+        LOG.debug("Renewed lock on plan %s until %s", self.plan, self.lock["Expires"])
+        return True
+
+
 class TerraformHelper:
     """Helper for interaction with Terraform"""
 
@@ -145,6 +257,12 @@ class TerraformHelper:
 
         return os_env
 
+    def lock_heartbeat(self):
+        """Keep the lease on the plan lock while terraform runs."""
+        if self.backend == "http":
+            return LockHeartbeat(self.plan)
+        return contextlib.nullcontext()
+
     def init(self) -> None:
         """terraform init"""
         os_env = os.environ.copy()
@@ -162,19 +280,20 @@ class TerraformHelper:
         try:
             cmd = [self.terraform, "init", "-upgrade", "-no-color"]
             LOG.debug(f'Running command {" ".join(cmd)}')
-            process = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                check=True,
-                cwd=self.path,
-                env=os_env,
-            )
+            with timed_event("subprocess", "terraform init", plan=self.plan):
+                process = subprocess.run(
+                    cmd,
+                    capture_output=True,
+                    text=True,
+                    check=True,
+                    cwd=self.path,
+                    env=os_env,
+                )
             LOG.debug(
-                f"Command finished. stdout={process.stdout}, stderr={process.stderr}"
+                "Command finished. stdout=%s, stderr=%s", process.stdout, process.stderr
             )
         except subprocess.CalledProcessError as e:
-            LOG.error(f"terraform init failed: {e.output}")
+            LOG.error("terraform init failed: %s", e.output)
             LOG.warning(e.stderr)
             raise TerraformException(str(e))
 
@@ -194,21 +313,24 @@ class TerraformHelper:
             if self.parallelism is not None:
                 cmd.append(f"-parallelism={self.parallelism}")
             LOG.debug(f'Running command {" ".join(cmd)}')
-            process = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                check=True,
-                cwd=self.path,
-                env=os_env,
-            )
+            with timed_event(
+                "subprocess", "terraform apply", plan=self.plan
+            ), self.lock_heartbeat():
+                process = subprocess.run(
+                    cmd,
+                    capture_output=True,
+                    text=True,
+                    check=True,
+                    cwd=self.path,
+                    env=os_env,
+                )
             LOG.debug(
-                f"Command finished. stdout={process.stdout}, stderr={process.stderr}"
+                "Command finished. stdout=%s, stderr=%s", process.stdout, process.stderr
             )
         except subprocess.CalledProcessError as e:
-            LOG.error(f"terraform apply failed: {e.output}")
+            LOG.error("terraform apply failed: %s", e.output)
             LOG.warning(e.stderr)
-            raise TerraformException(str(e))
+            raise TerraformException(str(e), output=e.stderr or "")
 
 
 class TerraformInitStep(BaseStep):
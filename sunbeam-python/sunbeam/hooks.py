@@ -26,6 +26,9 @@ DEFAULT_CONFIG = {
     "juju.cloud.name": "sunbeam",
     "daemon.group": "snap_daemon",
     "daemon.debug": False,
+    "credentials.ttl": 3600,
+    "logging.events": False,
+    "logging.traces": False,
 }
 
 OPTION_KEYS = set(k.split(".")[0] for k in DEFAULT_CONFIG.keys())
@@ -17,7 +17,7 @@ import enum
 import json
 import logging
 import os
-from typing import List, Optional, Type
+from typing import Callable, List, Optional, Type
 
 import click
 from click import decorators
@@ -25,10 +25,17 @@ from rich.console import Console
 from rich.status import Status
 
 from sunbeam.clusterd.client import Client
+from sunbeam.clusterd.service import (
+    ConfigItemConflictException,
+    ConfigItemNotFoundException,
+)
+from sunbeam.log import timed_event
 
 LOG = logging.getLogger(__name__)
 RAM_16_GB_IN_KB = 16 * 1024 * 1024
 RAM_32_GB_IN_KB = 32 * 1024 * 1024
+# Reads and conditional writes tried by modify_config before giving up
+MODIFY_CONFIG_ATTEMPTS = 5
 
 
 class Role(enum.Enum):
@@ -226,13 +233,16 @@ def run_plan(plan: List[BaseStep], console: Console) -> dict:
 
     for step in plan:
         LOG.debug(f"Starting step {step.name!r}")
-        with console.status(step.status) as status:
+        with console.status(step.status) as status, timed_event(
+            "step", step.__class__.__name__
+        ) as event:
             if step.has_prompts():
                 status.stop()
                 step.prompt(console)
                 status.start()
 
             skip_result = step.is_skip(status)
+            event["outcome"] = skip_result.result_type.name.lower()
             if skip_result.result_type == ResultType.SKIPPED:
                 results[step.__class__.__name__] = skip_result
                 LOG.debug(f"Skipping step {step.name}")
@@ -243,6 +253,7 @@ def run_plan(plan: List[BaseStep], console: Console) -> dict:
 
             LOG.debug(f"Running step {step.name}")
             result = step.run(status)
+            event["outcome"] = result.result_type.name.lower()
             results[step.__class__.__name__] = result
             LOG.debug(
                 f"Finished running step {step.name!r}. Result: {result.result_type}"
@@ -317,3 +328,32 @@ def update_config(client: Client, key: str, config: dict):
 def read_config(client: Client, key: str) -> dict:
     config = client.cluster.get_config(key)
     return json.loads(config)
+
+
+def modify_config(
+    client: Client,
+    key: str,
+    fn: Callable[[dict], dict],
+    attempts: int = MODIFY_CONFIG_ATTEMPTS,
+) -> dict:
+    """Replace the config under key with fn applied to it.
+
+    fn gets the current config, {} if there is none, and returns the new
+    one. The new config is only stored if key has not changed since it
+    was read, otherwise fn is applied again to the fresh config.
+
+    :raises: ConfigItemConflictException if key kept changing
+    """
+    for _ in range(attempts):
+        try:
+            value, revision = client.cluster.get_config_with_revision(key)
+            config = json.loads(value)
+        except ConfigItemNotFoundException:
+            config, revision = {}, None
+        config = fn(config)
+        try:
+            client.cluster.swap_config(key, json.dumps(config), revision)
+            return config
+        except ConfigItemConflictException:
+            LOG.debug("%s changed while being modified, retrying", key)
+    raise ConfigItemConflictException(f"{key} kept changing after {attempts} attempts")
@@ -37,6 +37,7 @@ from juju.model import Model
 from juju.unit import Unit
 
 from sunbeam.clusterd.client import Client as clusterClient
+from sunbeam.log import timed_event
 
 LOG = logging.getLogger(__name__)
 CONTROLLER_MODEL = "admin/controller"
@@ -192,7 +193,8 @@ def controller(func):
                 username=account.user,
                 password=account.password,
             )
-        return await func(self, *args, **kwargs)
+        with timed_event("juju", func.__name__):
+            return await func(self, *args, **kwargs)
 
     return wrapper
 
@@ -203,6 +205,10 @@ class JujuHelper:
     def __init__(self, data_location: Path):
         self.data_location = data_location
         self.controller = None
+        # Leader unit per application, per model
+        self._leaders: Dict[str, Dict[str, str]] = {}
+        # Connection whose observer invalidates the cached leaders, per model
+        self._leadership_watchers: Dict[str, Model] = {}
 
     @controller
     async def get_clouds(self) -> dict:
@@ -351,6 +357,67 @@ class JujuHelper:
 
         await application.destroy_unit(unit)
 
+    def _watch_leadership(self, model: str, model_impl: Model):
+        """Invalidate cached leaders of model on unit changes.
+
+        Leadership can only move when the units of an application change,
+        so any unit delta drops the cached leader of its application.
+        """
+
+        async def invalidate(delta, old, new, model_impl):
+            application = delta.data.get("application")
+            LOG.debug(f"Units of {application!r} changed in model {model!r}")
+            self._leaders.get(model, {}).pop(application, None)
+
+        model_impl.add_observer(invalidate, entity_type="unit")
+        self._leadership_watchers[model] = model_impl
+
+    def _is_leadership_watched(self, model: str) -> bool:
+        """Whether cached leaders of model are still kept up to date."""
+        watcher = self._leadership_watchers.get(model)
+        return watcher is not None and watcher.is_connected()
+
+    @controller
+    async def get_leader_units(self, names: List[str], model: str) -> Dict[str, str]:
+        """Get leader units of several applications.
+
+        Leaders missing from the cache are resolved with a single status
+        call for all the applications. The cache is only trusted while the
+        connection watching the model is up.
+
+        :names: Application names
+        :model: Name of the model where the applications are located
+        :returns: mapping of application name to leader unit name
+        """
+        watched = self._is_leadership_watched(model)
+        if not watched:
+            # Leadership changes may have been missed, drop the cache.
+            self._leaders.pop(model, None)
+        leaders = self._leaders.setdefault(model, {})
+        missing = [name for name in names if name not in leaders]
+        if missing:
+            model_impl = await self.get_model(model)
+            if not watched:
+                self._watch_leadership(model, model_impl)
+            status = await model_impl.get_status(filters=missing)
+            for name in missing:
+                app_status = status.applications.get(name)
+                if app_status is None:
+                    raise ApplicationNotFoundException(
+                        f"Application {name!r} is missing from model {model!r}"
+                    )
+                for unit_name, unit_status in (app_status.units or {}).items():
+                    if unit_status.leader:
+                        leaders[name] = unit_name
+                        break
+                else:
+                    raise LeaderNotFoundException(
+                        f"Leader for application {name!r} is missing from model"
+                        f" {model!r}"
+                    )
+
+        return {name: leaders[name] for name in names}
+
     @controller
     async def get_leader_unit(self, name: str, model: str) -> str:
         """Get leader unit.
@@ -359,16 +426,8 @@ class JujuHelper:
         :model: Name of the model where the application is located
         :returns: Unit name
         """
-        application = await self.get_application(name, model)
-
-        for unit in application.units:
-            is_leader = await unit.is_leader_from_status()
-            if is_leader:
-                return unit.entity_id
-
-        raise LeaderNotFoundException(
-            f"Leader for application {name!r} is missing from model {model!r}"
-        )
+        leaders = await self.get_leader_units([name], model)
+        return leaders[name]
 
     @controller
     async def run_cmd_on_unit_payload(
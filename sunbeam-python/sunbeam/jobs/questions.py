@@ -26,6 +26,7 @@ from rich.text import Text
 
 from sunbeam.clusterd.client import Client
 from sunbeam.clusterd.service import ConfigItemNotFoundException
+from sunbeam.jobs.common import modify_config
 
 LOG = logging.getLogger(__name__)
 PASSWORD_MASK = "*" * 8
@@ -283,6 +284,33 @@ def load_answers(client: Client, key: str) -> dict:
     return variables
 
 
-def write_answers(client: Client, key: str, answers):
-    """Write answers to database."""
-    client.cluster.update_config(key, json.dumps(answers))
+def write_answers(client: Client, key: str, answers: dict) -> dict:
+    """Write answers to database, returns all the answers stored under key.
+
+    Sections of answers replace the stored ones, other sections are kept
+    as stored, even if they changed since the answers were loaded.
+    """
+    return modify_config(client, key, lambda stored: {**stored, **answers})
+
+
+def node_answers_key(key: str, node: str) -> str:
+    """Config key holding the answers of node under key."""
+    return f"{key}-{node}"
+
+
+def load_node_answers(client: Client, key: str, node: str) -> dict:
+    """Read the answers of node from database.
+
+    Every node has its own config key, so reading them does not depend on
+    the number of nodes.
+    """
+    return load_answers(client, node_answers_key(key, node))
+
+
+def write_node_answers(client: Client, key: str, node: str, answers: dict):
+    """Write the answers of node to database.
+
+    Only the key of node is written, nodes writing their answers at the
+    same time do not overwrite each other.
+    """
+    client.cluster.update_config(node_answers_key(key, node), json.dumps(answers))
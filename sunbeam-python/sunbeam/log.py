@@ -12,18 +12,128 @@
 # implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import atexit
+import json
 import logging
+import queue
 import sys
+import time
+import uuid
+from contextlib import contextmanager
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
-from typing import Optional, Union
+from typing import Any, Dict, Iterator, List, Optional, Union
 
 from rich.logging import RichHandler
 
+from sunbeam import tracing
+
 MAX_LOG_FILES = 10
+# Total size of the log files kept across invocations.
+MAX_LOG_DIR_SIZE = 100 * 1024 * 1024
+# Size at which the log of a single invocation is rotated.
+MAX_LOG_FILE_SIZE = 20 * 1024 * 1024
+LOG_FILE_BACKUPS = 2
+
+EVENT_LOG_FILE = "events.jsonl"
+EVENT_LOG = logging.getLogger("sunbeam.events")
+# Correlates all the events recorded by one command invocation.
+INVOCATION_ID = uuid.uuid4().hex
+
+
+def start_queue_listener(
+    logger: logging.Logger, *handlers: logging.Handler
+) -> QueueListener:
+    """Attach handlers to logger through a background writer thread."""
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    # Flush pending records on exit.
+    atexit.register(listener.stop)
+    logger.addHandler(QueueHandler(log_queue))
+    return listener
+
+
+class JSONLinesFormatter(logging.Formatter):
+    """Format event records as one JSON document per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps(record.event, default=str, sort_keys=True)
+
+
+def setup_event_logging(path: Path) -> QueueListener:
+    """Record typed events as JSON lines to path.
+
+    Events are written from a background thread and are kept out of the
+    text logs.
+    """
+    handler = RotatingFileHandler(
+        path, maxBytes=MAX_LOG_FILE_SIZE, backupCount=LOG_FILE_BACKUPS
+    )
+    handler.setFormatter(JSONLinesFormatter())
+    EVENT_LOG.setLevel(logging.INFO)
+    EVENT_LOG.propagate = False
+    return start_queue_listener(EVENT_LOG, handler)
+
+
+# Event kinds calling out of the process, traced as client spans.
+CLIENT_EVENT_KINDS = {"clusterd", "juju", "subprocess"}
+# Event fields not worth repeating as span attributes.
+SPAN_SKIPPED_FIELDS = {"invocation", "kind", "name", "time", "monotonic"}
+
 
+@contextmanager
+def timed_event(kind: str, name: str, **fields: Any) -> Iterator[Dict[str, Any]]:
+    """Record the duration and outcome of the wrapped operation.
 
-def setup_root_logging(logfile: Optional[Path] = None):
+    The yielded event can be updated, e.g. to set a specific outcome, an
+    exception sets the outcome to error. The operation is recorded in the
+    event log and traced as a span, if either is set up.
+    """
+    event: Dict[str, Any] = {
+        "invocation": INVOCATION_ID,
+        "kind": kind,
+        "name": name,
+        "outcome": "success",
+        **fields,
+    }
+    if not EVENT_LOG.handlers and not tracing.enabled():
+        yield event
+        return
+    span_kind = (
+        tracing.SPAN_KIND_CLIENT
+        if kind in CLIENT_EVENT_KINDS
+        else tracing.SPAN_KIND_INTERNAL
+    )
+    with tracing.span(f"{kind} {name}", kind=span_kind) as span:
+        event["time"] = time.time()
+        event["monotonic"] = time.monotonic()
+        try:
+            yield event
+        except SystemExit as e:
+            if e.code not in (None, 0):
+                event["outcome"] = "error"
+            raise
+        except BaseException as e:
+            # Keep a more specific outcome set before raising, e.g. failed.
+            if event["outcome"] == "success":
+                event["outcome"] = "error"
+            event["error"] = type(e).__name__
+            raise
+        finally:
+            event["duration"] = time.monotonic() - event["monotonic"]
+            if span is not None:
+                span.attributes.update(
+                    {k: v for k, v in event.items() if k not in SPAN_SKIPPED_FIELDS}
+                )
+                if event["outcome"] in ("error", "failed"):
+                    span.error = event["outcome"]
+            if EVENT_LOG.handlers:
+                EVENT_LOG.info("%s %s", kind, name, extra={"event": event})
+
+
+def setup_root_logging(logfile: Optional[Path] = None) -> Optional[QueueListener]:
     """Sets up the root logging level for the application.
 
     By default, console logging will be turned off and level logging
@@ -35,6 +145,8 @@ def setup_root_logging(logfile: Optional[Path] = None):
 
     This will also set up the file logging in order to get execution logs
     from machines, as well as configuring the console output logging levels.
+    File logging is written from a background thread, the listener doing
+    so is returned.
     """
     logger = logging.getLogger()
     # By default, we'll enable all debug logging.
@@ -67,8 +179,11 @@ def setup_root_logging(logfile: Optional[Path] = None):
         handler.setFormatter(logging.Formatter("%(message)s", datefmt="[%X]"))
         logger.addHandler(handler)
 
+    listener = None
     if logfile:
-        handler = logging.FileHandler(logfile)
+        handler = RotatingFileHandler(
+            logfile, maxBytes=MAX_LOG_FILE_SIZE, backupCount=LOG_FILE_BACKUPS
+        )
         handler.setLevel(logging.DEBUG)
         handler.setFormatter(
             logging.Formatter(
@@ -76,8 +191,9 @@ def setup_root_logging(logfile: Optional[Path] = None):
                 datefmt="%H:%M:%S",
             )
         )
-        logger.addHandler(handler)
-        logger.debug(f"Logging to {str(logfile)!r}")
+        listener = start_queue_listener(logger, handler)
+        logger.debug("Logging to %r", str(logfile))
+    return listener
 
 
 def setup_logging(logfile: Union[Path, str]) -> None:
@@ -97,17 +213,40 @@ def setup_logging(logfile: Union[Path, str]) -> None:
     )
 
 
-def prepare_logfile(path: Path, name: str) -> Path:
+def prepare_logfile(
+    path: Path,
+    name: str,
+    max_files: int = MAX_LOG_FILES,
+    max_size: int = MAX_LOG_DIR_SIZE,
+) -> Path:
     """Remove older log files and return a logfile name for current execution.
 
+    Logs of previous executions, including their rotated backups, are kept
+    newest first as long as they fit in max_files and max_size.
+
     :param path: Path to the logs directoy
     :param name: name of the logfile
+    :param max_files: number of executions to keep logs for
+    :param max_size: total size in bytes of the logs kept
     """
     path.mkdir(mode=0o750, exist_ok=True)
-    limit = MAX_LOG_FILES - 1
-    present_files = list(path.glob(f"{name}-*.log"))
-    if len(present_files) > limit:
-        for fpath in sorted(present_files)[:-limit]:
+    runs: Dict[str, List[Path]] = {}
+    for fpath in path.glob(f"{name}-*.log*"):
+        runs.setdefault(fpath.name.split(".log")[0], []).append(fpath)
+
+    kept = 0
+    total_size = 0
+    pruning = False
+    for run in sorted(runs, reverse=True):
+        run_size = sum(fpath.stat().st_size for fpath in runs[run])
+        # Keep a slot for the current execution, once a run does not fit
+        # all older runs are dropped too.
+        pruning = pruning or kept >= max_files - 1 or total_size + run_size > max_size
+        if not pruning:
+            kept += 1
+            total_size += run_size
+            continue
+        for fpath in runs[run]:
             fpath.unlink(missing_ok=True)
 
     logfile = path / f"{name}-{datetime.now():%Y%m%d-%H%M%S.%f}.log"
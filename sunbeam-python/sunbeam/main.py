@@ -14,11 +14,12 @@
 # limitations under the License.
 
 import logging
+import sys
 
 import click
-from snaphelpers import Snap
+from snaphelpers import Snap, SnapCtlError, UnknownConfigKey
 
-from sunbeam import log
+from sunbeam import log, tracing
 from sunbeam.commands import bootstrap as bootstrap_cmds
 from sunbeam.commands import configure as configure_cmds
 from sunbeam.commands import dashboard_url as dasboard_url_cmds
@@ -71,10 +72,33 @@ def disable(ctx):
     """Disable plugins"""
 
 
+def _command_path(args: list) -> str:
+    """Name of the (sub)command invoked by args, options skipped."""
+    names = []
+    command = cli
+    for arg in args:
+        if arg.startswith("-"):
+            continue
+        if not isinstance(command, click.Group) or arg not in command.commands:
+            break
+        names.append(arg)
+        command = command.commands[arg]
+    return " ".join(names) or "sunbeam"
+
+
 def main():
     snap = Snap()
     logfile = log.prepare_logfile(snap.paths.user_common / "logs", "sunbeam")
     log.setup_root_logging(logfile)
+    log_dir = snap.paths.user_common / "logs"
+    try:
+        options = snap.config.get_options("logging").as_dict().get("logging", {})
+    except (UnknownConfigKey, SnapCtlError):
+        options = {}
+    if options.get("events"):
+        log.setup_event_logging(log_dir / log.EVENT_LOG_FILE)
+    if options.get("traces"):
+        tracing.setup_tracing(log_dir / tracing.TRACE_FILE, trace_id=log.INVOCATION_ID)
     cli.add_command(prepare_node_cmds.prepare_node_script)
     cli.add_command(configure_cmds.configure)
     cli.add_command(generate_cloud_config_cmds.cloud_config)
@@ -91,6 +115,7 @@ def main():
     cluster.add_command(node_cmds.join)
     cluster.add_command(node_cmds.list)
     cluster.add_command(node_cmds.remove)
+    cluster.add_command(node_cmds.refresh_disks)
     cluster.add_command(resize_cmds.resize)
 
     # Plugins
@@ -99,7 +124,8 @@ def main():
     cli.add_command(enable)
     cli.add_command(disable)
 
-    cli()
+    with log.timed_event("command", _command_path(sys.argv[1:])):
+        cli()
 
 
 if __name__ == "__main__":
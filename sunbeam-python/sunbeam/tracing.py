@@ -0,0 +1,209 @@
+# Copyright (c) 2023 Canonical Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Minimal tracing exporting spans to a local OTLP-JSON file.
+
+Spans are kept in a context variable so that parent/child relationships
+follow the code into coroutines run with run_sync and into asyncio tasks,
+which copy the context they are created from.
+"""
+
+import atexit
+import json
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+TRACE_FILE = "traces.jsonl"
+SERVICE_NAME = "sunbeam"
+# Spans buffered before they are appended to the trace file.
+MAX_BUFFERED_SPANS = 512
+
+# https://opentelemetry.io/docs/specs/otel/trace/api/#spankind
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_CLIENT = 3
+# https://opentelemetry.io/docs/specs/otel/trace/api/#set-status
+STATUS_CODE_OK = 1
+STATUS_CODE_ERROR = 2
+
+
+@dataclass
+class Span:
+    """A timed operation, part of the trace of one command invocation."""
+
+    trace_id: str
+    name: str
+    parent_span_id: Optional[str] = None
+    kind: int = SPAN_KIND_INTERNAL
+    span_id: str = field(default_factory=lambda: secrets.token_hex(8))
+    start_time: int = field(default_factory=time.time_ns)
+    end_time: Optional[int] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    def to_otlp(self) -> dict:
+        """Span in the OTLP-JSON encoding."""
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_time),
+            "endTimeUnixNano": str(self.end_time or self.start_time),
+            "attributes": _otlp_attributes(self.attributes),
+            "status": {"code": STATUS_CODE_OK},
+        }
+        if self.parent_span_id:
+            span["parentSpanId"] = self.parent_span_id
+        if self.error is not None:
+            span["status"] = {"code": STATUS_CODE_ERROR, "message": self.error}
+        return span
+
+
+def _otlp_value(value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[dict]:
+    return [
+        {"key": key, "value": _otlp_value(value)}
+        for key, value in attributes.items()
+        if value is not None
+    ]
+
+
+class FileSpanExporter:
+    """Append finished spans to a file, one OTLP-JSON request per line.
+
+    This is the layout of the OpenTelemetry collector file exporter, it can
+    be loaded with its otlpjsonfile receiver or any OTLP-JSON viewer.
+    """
+
+    def __init__(self, path: Path, max_buffered: int = MAX_BUFFERED_SPANS):
+        self.path = path
+        self.max_buffered = max_buffered
+        self._spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        with self._lock:
+            self._spans.append(span)
+            if len(self._spans) < self.max_buffered:
+                return
+            spans, self._spans = self._spans, []
+        self._write(spans)
+
+    def flush(self) -> None:
+        with self._lock:
+            spans, self._spans = self._spans, []
+        if spans:
+            self._write(spans)
+
+    def _write(self, spans: List[Span]) -> None:
+        request = {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": _otlp_attributes({"service.name": SERVICE_NAME})
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": SERVICE_NAME},
+                            "spans": [span.to_otlp() for span in spans],
+                        }
+                    ],
+                }
+            ]
+        }
+        with self.path.open("a") as f:
+            f.write(json.dumps(request) + "\n")
+
+
+_exporter: Optional[FileSpanExporter] = None
+_trace_id: str = secrets.token_hex(16)
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def setup_tracing(path: Path, trace_id: Optional[str] = None) -> FileSpanExporter:
+    """Export spans to path, flushed at exit.
+
+    :param trace_id: 32 hex digits identifying the trace of this invocation
+    """
+    global _exporter, _trace_id
+    if trace_id is not None:
+        _trace_id = trace_id
+    _exporter = FileSpanExporter(path)
+    atexit.register(_exporter.flush)
+    return _exporter
+
+
+def shutdown_tracing() -> None:
+    """Flush pending spans and stop tracing."""
+    global _exporter
+    if _exporter is not None:
+        _exporter.flush()
+        atexit.unregister(_exporter.flush)
+    _exporter = None
+
+
+def enabled() -> bool:
+    return _exporter is not None
+
+
+@contextmanager
+def span(
+    name: str, kind: int = SPAN_KIND_INTERNAL, attributes: Optional[dict] = None
+) -> Iterator[Optional[Span]]:
+    """Trace the wrapped operation as a child of the current span.
+
+    attributes is read when the span ends, so values set while the
+    operation runs are recorded. Yields None when tracing is disabled.
+    """
+    if _exporter is None:
+        yield None
+        return
+    parent = _current_span.get()
+    current = Span(
+        trace_id=_trace_id,
+        name=name,
+        kind=kind,
+        parent_span_id=parent.span_id if parent else None,
+    )
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        if not isinstance(e, SystemExit) or e.code not in (None, 0):
+            current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end_time = time.time_ns()
+        if attributes:
+            current.attributes.update(attributes)
+        exporter = _exporter
+        if exporter is not None:
+            exporter.export(current)
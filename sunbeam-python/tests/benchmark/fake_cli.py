@@ -0,0 +1,111 @@
+# Copyright (c) 2023 Canonical Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Scripted stand-in for the terraform and juju binaries.
+
+Installed as a wrapper running ``fake_cli.py <tool> <args>``, it reads its
+script from the JSON file named by FAKE_CLI_SCRIPT::
+
+    {
+        "log": "/path/to/invocations.jsonl",
+        "socket": "/path/to/control.socket",
+        "world": "/path/to/juju-world.json",
+        "commands": {"terraform apply": {"duration": 0.5, "stdout": ""}},
+        "deploys": {"deploy-microk8s": {"controller": ["microk8s"]}}
+    }
+
+Every invocation is appended to the log. ``terraform apply`` goes through
+the http backend lock/state/unlock cycle against the clusterd socket and
+deploys the applications scripted for its plan directory into the fake
+Juju world.
+"""
+
+import http.client
+import json
+import os
+import re
+import socket
+import sys
+import time
+import uuid
+from pathlib import Path
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path: str):
+        super().__init__("localhost")
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.path)
+
+
+def request(conn, method: str, path: str, body=None) -> int:
+    conn.request(method, path, body=body)
+    response = conn.getresponse()
+    response.read()
+    return response.status
+
+
+def http_backend(script: dict, plan: str, apply: bool) -> None:
+    """Lock, refresh, store and unlock the state like the http backend."""
+    conn = UnixHTTPConnection(script["socket"])
+    lock = json.dumps({"ID": str(uuid.uuid4()), "Operation": "OperationTypeApply"})
+    request(conn, "PUT", f"/1.0/terraformlock/{plan}", lock)
+    request(conn, "GET", f"/1.0/terraformstate/{plan}")
+    if apply:
+        state = json.dumps({"version": 4, "serial": int(time.time())})
+        lock_id = json.loads(lock)["ID"]
+        request(conn, "PUT", f"/1.0/terraformstate/{plan}?ID={lock_id}", state)
+    request(conn, "PUT", f"/1.0/terraformunlock/{plan}", lock)
+    conn.close()
+
+
+def deploy(script: dict, plan_dir: str) -> None:
+    """Add the applications deployed by plan_dir to the Juju world."""
+    world_path = Path(script["world"])
+    world = json.loads(world_path.read_text()) if world_path.exists() else {}
+    for model, applications in script.get("deploys", {}).get(plan_dir, {}).items():
+        deployed = world.setdefault(model, [])
+        deployed.extend(app for app in applications if app not in deployed)
+    tmp = world_path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(world))
+    tmp.replace(world_path)
+
+
+def main(tool: str, args: list) -> int:
+    with open(os.environ["FAKE_CLI_SCRIPT"]) as f:
+        script = json.load(f)
+    command = f"{tool} {args[0]}" if args else tool
+    spec = script.get("commands", {}).get(command, {})
+    with open(script["log"], "a") as f:
+        f.write(json.dumps({"command": command, "args": args}) + "\n")
+
+    time.sleep(spec.get("duration", 0))
+    if tool == "terraform" and args[:1] in (["apply"], ["plan"]):
+        backend = Path("backend.tf")
+        if backend.exists():
+            match = re.search(r"terraformlock/([^\"]+)", backend.read_text())
+            if match:
+                http_backend(script, match.group(1), args[0] == "apply")
+        if args[0] == "apply":
+            deploy(script, Path.cwd().name)
+    sys.stdout.write(spec.get("stdout", ""))
+    return spec.get("returncode", 0)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1], sys.argv[2:]))
@@ -0,0 +1,484 @@
+# Copyright (c) 2023 Canonical Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""In-memory stand-in for sunbeam clusterd, served over a unix socket.
+
+Responses follow the microcluster envelope and the error strings the
+python client translates into exceptions. Every request is counted per
+route so benchmarks can track round-trips.
+"""
+
+import json
+import re
+import secrets
+import socketserver
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+Route = Tuple[str, str, "re.Pattern[str]", Callable]
+
+
+class Reply:
+    """Metadata of a sync response, sent with extra headers."""
+
+    def __init__(self, metadata, headers: Dict[str, str]):
+        self.metadata = metadata
+        self.headers = headers
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str, body: Optional[str] = None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.body = body
+
+
+class FakeClusterd:
+    """clusterd routes backed by dictionaries.
+
+    :param latency: seconds added to every request, to model dqlite and
+        the microcluster proxying
+    """
+
+    def __init__(
+        self, socket_path: Path, latency: float = 0.0, lock_ttl: float = 300.0
+    ):
+        self.socket_path = socket_path
+        self.latency = latency
+        self.lock_ttl = lock_ttl
+        self.requests: Counter = Counter()
+        self.bootstrapped = False
+        self.members: Dict[str, dict] = {}
+        self.tokens: Dict[str, str] = {}
+        self.nodes: Dict[str, dict] = {}
+        self.jujuusers: Dict[str, str] = {}
+        self.config: Dict[str, str] = {}
+        # Config revisions, bumped on every write or deletion through the API
+        self.revision = 0
+        self.revisions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        # Headers of the request being handled, set under _lock
+        self.headers: Dict[str, str] = {}
+        self._changed = threading.Condition(self._lock)
+        self._routes: List[Route] = []
+        self._server: Optional[socketserver.UnixStreamServer] = None
+        for method, template, handler in [
+            ("POST", "/cluster/control", self.control),
+            ("GET", "/cluster/1.0/cluster", self.list_members),
+            ("DELETE", "/cluster/1.0/cluster/{name}", self.remove_member),
+            ("GET", "/cluster/1.0/tokens", self.list_tokens),
+            ("POST", "/cluster/1.0/tokens", self.add_token),
+            ("DELETE", "/cluster/internal/tokens/{name}", self.delete_token),
+            ("GET", "/1.0/nodes", self.list_nodes),
+            ("POST", "/1.0/nodes", self.add_node),
+            ("GET", "/1.0/nodes/{name}", self.get_node),
+            ("GET", "/1.0/nodecounts", self.count_nodes),
+            ("GET", "/1.0/summary", self.summary),
+            ("PUT", "/1.0/nodes/{name}", self.update_node),
+            ("DELETE", "/1.0/nodes/{name}", self.delete_node),
+            ("GET", "/1.0/jujuusers", self.list_jujuusers),
+            ("POST", "/1.0/jujuusers", self.add_jujuuser),
+            ("GET", "/1.0/jujuusers/{name}", self.get_jujuuser),
+            ("DELETE", "/1.0/jujuusers/{name}", self.delete_jujuuser),
+            ("GET", "/1.0/config", self.list_config),
+            ("GET", "/1.0/config/{key}", self.get_config),
+            ("PUT", "/1.0/config/{key}", self.put_config),
+            ("DELETE", "/1.0/config/{key}", self.delete_config),
+            ("GET", "/1.0/watch/config", self.watch_config),
+            ("GET", "/1.0/terraformstate", self.list_states),
+            ("GET", "/1.0/terraformstate/{name}", self.get_state),
+            ("PUT", "/1.0/terraformstate/{name}", self.put_state),
+            ("GET", "/1.0/terraformlock", self.list_locks),
+            ("GET", "/1.0/terraformlock/{name}", self.get_lock),
+            ("PUT", "/1.0/terraformlock/{name}", self.put_lock),
+            ("PUT", "/1.0/terraformunlock/{name}", self.unlock),
+            ("PUT", "/1.0/terraformlease/{name}", self.renew_lock),
+        ]:
+            self.route(method, template, handler)
+
+    def route(self, method: str, template: str, handler: Callable) -> None:
+        """Serve handler(query, body, **path_params) on method template."""
+        pattern = re.sub(r"\{(\w+)\}", r"(?P<\1>[^/]+)", template)
+        self._routes.append((method, template, re.compile(pattern + "$"), handler))
+
+    def dispatch(
+        self, method: str, url: str, body: bytes, headers: Optional[dict] = None
+    ) -> Tuple[int, bytes, Dict[str, str]]:
+        split = urlsplit(url)
+        for route_method, template, pattern, handler in self._routes:
+            match = pattern.match(split.path)
+            if route_method != method or match is None:
+                continue
+            self.requests[f"{method} {template}"] += 1
+            if self.latency:
+                time.sleep(self.latency)
+            params = {k: unquote(v) for k, v in match.groupdict().items()}
+            try:
+                with self._lock:
+                    if not self.bootstrapped and template != "/cluster/control":
+                        raise HTTPError(503, "Daemon not yet initialized")
+                    self.headers = dict(headers or {})
+                    result = handler(parse_qs(split.query), body, **params)
+            except HTTPError as e:
+                if e.body is not None:
+                    return e.status, e.body.encode(), {}
+                return e.status, self._error(e.status, e.message), {}
+            if isinstance(result, bytes):
+                return 200, result, {}
+            if isinstance(result, Reply):
+                return 200, self._sync(result.metadata), result.headers
+            return 200, self._sync(result), {}
+        self.requests[f"{method} <unknown>"] += 1
+        return 404, self._error(404, "not found"), {}
+
+    @staticmethod
+    def _sync(metadata) -> bytes:
+        return json.dumps(
+            {
+                "type": "sync",
+                "status": "Success",
+                "status_code": 200,
+                "operation": "",
+                "error_code": 0,
+                "error": "",
+                "metadata": metadata,
+            }
+        ).encode()
+
+    @staticmethod
+    def _error(status: int, message: str) -> bytes:
+        return json.dumps(
+            {
+                "type": "error",
+                "status": "",
+                "status_code": 0,
+                "operation": "",
+                "error_code": status,
+                "error": message,
+                "metadata": None,
+            }
+        ).encode()
+
+    # microcluster
+
+    def control(self, query, body):
+        request = json.loads(body)
+        if request.get("bootstrap"):
+            if self.bootstrapped:
+                raise HTTPError(500, "Failed to bootstrap: already running")
+            self.bootstrapped = True
+        elif self.tokens.get(request["name"]) != request.get("join_token"):
+            raise HTTPError(500, "Failed to join cluster with the given join token")
+        else:
+            del self.tokens[request["name"]]
+        self.members[request["name"]] = {
+            "name": request["name"],
+            "address": request["address"],
+            "status": "ONLINE",
+        }
+
+    def list_members(self, query, body):
+        return list(self.members.values())
+
+    def remove_member(self, query, body, name):
+        if name not in self.members:
+            raise HTTPError(404, "No remote exists with the given name")
+        del self.members[name]
+
+    def list_tokens(self, query, body):
+        return [{"name": name, "token": token} for name, token in self.tokens.items()]
+
+    def add_token(self, query, body):
+        name = json.loads(body)["name"]
+        if name in self.tokens:
+            raise HTTPError(
+                500, "UNIQUE constraint failed: internal_token_records.name"
+            )
+        self.tokens[name] = secrets.token_urlsafe(32)
+        return self.tokens[name]
+
+    def delete_token(self, query, body, name):
+        if self.tokens.pop(name, None) is None:
+            raise HTTPError(404, "InternalTokenRecord not found")
+
+    # sunbeam
+
+    def _match_roles(self, query) -> List[dict]:
+        roles = query.get("role", [])
+        match = any if query.get("match") == ["any"] else all
+        return [
+            node
+            for node in self.nodes.values()
+            if not roles or match(role in node["role"] for role in roles)
+        ]
+
+    def list_nodes(self, query, body):
+        return self._match_roles(query)
+
+    def count_nodes(self, query, body):
+        roles = Counter(role for node in self.nodes.values() for role in node["role"])
+        return {"roles": dict(roles), "nodes": len(self._match_roles(query))}
+
+    def summary(self, query, body):
+        members = []
+        for name, member in sorted(self.members.items()):
+            node = self.nodes.get(name, {})
+            members.append(
+                {
+                    **member,
+                    "role": node.get("role", []),
+                    "machineid": node.get("machineid", 0),
+                }
+            )
+        return {"members": members, "roles": self.count_nodes({}, b"")["roles"]}
+
+    def add_node(self, query, body):
+        request = json.loads(body)
+        self.nodes[request["name"]] = {
+            "name": request["name"],
+            "role": request.get("role") or [],
+            "machineid": request.get("machineid", 0),
+        }
+
+    def get_node(self, query, body, name):
+        if name not in self.nodes:
+            raise HTTPError(404, "Node not found")
+        return self.nodes[name]
+
+    def update_node(self, query, body, name):
+        if name not in self.nodes:
+            raise HTTPError(404, "Node not found")
+        request = json.loads(body)
+        if request.get("role"):
+            self.nodes[name]["role"] = request["role"]
+        if request.get("machineid", -1) >= 0:
+            self.nodes[name]["machineid"] = request["machineid"]
+
+    def delete_node(self, query, body, name):
+        if self.nodes.pop(name, None) is None:
+            raise HTTPError(404, "Node not found")
+
+    def list_jujuusers(self, query, body):
+        return [
+            {"username": name, "token": token} for name, token in self.jujuusers.items()
+        ]
+
+    def add_jujuuser(self, query, body):
+        request = json.loads(body)
+        self.jujuusers[request["username"]] = request["token"]
+
+    def get_jujuuser(self, query, body, name):
+        if name not in self.jujuusers:
+            raise HTTPError(404, "JujuUser not found")
+        return {"username": name, "token": self.jujuusers[name]}
+
+    def delete_jujuuser(self, query, body, name):
+        if self.jujuusers.pop(name, None) is None:
+            raise HTTPError(404, "JujuUser not found")
+
+    def list_config(self, query, body):
+        prefix = query.get("prefix", [""])[0]
+        after = query.get("after", [""])[0]
+        limit = int(query.get("limit", ["100"])[0])
+        values = query.get("values") == ["true"]
+        keys = sorted(
+            key for key in self.config if key.startswith(prefix) and key > after
+        )
+        items = [
+            {"key": key, "value": self.config[key]} if values else {"key": key}
+            for key in keys[:limit]
+        ]
+        return {"items": items, "next": keys[limit - 1] if len(keys) > limit else ""}
+
+    def get_config(self, query, body, key):
+        if key not in self.config:
+            raise HTTPError(404, "ConfigItem not found")
+        return Reply(self.config[key], {"ETag": f'"{self.revisions.get(key, 0)}"'})
+
+    def _write(self, key: str, value: str) -> None:
+        self.config[key] = value
+        self._bump(key)
+
+    def _remove(self, key: str) -> None:
+        del self.config[key]
+        self._bump(key)
+
+    def _bump(self, key: str) -> None:
+        self.revision += 1
+        self.revisions[key] = self.revision
+        self._changed.notify_all()
+
+    def _revision(self, key: str, prefix: bool) -> int:
+        return max(
+            (
+                revision
+                for name, revision in self.revisions.items()
+                if (name.startswith(key) if prefix else name == key)
+            ),
+            default=0,
+        )
+
+    def put_config(self, query, body, key):
+        if_match = self.headers.get("If-Match")
+        if_none_match = self.headers.get("If-None-Match")
+        if if_match is None and if_none_match is None:
+            self._write(key, body.decode())
+            return None
+        if if_match is not None:
+            matches = key in self.config and if_match.strip('"') == str(
+                self.revisions.get(key, 0)
+            )
+        else:
+            matches = key not in self.config
+        if not matches:
+            raise HTTPError(412, "ConfigItem revision mismatch")
+        self._write(key, body.decode())
+        return Reply(None, {"ETag": f'"{self.revisions[key]}"'})
+
+    def delete_config(self, query, body, key):
+        if key not in self.config:
+            raise HTTPError(404, "ConfigItem not found")
+        self._remove(key)
+
+    def watch_config(self, query, body):
+        key = query.get("key", [""])[0]
+        prefix = query.get("prefix") == ["true"]
+        revision = int(query.get("revision", ["0"])[0])
+        deadline = time.monotonic() + float(query.get("timeout", ["30"])[0])
+        # Waiting releases the lock dispatch holds around handlers.
+        while (current := self._revision(key, prefix)) <= revision:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            self._changed.wait(remaining)
+        return {"revision": current}
+
+    def _keys(self, prefix: str) -> List[str]:
+        return [key[len(prefix) :] for key in self.config if key.startswith(prefix)]
+
+    def list_states(self, query, body):
+        return self._keys("tfstate-")
+
+    def get_state(self, query, body, name):
+        if f"tfstate-{name}" not in self.config:
+            raise HTTPError(404, "ConfigItem not found")
+        return self.config[f"tfstate-{name}"].encode()
+
+    def put_state(self, query, body, name):
+        lock = json.loads(self.config.get(f"tflock-{name}", "{}"))
+        if lock.get("ID") != query.get("ID", [""])[0]:
+            raise HTTPError(409, "Conflict in Lock ID", json.dumps(lock))
+        self._write(f"tfstate-{name}", body.decode())
+
+    def list_locks(self, query, body):
+        return self._keys("tflock-")
+
+    def get_lock(self, query, body, name):
+        if f"tflock-{name}" not in self.config:
+            raise HTTPError(404, "ConfigItem not found")
+        # clusterd writes the stored lock as a JSON string
+        return json.dumps(self.config[f"tflock-{name}"]).encode()
+
+    def _expires(self) -> str:
+        expires = datetime.now(timezone.utc) + timedelta(seconds=self.lock_ttl)
+        return expires.isoformat().replace("+00:00", "Z")
+
+    def put_lock(self, query, body, name):
+        current = self.config.get(f"tflock-{name}")
+        lock = json.loads(body)
+        if current is not None:
+            held = json.loads(current)
+            if held["ID"] == lock["ID"]:
+                raise HTTPError(423, "Locked", current)
+            if datetime.now(timezone.utc) <= datetime.fromisoformat(
+                held["Expires"].replace("Z", "+00:00")
+            ):
+                raise HTTPError(409, "Locked", current)
+        lock["Expires"] = self._expires()
+        self._write(f"tflock-{name}", json.dumps(lock))
+
+    def renew_lock(self, query, body, name):
+        current = self.config.get(f"tflock-{name}")
+        if current is None:
+            raise HTTPError(404, "ConfigItem not found")
+        lock = json.loads(current)
+        if lock["ID"] != json.loads(body).get("ID"):
+            raise HTTPError(409, "Conflict in Lock ID", current)
+        lock["Expires"] = self._expires()
+        # Renewals keep the revision, like clusterd
+        self.config[f"tflock-{name}"] = json.dumps(lock)
+        return lock
+
+    def unlock(self, query, body, name):
+        current = self.config.get(f"tflock-{name}")
+        if current is None:
+            return
+        if json.loads(current)["ID"] != json.loads(body).get("ID"):
+            raise HTTPError(409, "Conflict in Lock ID", current)
+        self._remove(f"tflock-{name}")
+
+    # server
+
+    def start(self) -> None:
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        self._server = _UnixHTTPServer(str(self.socket_path), _Handler)
+        self._server.clusterd = self
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        self.socket_path.unlink(missing_ok=True)
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    clusterd: FakeClusterd
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: _UnixHTTPServer
+
+    def _handle(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        status, payload, headers = self.server.clusterd.dispatch(
+            self.command, self.path, body, dict(self.headers)
+        )
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _handle
+
+    def address_string(self) -> str:
+        return "unix"
+
+    def log_message(self, format, *args) -> None:
+        pass
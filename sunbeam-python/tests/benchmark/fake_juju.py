@@ -0,0 +1,205 @@
+# Copyright (c) 2023 Canonical Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""pylibjuju-level stand-in for a Juju controller.
+
+FakeController replaces juju.controller.Controller so JujuHelper runs
+unmodified. Every API call is counted and delayed by the configured
+latency. Applications appear when the fake terraform deploys them into
+the world file.
+"""
+
+import asyncio
+import json
+import uuid
+from collections import Counter
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+from juju.client.client import FullStatus
+
+
+class FakeJuju:
+    """State shared by the controllers created during a benchmark."""
+
+    def __init__(self, world: Path, latency: float = 0.0):
+        self.world = world
+        self.latency = latency
+        self.calls: Counter = Counter()
+        self.models: Dict[str, "FakeModel"] = {}
+
+    async def call(self, name: str) -> None:
+        self.calls[name] += 1
+        await asyncio.sleep(self.latency)
+
+    def sync(self) -> None:
+        """Pick up models and applications deployed by terraform."""
+        if not self.world.exists():
+            return
+        for model, applications in json.loads(self.world.read_text()).items():
+            model_impl = self.models.setdefault(model, FakeModel(self, model))
+            for name in applications:
+                model_impl.applications.setdefault(
+                    name, FakeApplication(model_impl, name)
+                )
+
+    def controller(self) -> "FakeController":
+        return FakeController(self)
+
+
+class FakeController:
+    def __init__(self, juju: FakeJuju):
+        self.juju = juju
+
+    async def connect(self, **kwargs) -> None:
+        await self.juju.call("connect")
+
+    async def get_model(self, model: str) -> "FakeModel":
+        await self.juju.call("get_model")
+        self.juju.sync()
+        if model not in self.juju.models:
+            raise Exception(f"unable to connect to model {model!r}: HTTP 400")
+        return self.juju.models[model]
+
+    async def clouds(self):
+        await self.juju.call("clouds")
+        return SimpleNamespace(clouds={})
+
+    async def add_cloud(self, name: str, cloud) -> None:
+        await self.juju.call("add_cloud")
+
+    async def add_credential(self, name: str, credential=None, cloud=None) -> None:
+        await self.juju.call("add_credential")
+
+
+class FakeModel:
+    def __init__(self, juju: FakeJuju, name: str):
+        self.juju = juju
+        self.info = SimpleNamespace(
+            name=name, uuid=str(uuid.uuid4()), owner_tag="user-admin"
+        )
+        self.applications: Dict[str, FakeApplication] = {}
+
+    @property
+    def units(self) -> Dict[str, "FakeUnit"]:
+        return {
+            unit.name: unit
+            for application in self.applications.values()
+            for unit in application.units
+        }
+
+    async def get_status(self, filters: Optional[List[str]] = None) -> FullStatus:
+        await self.juju.call("get_status")
+        applications = {
+            name: {
+                "status": {"status": application.status},
+                "units": {
+                    unit.name: {
+                        "leader": index == 0,
+                        "machine": unit.machine.id,
+                        "workload-status": {"status": unit.workload_status},
+                        "agent-status": {"status": unit.agent_status},
+                    }
+                    for index, unit in enumerate(application.units)
+                },
+            }
+            for name, application in self.applications.items()
+            if not filters or name in filters
+        }
+        return FullStatus.from_json(
+            {
+                "model": {"name": self.info.name},
+                "applications": applications,
+                "machines": {},
+            }
+        )
+
+    async def block_until(self, *conditions, timeout=None, wait_period=0.5):
+        await self.juju.call("block_until")
+
+        async def _block():
+            while not all(condition() for condition in conditions):
+                await asyncio.sleep(0)
+
+        await asyncio.wait_for(_block(), timeout)
+
+    async def wait_for_idle(self, apps=None, status=None, timeout=None, **kwargs):
+        await self.juju.call("wait_for_idle")
+
+    def add_observer(self, callable, entity_type=None, predicate=None, **kwargs):
+        pass
+
+    async def get_action_output(self, action_id: str) -> dict:
+        await self.juju.call("get_action_output")
+        return {}
+
+
+class FakeApplication:
+    def __init__(self, model: FakeModel, name: str):
+        self.model = model
+        self.name = name
+        self.units: List[FakeUnit] = []
+        self._next_unit = 0
+
+    @property
+    def status(self) -> str:
+        return "active" if self.units else "unknown"
+
+    async def add_unit(self, count: int = 1, to: Optional[str] = None):
+        await self.model.juju.call("add_unit")
+        units = []
+        for _ in range(count):
+            unit = FakeUnit(self, f"{self.name}/{self._next_unit}", to or "0")
+            self._next_unit += 1
+            units.append(unit)
+        self.units.extend(units)
+        return units
+
+    async def destroy_unit(self, *unit_names: str) -> None:
+        await self.model.juju.call("destroy_unit")
+        self.units = [unit for unit in self.units if unit.name not in unit_names]
+
+    async def set_config(self, config: dict) -> None:
+        await self.model.juju.call("set_config")
+
+
+class FakeUnit:
+    def __init__(self, application: FakeApplication, name: str, machine: str):
+        self.application = application.name
+        self.name = name
+        self.machine = SimpleNamespace(id=machine, entity_id=machine)
+        self.workload_status = "active"
+        self.agent_status = "idle"
+        self._juju = application.model.juju
+
+    async def run_action(self, action_name: str, **params):
+        await self._juju.call("run_action")
+        return FakeAction(self._juju)
+
+    async def run(self, command: str, timeout=None, block=False):
+        await self._juju.call("run")
+        return SimpleNamespace(results={"return-code": 0, "stdout": ""})
+
+
+class FakeAction:
+    def __init__(self, juju: FakeJuju):
+        self._juju = juju
+        self.id = str(uuid.uuid4())
+        self._status = "completed"
+        self.results: dict = {}
+
+    async def wait(self) -> None:
+        await self._juju.call("wait_action")
@@ -0,0 +1,334 @@
+# Copyright (c) 2023 Canonical Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Run sunbeam plans end to end against fake clusterd, Juju and CLIs.
+
+Settings are read from the environment:
+
+SUNBEAM_BENCHMARK_CLUSTERD_LATENCY
+    seconds added to every clusterd request
+SUNBEAM_BENCHMARK_JUJU_LATENCY
+    seconds added to every Juju API call
+SUNBEAM_BENCHMARK_TERRAFORM_DURATION
+    seconds taken by every terraform apply
+SUNBEAM_BENCHMARK_RESULTS
+    file measurements are appended to, one JSON object per line
+
+Round-trip budgets, upper bounds per plan, are kept in budgets.yaml.
+"""
+
+import asyncio
+import json
+import os
+import stat
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from io import StringIO
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import yaml
+from rich.console import Console
+
+from tests.benchmark.fake_clusterd import FakeClusterd
+from tests.benchmark.fake_juju import FakeJuju
+
+FAKE_CLI = Path(__file__).parent / "fake_cli.py"
+RESULTS_ENV = "SUNBEAM_BENCHMARK_RESULTS"
+BUDGETS_FILE = Path(__file__).parent / "budgets.yaml"
+# Round-trip categories, a budget sets an upper bound for each
+CATEGORIES = ("clusterd", "juju", "juju-cli", "terraform")
+
+OPENSTACK_APPLICATIONS = [
+    "traefik",
+    "mysql",
+    "rabbitmq",
+    "keystone",
+    "glance",
+    "nova",
+    "placement",
+    "neutron",
+    "ovn-central",
+    "ovn-relay",
+    "horizon",
+    "cinder",
+    "cinder-ceph",
+]
+# Plan directory: (terraform plan name, applications deployed per model)
+TERRAFORM_PLANS = {
+    "deploy-sunbeam-machine": (
+        "sunbeam-machine-plan",
+        {"controller": ["sunbeam-machine"]},
+    ),
+    "deploy-microk8s": ("microk8s-plan", {"controller": ["microk8s"]}),
+    "deploy-microceph": ("microceph-plan", {"controller": ["microceph"]}),
+    "deploy-openstack": ("openstack-plan", {"openstack": OPENSTACK_APPLICATIONS}),
+    "deploy-openstack-hypervisor": (
+        "hypervisor-plan",
+        {"controller": ["openstack-hypervisor"]},
+    ),
+}
+DEBUG_LOG = "".join(
+    f"machine-0: 12:00:{second:02d} INFO juju.worker.uniter run hook\n"
+    for second in range(60)
+)
+
+
+def _env_float(name: str, default: float = 0.0) -> float:
+    return float(os.environ.get(name) or default)
+
+
+@dataclass
+class Measurement:
+    """Round-trips and wall time of one benchmarked operation."""
+
+    name: str
+    wall_time: float = 0.0
+    clusterd: Counter = field(default_factory=Counter)
+    juju: Counter = field(default_factory=Counter)
+    cli: Counter = field(default_factory=Counter)
+
+    def calls(self, category: str) -> Counter:
+        """Calls of category, per route, API call or command."""
+        if category == "clusterd":
+            return self.clusterd
+        if category == "juju":
+            return self.juju
+        tool = category.removesuffix("-cli")
+        return Counter(
+            {
+                command: count
+                for command, count in self.cli.items()
+                if command.split()[0] == tool
+            }
+        )
+
+    @property
+    def totals(self) -> Dict[str, int]:
+        return {category: sum(self.calls(category).values()) for category in CATEGORIES}
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "wall_time": round(self.wall_time, 6),
+            "totals": self.totals,
+            "clusterd": dict(self.clusterd),
+            "juju": dict(self.juju),
+            "cli": dict(self.cli),
+        }
+
+
+class Bench:
+    """A node whose clusterd, Juju controller and CLIs are fakes.
+
+    Snap paths point into root, sunbeam.jobs.juju.Controller is replaced
+    by the fake controller and host lookups return hostname, ip and a
+    fixed amount of memory.
+    """
+
+    def __init__(self, root: Path, monkeypatch, hostname: str = "node-1.local"):
+        self.root = root
+        self.hostname = hostname
+        self.ip = "10.0.0.10"
+        self.snap = root / "snap"
+        self.common = root / "common"
+        self.user_common = root / "user_common"
+        self.user_data = root / "user_data"
+        for path in (self.snap, self.common, self.user_common, self.user_data):
+            path.mkdir(parents=True, exist_ok=True)
+        for plan_dir in TERRAFORM_PLANS:
+            (self.user_common / "etc" / plan_dir).mkdir(parents=True, exist_ok=True)
+
+        self.cli_log = root / "cli.jsonl"
+        self.cli_log.touch()
+        self.clusterd = FakeClusterd(
+            self.common / "state" / "control.socket",
+            latency=_env_float("SUNBEAM_BENCHMARK_CLUSTERD_LATENCY"),
+        )
+        self.juju = FakeJuju(
+            root / "juju-world.json",
+            latency=_env_float("SUNBEAM_BENCHMARK_JUJU_LATENCY"),
+        )
+        self._write_cli_script()
+        self._install_cli(self.snap / "bin" / "terraform", "terraform")
+        self._install_cli(self.snap / "juju" / "bin" / "juju", "juju")
+
+        for name, value in {
+            "SNAP": self.snap,
+            "SNAP_COMMON": self.common,
+            "SNAP_DATA": root / "data",
+            "SNAP_INSTANCE_NAME": "",
+            "SNAP_NAME": "openstack",
+            "SNAP_REVISION": "1",
+            "SNAP_USER_COMMON": self.user_common,
+            "SNAP_USER_DATA": self.user_data,
+            "SNAP_VERSION": "2023.1",
+            "SNAP_REAL_HOME": root,
+            "FAKE_CLI_SCRIPT": root / "cli-script.json",
+        }.items():
+            monkeypatch.setenv(name, str(value))
+        monkeypatch.setattr("sunbeam.jobs.juju.Controller", self.juju.controller)
+        monkeypatch.setattr("sunbeam.utils.get_fqdn", lambda: self.hostname)
+        monkeypatch.setattr(
+            "sunbeam.utils.get_local_ip_by_default_route", lambda: self.ip
+        )
+        # 16GiB, a single node deployment settles on the single topology.
+        for module in ("sunbeam.jobs.common", "sunbeam.commands.openstack"):
+            monkeypatch.setattr(
+                f"{module}.get_host_total_ram", lambda: 16 * 1024 * 1024
+            )
+        self.console = Console(file=StringIO())
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def _write_cli_script(self) -> None:
+        terraform_duration = _env_float("SUNBEAM_BENCHMARK_TERRAFORM_DURATION")
+        script = {
+            "log": str(self.cli_log),
+            "socket": str(self.clusterd.socket_path),
+            "world": str(self.juju.world),
+            "commands": {
+                "terraform apply": {"duration": terraform_duration},
+                "juju debug-log": {"stdout": DEBUG_LOG},
+            },
+            "deploys": {
+                plan_dir: applications
+                for plan_dir, (_, applications) in TERRAFORM_PLANS.items()
+            },
+        }
+        (self.root / "cli-script.json").write_text(json.dumps(script))
+
+    def _install_cli(self, path: Path, tool: str) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(
+            f'#!/bin/sh\nexec "{sys.executable}" "{FAKE_CLI}" {tool} "$@"\n'
+        )
+        path.chmod(path.stat().st_mode | stat.S_IEXEC)
+
+    def start(self) -> None:
+        self.clusterd.start()
+        # What bootstrapping the Juju controller and registering the
+        # user leaves behind, these go through the juju CLI.
+        self.clusterd.config["JujuController"] = json.dumps(
+            {"api_endpoints": [f"{self.ip}:17070"], "ca_cert": "fake-ca"}
+        )
+        (self.user_data / "account.yaml").write_text("user: admin\npassword: pass\n")
+        self.juju.world.write_text(json.dumps({"controller": []}))
+
+    def stop(self) -> None:
+        self.clusterd.stop()
+        self.loop.close()
+        asyncio.set_event_loop(None)
+
+    def cli_invocations(self) -> Counter:
+        with self.cli_log.open() as f:
+            return Counter(json.loads(line)["command"] for line in f)
+
+    def run_plan(self, plan: list) -> dict:
+        from sunbeam.jobs.common import run_plan
+
+        return run_plan(plan, self.console)
+
+    def run_plans(self, name: str, plans: List[list], budget: bool = True) -> dict:
+        """Run plans in order, within the round-trip budget of name.
+
+        :return: results of all the steps
+        """
+        results = {}
+        with self.measure(name) as measurement:
+            for plan in plans:
+                results.update(self.run_plan(plan))
+        if budget:
+            assert_within_budget(measurement)
+        return results
+
+    @contextmanager
+    def measure(self, name: str) -> Iterator[Measurement]:
+        """Count the round-trips made in the block and record them."""
+        measurement = Measurement(name)
+        clusterd = self.clusterd.requests.copy()
+        juju = self.juju.calls.copy()
+        cli = self.cli_invocations()
+        start = time.perf_counter()
+        yield measurement
+        measurement.wall_time = time.perf_counter() - start
+        measurement.clusterd = self.clusterd.requests - clusterd
+        measurement.juju = self.juju.calls - juju
+        measurement.cli = self.cli_invocations() - cli
+        record(measurement)
+
+
+def record(measurement: Measurement, path: Optional[Path] = None) -> None:
+    """Append measurement to the results file, if any."""
+    path = path or (
+        Path(os.environ[RESULTS_ENV]) if RESULTS_ENV in os.environ else None
+    )
+    if path is None:
+        return
+    result = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "settings": {
+            name: os.environ[name]
+            for name in os.environ
+            if name.startswith("SUNBEAM_BENCHMARK_") and name != RESULTS_ENV
+        },
+        **measurement.to_dict(),
+    }
+    with path.open("a") as f:
+        f.write(json.dumps(result) + "\n")
+
+
+def load_budgets(path: Path = BUDGETS_FILE) -> Dict[str, Dict[str, int]]:
+    with path.open() as f:
+        return yaml.safe_load(f)
+
+
+def over_budget(measurement: Measurement, budget: Dict[str, int]) -> List[str]:
+    """Categories of measurement exceeding budget, with their calls."""
+    exceeded = []
+    totals = measurement.totals
+    for category in CATEGORIES:
+        limit = budget.get(category, 0)
+        if totals[category] <= limit:
+            continue
+        calls = ", ".join(
+            f"{name}: {count}"
+            for name, count in measurement.calls(category).most_common()
+        )
+        exceeded.append(f"{category} {totals[category]} > {limit} ({calls})")
+    return exceeded
+
+
+def assert_within_budget(
+    measurement: Measurement, budgets: Optional[Dict[str, Dict[str, int]]] = None
+) -> None:
+    """Fail if measurement makes more round-trips than its budget allows.
+
+    Budgets are upper bounds: lower them when a change saves round-trips,
+    raise them only when the extra calls are intended.
+    """
+    budgets = budgets if budgets is not None else load_budgets()
+    if measurement.name not in budgets:
+        raise AssertionError(f"No round-trip budget for {measurement.name!r}")
+    exceeded = over_budget(measurement, budgets[measurement.name])
+    if exceeded:
+        details = "; ".join(exceeded)
+        raise AssertionError(
+            f"{measurement.name!r} is over its round-trip budget: {details}"
+        )
@@ -0,0 +1,154 @@
+# Copyright (c) 2023 Canonical Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""The plans of the bootstrap, add, join, node list and resize commands.
+
+Steps driving juju through the CLI login and bootstrap, and steps
+talking to Kubernetes or the machine itself are left out: the rest of
+each plan is built exactly as the command builds it.
+"""
+
+from typing import Dict, List
+
+from sunbeam.commands.bootstrap_state import SetBootstrapped
+from sunbeam.commands.clusterd import (
+    ClusterAddNodeStep,
+    ClusterInitStep,
+    ClusterJoinNodeStep,
+    ClusterListNodeStep,
+    ClusterUpdateNodeStep,
+)
+from sunbeam.commands.hypervisor import (
+    AddHypervisorUnitStep,
+    DeployHypervisorApplicationStep,
+)
+from sunbeam.commands.microceph import DeployMicrocephApplicationStep
+from sunbeam.commands.microk8s import AddMicrok8sUnitStep, DeployMicrok8sApplicationStep
+from sunbeam.commands.openstack import DeployControlPlaneStep, ResizeControlPlaneStep
+from sunbeam.commands.sunbeam_machine import (
+    AddSunbeamMachineUnitStep,
+    DeploySunbeamMachineApplicationStep,
+)
+from sunbeam.commands.terraform import TerraformHelper, TerraformInitStep
+from sunbeam.jobs.juju import JujuHelper
+from tests.benchmark.harness import TERRAFORM_PLANS, Bench
+
+
+def terraform_helpers(bench: Bench) -> Dict[str, TerraformHelper]:
+    return {
+        plan_dir: TerraformHelper(
+            path=bench.user_common / "etc" / plan_dir,
+            plan=plan,
+            backend="http",
+            data_location=bench.user_data,
+        )
+        for plan_dir, (plan, _) in TERRAFORM_PLANS.items()
+    }
+
+
+def bootstrap_plans(bench: Bench, roles: List[str]) -> List[list]:
+    tfhelpers = terraform_helpers(bench)
+    jhelper = JujuHelper(bench.user_data)
+    fqdn = bench.hostname
+
+    plan1 = [ClusterInitStep(roles)]
+
+    plan4 = []
+    plan4.append(TerraformInitStep(tfhelpers["deploy-sunbeam-machine"]))
+    plan4.append(
+        DeploySunbeamMachineApplicationStep(
+            tfhelpers["deploy-sunbeam-machine"], jhelper
+        )
+    )
+    plan4.append(AddSunbeamMachineUnitStep(fqdn, jhelper))
+    plan4.append(TerraformInitStep(tfhelpers["deploy-microk8s"]))
+    plan4.append(
+        DeployMicrok8sApplicationStep(
+            tfhelpers["deploy-microk8s"], jhelper, accept_defaults=True
+        )
+    )
+    plan4.append(AddMicrok8sUnitStep(fqdn, jhelper))
+    plan4.append(TerraformInitStep(tfhelpers["deploy-microceph"]))
+    plan4.append(DeployMicrocephApplicationStep(tfhelpers["deploy-microceph"], jhelper))
+    if "control" in roles:
+        plan4.append(TerraformInitStep(tfhelpers["deploy-openstack"]))
+        plan4.append(
+            DeployControlPlaneStep(
+                tfhelpers["deploy-openstack"], jhelper, "auto", "auto"
+            )
+        )
+
+    plan5 = []
+    if "compute" in roles:
+        plan5.append(TerraformInitStep(tfhelpers["deploy-openstack-hypervisor"]))
+        plan5.append(
+            DeployHypervisorApplicationStep(
+                tfhelpers["deploy-openstack-hypervisor"],
+                tfhelpers["deploy-openstack"],
+                jhelper,
+            )
+        )
+        plan5.append(AddHypervisorUnitStep(fqdn, jhelper))
+    plan5.append(SetBootstrapped())
+
+    return [plan1, plan4, plan5]
+
+
+def add_node_plans(bench: Bench, name: str) -> List[list]:
+    return [[ClusterAddNodeStep(name)]]
+
+
+def join_plans(
+    bench: Bench, token: str, roles: List[str], machine_id: int
+) -> List[list]:
+    tfhelpers = terraform_helpers(bench)
+    jhelper = JujuHelper(bench.user_data)
+    name = bench.hostname
+
+    plan1 = [ClusterJoinNodeStep(token, roles)]
+
+    plan2 = []
+    plan2.append(ClusterUpdateNodeStep(name, machine_id=machine_id))
+    plan2.append(AddSunbeamMachineUnitStep(name, jhelper))
+    if "control" in roles:
+        plan2.append(AddMicrok8sUnitStep(name, jhelper))
+    if "compute" in roles:
+        plan2.extend(
+            [
+                TerraformInitStep(tfhelpers["deploy-openstack-hypervisor"]),
+                DeployHypervisorApplicationStep(
+                    tfhelpers["deploy-openstack-hypervisor"],
+                    tfhelpers["deploy-openstack"],
+                    jhelper,
+                ),
+                AddHypervisorUnitStep(name, jhelper),
+            ]
+        )
+    return [plan1, plan2]
+
+
+def list_nodes_plans(bench: Bench) -> List[list]:
+    return [[ClusterListNodeStep()]]
+
+
+def resize_plans(bench: Bench) -> List[list]:
+    tfhelper = terraform_helpers(bench)["deploy-openstack"]
+    jhelper = JujuHelper(bench.user_data)
+    return [
+        [
+            TerraformInitStep(tfhelper),
+            ResizeControlPlaneStep(tfhelper, jhelper, "auto", False),
+        ]
+    ]
@@ -0,0 +1,178 @@
+# Copyright (c) 2023 Canonical Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import tarfile
+import threading
+from collections import Counter
+
+import pytest
+
+from sunbeam.clusterd.client import Client
+from sunbeam.jobs.common import ResultType, modify_config
+from sunbeam.jobs.juju import JujuHelper, run_sync
+from tests.benchmark import plans
+from tests.benchmark.harness import assert_within_budget
+
+ROLES = ["control", "compute"]
+EXPIRED = "2023-07-10T12:00:00.000000000Z"
+
+
+def bootstrap(bench, budget=False):
+    plan_list = plans.bootstrap_plans(bench, ROLES)
+    return bench.run_plans("bootstrap", plan_list, budget=budget)
+
+
+def test_bootstrap(bench):
+    results = bootstrap(bench, budget=True)
+
+    assert {result.result_type for result in results.values()} == {ResultType.COMPLETED}
+    assert bench.clusterd.config["sunbeam_bootstrapped"] == '"True"'
+    assert len(bench.clusterd.config["tfstate-openstack-plan"]) > 0
+    units = bench.juju.models["controller"].units
+    assert sorted(units) == [
+        "microk8s/0",
+        "openstack-hypervisor/0",
+        "sunbeam-machine/0",
+    ]
+
+
+def test_join(bench):
+    bootstrap(bench)
+    results = bench.run_plans("add", plans.add_node_plans(bench, "node-2.local"))
+    token = results["ClusterAddNodeStep"].message
+
+    bench.hostname = "node-2.local"
+    results = bench.run_plans("join", plans.join_plans(bench, token, ROLES, 1))
+
+    assert ResultType.FAILED not in {r.result_type for r in results.values()}
+    assert bench.clusterd.nodes["node-2.local"]["machineid"] == 1
+    units = bench.juju.models["controller"].units
+    assert units["openstack-hypervisor/1"].machine.id == "1"
+
+
+def test_resize_reclaims_expired_lock(bench):
+    bootstrap(bench)
+    # Left behind by a terraform apply that died
+    bench.clusterd.config["tflock-openstack-plan"] = json.dumps(
+        {"ID": "dead", "Operation": "OperationTypeApply", "Expires": EXPIRED}
+    )
+    results = bench.run_plans("resize", plans.resize_plans(bench))
+
+    assert results["ResizeControlPlaneStep"].result_type == ResultType.COMPLETED
+    assert "tflock-openstack-plan" not in bench.clusterd.config
+
+
+def test_list_nodes(bench):
+    bootstrap(bench)
+    results = bench.run_plans("list", plans.list_nodes_plans(bench))
+
+    assert results["ClusterListNodeStep"].message == {
+        "node-1.local": {"status": "ONLINE", "roles": ROLES}
+    }
+
+
+def test_resize(bench):
+    bootstrap(bench)
+    results = bench.run_plans("resize", plans.resize_plans(bench))
+
+    assert results["ResizeControlPlaneStep"].result_type == ResultType.COMPLETED
+    topology = json.loads(bench.clusterd.config["Topology"])
+    assert topology["topology"] == "single"
+    assert topology["scale"]["ha-scale"] == 1
+
+    # Nothing changed, the second resize leaves terraform alone
+    with bench.measure("resize") as measurement:
+        bench.run_plans("resize", plans.resize_plans(bench), budget=False)
+    assert measurement.calls("terraform") == Counter({"terraform init": 1})
+
+
+def test_inspect(bench, tmp_path):
+    from sunbeam.commands.inspect import (
+        InspectionArchive,
+        collect_inspection_report,
+    )
+
+    bootstrap(bench)
+    jhelper = JujuHelper(bench.user_data)
+    report = tmp_path / "report.tar"
+    with bench.measure("inspect") as measurement:
+        with tarfile.open(report, "w") as tar:
+            failures = run_sync(
+                collect_inspection_report(
+                    jhelper, ["controller", "openstack"], InspectionArchive(tar)
+                )
+            )
+
+    assert failures == {}
+    with tarfile.open(report) as tar:
+        assert sorted(tar.getnames()) == [
+            "./debug_log_controller.out",
+            "./debug_log_openstack.out",
+            "./juju_status_controller.out",
+            "./juju_status_openstack.out",
+        ]
+    assert_within_budget(measurement)
+
+
+def test_watch_terraform_locks(bench):
+    bootstrap(bench)
+    client = Client()
+    revision = client.cluster.get_config_revision("tflock-", prefix=True)
+    lock = json.dumps({"ID": "lock-id", "Operation": "OperationTypeApply"})
+    writer = threading.Timer(
+        0.2, client.cluster.update_config, ("tflock-openstack-plan", lock)
+    )
+
+    with bench.measure("watch") as measurement:
+        writer.start()
+        watch = client.cluster.watch_terraform_locks(revision, timeout=5)
+        changed = next(watch)
+    writer.join()
+
+    assert changed > revision
+    assert measurement.clusterd["GET /1.0/watch/config"] == 1
+
+
+def test_parallel_modify_config(bench):
+    bootstrap(bench)
+    client = Client()
+
+    def increment(config: dict) -> dict:
+        return {**config, "count": config.get("count", 0) + 1}
+
+    writers = [
+        threading.Thread(
+            target=modify_config, args=(Client(), "counter", increment, 50)
+        )
+        for _ in range(4)
+    ]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+
+    assert json.loads(client.cluster.get_config("counter")) == {"count": 4}
+
+
+def test_over_budget(bench):
+    bootstrap(bench)
+    with bench.measure("resize") as measurement:
+        bench.run_plans("resize", plans.resize_plans(bench), budget=False)
+        bench.run_plans("resize", plans.resize_plans(bench), budget=False)
+
+    with pytest.raises(AssertionError, match="over its round-trip budget") as e:
+        assert_within_budget(measurement)
+    assert "terraform 3 > 2 (terraform init: 2, terraform apply: 1)" in str(e.value)
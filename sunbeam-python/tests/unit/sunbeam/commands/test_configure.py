@@ -15,9 +15,11 @@
 import asyncio
 import io
 import json
+import sys
 from pathlib import Path
 from unittest.mock import AsyncMock, Mock, patch
 
+import click
 import pytest
 from rich.console import Console
 
@@ -329,6 +331,129 @@ class TestDemoSetup:
         result = step.run()
         assert result.result_type == ResultType.FAILED
 
+    def test_run_retries_with_refreshed_credentials(
+        self, cclient, thelper, load_answers
+    ):
+        load_answers.return_value = {"user": {"foo": "bar"}}
+        thelper.apply.side_effect = [
+            TerraformException(
+                "apply failed",
+                output="Error: Error creating OpenStack client: Authentication failed",
+            ),
+            None,
+        ]
+        refresh = Mock(return_value={"OS_PASSWORD": "new"})
+        step = configure.DemoSetup(thelper, "/tmp/dummy", refresh_credentials=refresh)
+        result = step.run()
+        refresh.assert_called_once_with()
+        assert thelper.env == {"OS_PASSWORD": "new"}
+        assert thelper.apply.call_count == 2
+        assert result.result_type == ResultType.COMPLETED
+
+    def test_run_retry_fails(self, cclient, thelper, load_answers):
+        load_answers.return_value = {"user": {"foo": "bar"}}
+        thelper.apply.side_effect = TerraformException(
+            "apply failed", output="(HTTP 401)"
+        )
+        refresh = Mock(return_value={})
+        step = configure.DemoSetup(thelper, "/tmp/dummy", refresh_credentials=refresh)
+        result = step.run()
+        assert thelper.apply.call_count == 2
+        assert result.result_type == ResultType.FAILED
+
+    def test_run_does_not_retry_plan_failure(self, cclient, thelper, load_answers):
+        load_answers.return_value = {"user": {"foo": "bar"}}
+        thelper.apply.side_effect = TerraformException(
+            "apply failed", output="Error: Invalid CIDR"
+        )
+        refresh = Mock(return_value={})
+        step = configure.DemoSetup(thelper, "/tmp/dummy", refresh_credentials=refresh)
+        result = step.run()
+        refresh.assert_not_called()
+        assert thelper.apply.call_count == 1
+        assert result.result_type == ResultType.FAILED
+
+
+class TestAdminCredentials:
+    account = {
+        "username": "admin",
+        "password": "secret",
+        "public-endpoint": "http://10.0.0.1:5000/v3",
+        "api-version": 3,
+        "openrc": "export OS_USERNAME=admin",
+    }
+
+    @pytest.fixture()
+    def kjhelper(self, tmp_path):
+        jhelper = AsyncMock()
+        jhelper.data_location = tmp_path
+        jhelper.get_leader_unit.return_value = "keystone/0"
+        jhelper.run_action.return_value = dict(self.account)
+        yield jhelper
+
+    def test_retrieve_caches_action_result(self, kjhelper, tmp_path, snap):
+        snap.config.get.return_value = 60
+        with patch("sunbeam.commands.configure.Snap", return_value=snap):
+            creds = configure.retrieve_admin_credentials(kjhelper, "openstack")
+            again = configure.retrieve_admin_credentials(kjhelper, "openstack")
+        snap.config.get.assert_called_with("credentials.ttl")
+        assert again == creds
+        kjhelper.run_action.assert_called_once()
+        assert creds["OS_USERNAME"] == "admin"
+        assert creds["OS_AUTH_URL"] == "http://10.0.0.1:5000/v3"
+        credentials_file = tmp_path / configure.ADMIN_CREDENTIALS_FILE
+        assert credentials_file.stat().st_mode & 0o777 == 0o600
+
+    def test_refresh_bypasses_cache(self, kjhelper):
+        configure.get_admin_account(kjhelper, "openstack", ttl=60)
+        configure.get_admin_account(kjhelper, "openstack", refresh=True, ttl=60)
+        assert kjhelper.run_action.call_count == 2
+
+    def test_expired_cache(self, kjhelper, tmp_path):
+        credentials_file = tmp_path / configure.ADMIN_CREDENTIALS_FILE
+        credentials_file.write_text(
+            json.dumps({"timestamp": 0, "account": {"username": "stale"}})
+        )
+        account = configure.get_admin_account(kjhelper, "openstack", ttl=60)
+        assert account["username"] == "admin"
+        kjhelper.run_action.assert_called_once()
+
+    def test_ttl_zero_disables_cache(self, kjhelper, tmp_path):
+        configure.get_admin_account(kjhelper, "openstack", ttl=0)
+        configure.get_admin_account(kjhelper, "openstack", ttl=0)
+        assert kjhelper.run_action.call_count == 2
+        assert not (tmp_path / configure.ADMIN_CREDENTIALS_FILE).exists()
+
+    def test_invalidate(self, kjhelper, tmp_path):
+        configure.get_admin_account(kjhelper, "openstack", ttl=60)
+        configure.invalidate_admin_credentials(tmp_path)
+        configure.invalidate_admin_credentials(tmp_path)
+        configure.get_admin_account(kjhelper, "openstack", ttl=60)
+        assert kjhelper.run_action.call_count == 2
+
+    def test_verify_refreshes_rejected_credentials(self, kjhelper, tmp_path):
+        class SDKException(Exception):
+            pass
+
+        fake_openstack = Mock()
+        fake_openstack.exceptions.SDKException = SDKException
+        fake_openstack.connect.return_value.authorize.side_effect = SDKException(
+            "The request you have made requires authentication. (HTTP 401)"
+        )
+        configure.get_admin_account(kjhelper, "openstack", ttl=60)
+        with patch.dict(sys.modules, {"openstack": fake_openstack}), patch(
+            "sunbeam.commands.configure.admin_credentials_ttl", return_value=60
+        ):
+            creds = configure.verify_admin_credentials(kjhelper, "openstack")
+        assert creds["OS_USERNAME"] == "admin"
+        assert kjhelper.run_action.call_count == 2
+
+    def test_action_failure_not_cached(self, kjhelper, tmp_path):
+        kjhelper.run_action.return_value = {"return-code": 2}
+        with pytest.raises(click.ClickException):
+            configure.get_admin_account(kjhelper, "openstack", ttl=60)
+        assert not (tmp_path / configure.ADMIN_CREDENTIALS_FILE).exists()
+
 
 class TestTerraformDemoInitStep:
     def test_is_skip_demo_setup(self, cclient, thelper, load_answers):
@@ -0,0 +1,429 @@
+# Copyright 2023 Canonical Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import datetime
+import io
+import json
+import os
+import tarfile
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+import zstandard
+from juju.client.client import FullStatus
+
+from sunbeam.jobs.juju import ModelNotFoundException
+
+SNAP_ENV = {
+    "SNAP": "/snap/mysnap/2",
+    "SNAP_COMMON": "/var/snap/mysnap/common",
+    "SNAP_DATA": "/var/snap/mysnap/2",
+    "SNAP_INSTANCE_NAME": "",
+    "SNAP_NAME": "mysnap",
+    "SNAP_REVISION": "2",
+    "SNAP_USER_COMMON": "",
+    "SNAP_USER_DATA": "",
+    "SNAP_VERSION": "1.2.3",
+    "SNAP_REAL_HOME": "/home/ubuntu",
+}
+
+# sunbeam.commands.node resolves the snap environment at import time.
+with patch.dict(os.environ, SNAP_ENV):
+    import sunbeam.commands.inspect as inspect
+
+
+@pytest.fixture()
+def jhelper():
+    jhelper = AsyncMock()
+    jhelper.get_model.side_effect = lambda model: Mock(info=Mock(uuid=f"{model}-uuid"))
+    jhelper.get_model_status_full.return_value = Mock(
+        to_json=Mock(return_value='{"applications": {}}')
+    )
+    yield jhelper
+
+
+@pytest.fixture()
+def debug_log(mocker):
+    """Fake juju debug-log writing the model uuid to its stdout."""
+    calls = []
+
+    async def create_subprocess_exec(*cmd, stdout, **kwargs):
+        calls.append(cmd)
+        data = f"log of {cmd[cmd.index('--model') + 1]}\n".encode()
+        process = Mock(wait=AsyncMock(return_value=0))
+        if stdout == asyncio.subprocess.PIPE:
+            process.stdout = stream_of(data)
+        else:
+            stdout.write(data)
+            stdout.flush()
+        return process
+
+    mocker.patch.object(
+        inspect.asyncio, "create_subprocess_exec", create_subprocess_exec
+    )
+    mocker.patch.object(inspect.JujuStepHelper, "_get_juju_binary", return_value="juju")
+    yield calls
+
+
+def stream_of(data: bytes) -> asyncio.StreamReader:
+    reader = asyncio.StreamReader()
+    reader.feed_data(data)
+    reader.feed_eof()
+    return reader
+
+
+def read_archive(buffer: io.BytesIO) -> dict:
+    buffer.seek(0)
+    with tarfile.open(fileobj=buffer, mode="r") as tar:
+        return {
+            member.name: tar.extractfile(member).read()
+            for member in tar.getmembers()
+            if member.isfile()
+        }
+
+
+class TestInspectionArchive:
+    def test_add_members(self, tmp_path):
+        (tmp_path / "logs").mkdir()
+        (tmp_path / "logs" / "sunbeam.log").write_text("hello")
+        spool = io.BytesIO(b"spooled")
+        spool.seek(3)
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w") as tar:
+            archive = inspect.InspectionArchive(tar)
+            archive.add_bytes("status.out", b"{}")
+            archive.add_fileobj("debug.out", spool)
+            archive.add_path(tmp_path / "logs", "logs")
+
+        assert read_archive(buffer) == {
+            "./status.out": b"{}",
+            "./debug.out": b"spooled",
+            "./logs/sunbeam.log": b"hello",
+        }
+
+
+@pytest.mark.asyncio
+async def test_collect_inspection_report(jhelper, debug_log, tmp_path):
+    (tmp_path / "logs").mkdir()
+    (tmp_path / "logs" / "sunbeam.log").write_text("hello")
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w") as tar:
+        failures = await inspect.collect_inspection_report(
+            jhelper,
+            ["controller", "openstack"],
+            inspect.InspectionArchive(tar),
+            log_dir=tmp_path / "logs",
+            spool_dir=tmp_path,
+        )
+
+    assert failures == {}
+    members = read_archive(buffer)
+    assert members["./debug_log_openstack.out"] == b"log of openstack-uuid\n"
+    assert members["./debug_log_controller.out"] == b"log of controller-uuid\n"
+    assert json.loads(members["./juju_status_openstack.out"]) == {"applications": {}}
+    assert members["./logs/sunbeam.log"] == b"hello"
+    # Spool files are anonymous, nothing is left behind next to the report.
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["logs"]
+
+
+@pytest.mark.asyncio
+async def test_collect_inspection_report_concurrent(jhelper, debug_log):
+    in_flight = set()
+    both_started = asyncio.Event()
+
+    async def get_model_status_full(model):
+        in_flight.add(model)
+        if len(in_flight) == 2:
+            both_started.set()
+        # Deadlocks unless the models are collected concurrently.
+        await asyncio.wait_for(both_started.wait(), timeout=5)
+        return Mock(to_json=Mock(return_value="{}"))
+
+    jhelper.get_model_status_full.side_effect = get_model_status_full
+    with tarfile.open(fileobj=io.BytesIO(), mode="w") as tar:
+        failures = await inspect.collect_inspection_report(
+            jhelper, ["controller", "openstack"], inspect.InspectionArchive(tar)
+        )
+
+    assert failures == {}
+    assert in_flight == {"controller", "openstack"}
+
+
+@pytest.mark.asyncio
+async def test_collect_inspection_report_partial(jhelper, debug_log):
+    def get_model(model):
+        if model == "controller":
+            raise ModelNotFoundException("not found")
+        return Mock(info=Mock(uuid=f"{model}-uuid"))
+
+    jhelper.get_model.side_effect = get_model
+    jhelper.get_model_status_full.side_effect = Exception("status timed out")
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w") as tar:
+        failures = await inspect.collect_inspection_report(
+            jhelper, ["controller", "openstack"], inspect.InspectionArchive(tar)
+        )
+
+    assert failures == {"juju status openstack": "status timed out"}
+    assert list(read_archive(buffer)) == ["./debug_log_openstack.out"]
+    assert len(debug_log) == 1
+
+
+NOW = datetime.datetime(2023, 10, 19, 12, 0, 0)
+DEBUG_LOG = b"""\
+machine-0: 2023-10-19 09:00:00 INFO juju.worker old
+unit-mysql-0: 2023-10-19 10:30:00 ERROR juju.worker.uniter hook failed
+Traceback (most recent call last):
+unit-mysql-0: 2023-10-19 11:00:00 INFO juju.worker.uniter recent
+"""
+
+
+@pytest.mark.parametrize(
+    "value,expected",
+    [
+        ("90s", NOW - datetime.timedelta(seconds=90)),
+        ("30m", NOW - datetime.timedelta(minutes=30)),
+        ("2h", NOW - datetime.timedelta(hours=2)),
+        ("1d", NOW - datetime.timedelta(days=1)),
+        ("2023-10-18T08:00:00", datetime.datetime(2023, 10, 18, 8)),
+        ("2023-10-18T10:00:00+02:00", datetime.datetime(2023, 10, 18, 8)),
+    ],
+)
+def test_parse_since(value, expected):
+    assert inspect.parse_since(value, now=NOW) == expected
+
+
+@pytest.mark.parametrize(
+    "value,expected",
+    [
+        ("1024", 1024),
+        ("512K", 512 * 1024),
+        ("100M", 100 * 1024**2),
+        ("2GiB", 2 * 1024**3),
+    ],
+)
+def test_parse_size(value, expected):
+    assert inspect.parse_size(value) == expected
+
+
+@pytest.mark.parametrize(
+    "parser,value", [(inspect.parse_since, "yesterday"), (inspect.parse_size, "lots")]
+)
+def test_parse_invalid(parser, value):
+    with pytest.raises(ValueError):
+        parser(value)
+
+
+class TestDebugLogFilter:
+    def test_juju_args(self):
+        log_filter = inspect.DebugLogFilter(
+            include=["mysql", "unit-nova-0"], exclude=["machine-0"], level="ERROR"
+        )
+        assert log_filter.juju_args() == [
+            "--include",
+            "mysql",
+            "--include",
+            "unit-nova-0",
+            "--exclude",
+            "machine-0",
+            "--level",
+            "ERROR",
+        ]
+        assert not log_filter.streaming
+
+    def test_juju_args_since(self):
+        log_filter = inspect.DebugLogFilter(since=NOW)
+        assert log_filter.juju_args() == ["--date", "--utc"]
+        assert log_filter.streaming
+
+    @pytest.mark.asyncio
+    async def test_filter_since(self):
+        out = io.BytesIO()
+        log_filter = inspect.DebugLogFilter(since=datetime.datetime(2023, 10, 19, 10))
+        truncated = await log_filter.filter_stream(stream_of(DEBUG_LOG), out)
+        assert not truncated
+        # The traceback follows its timestamped line.
+        assert out.getvalue() == DEBUG_LOG.split(b"\n", 1)[1]
+
+    @pytest.mark.asyncio
+    async def test_filter_budget(self):
+        out = io.BytesIO()
+        budget = len(b"".join(DEBUG_LOG.splitlines(keepends=True)[:2]))
+        log_filter = inspect.DebugLogFilter(max_bytes=budget)
+        truncated = await log_filter.filter_stream(stream_of(DEBUG_LOG), out)
+        assert truncated
+        lines = out.getvalue().splitlines()
+        assert lines[:2] == DEBUG_LOG.splitlines()[:2]
+        assert lines[2:] == [f"... truncated at {budget} bytes".encode()]
+
+
+@pytest.mark.asyncio
+async def test_collect_debug_log_filtered(debug_log):
+    buffer = io.BytesIO()
+    log_filter = inspect.DebugLogFilter(include=["mysql"], max_bytes=4)
+    with tarfile.open(fileobj=buffer, mode="w") as tar:
+        await inspect.collect_debug_log(
+            "openstack",
+            "openstack-uuid",
+            inspect.InspectionArchive(tar),
+            log_filter=log_filter,
+        )
+
+    assert debug_log[0][-2:] == ("--include", "mysql")
+    assert read_archive(buffer) == {
+        "./debug_log_openstack.out": b"... truncated at 4 bytes\n"
+    }
+
+
+@pytest.mark.parametrize(
+    "compression,level",
+    [("gzip", None), ("gzip", 1), ("zstd", None), ("zstd", 19), ("none", None)],
+)
+def test_open_archive(tmp_path, compression, level):
+    (tmp_path / "logs").mkdir()
+    (tmp_path / "logs" / "sunbeam.log").write_text("hello")
+    path = tmp_path / f"report{inspect.COMPRESSION_EXTENSIONS[compression]}"
+    with inspect.open_archive(path, compression, level) as tar:
+        archive = inspect.InspectionArchive(tar)
+        archive.add_bytes("status.out", b"{}")
+        archive.add_fileobj("debug.out", io.BytesIO(b"log" * 1000))
+        archive.add_path(tmp_path / "logs", "logs")
+
+    data = path.read_bytes()
+    if compression == "zstd":
+        data = zstandard.ZstdDecompressor().stream_reader(data).read()
+    assert read_archive(io.BytesIO(data)) == {
+        "./status.out": b"{}",
+        "./debug.out": b"log" * 1000,
+        "./logs/sunbeam.log": b"hello",
+    }
+
+
+@pytest.mark.parametrize(
+    "compression,level", [("gzip", 10), ("zstd", 0), ("zstd", 23), ("none", 1)]
+)
+def test_open_archive_invalid_level(tmp_path, compression, level):
+    with pytest.raises(ValueError):
+        with inspect.open_archive(tmp_path / "report", compression, level):
+            pass
+    assert not (tmp_path / "report").exists()
+
+
+def full_status(workload="active", units=("mysql/0",), timestamp="t0"):
+    return FullStatus.from_json(
+        {
+            "applications": {
+                "mysql": {
+                    "charm": "mysql-k8s",
+                    "status": {"status": "active"},
+                    "units": {
+                        unit: {"workload-status": {"status": workload}}
+                        for unit in units
+                    },
+                }
+            },
+            "machines": {"0": {"id": "0", "hostname": "node-1"}},
+            "relations": [{"id": 1, "key": "mysql:database keystone:database"}],
+            "model": {"name": "openstack"},
+            "controller-timestamp": timestamp,
+        }
+    )
+
+
+class TestStatusSnapshot:
+    def test_status_entities(self):
+        entities = {
+            (kind, name): doc
+            for kind, name, doc in inspect.status_entities(full_status())
+        }
+        assert {
+            ("application", "mysql"),
+            ("machine", "0"),
+            ("model", ""),
+            ("relation", "1"),
+            ("unit", "mysql/0"),
+        } <= entities.keys()
+        assert ("controller-timestamp", "") not in entities
+        assert "units" not in entities[("application", "mysql")]
+
+    @pytest.mark.parametrize("format", ["json", "ndjson"])
+    def test_round_trip(self, tmp_path, format):
+        path = tmp_path / "snapshot"
+        with path.open("wb") as f:
+            inspect.write_status_snapshot(full_status(), f, format)
+
+        entities = inspect.load_status_snapshot(path)
+        assert entities[("unit", "mysql/0")]["workload-status"]["status"] == "active"
+        assert entities[("machine", "0")]["hostname"] == "node-1"
+
+    def test_json_is_single_pass_to_json(self):
+        f = io.BytesIO()
+        status = full_status()
+        inspect.write_status_snapshot(status, f, "json")
+        assert json.loads(f.getvalue()) == json.loads(status.to_json())
+
+    def test_diff(self, tmp_path):
+        old, new = tmp_path / "old", tmp_path / "new"
+        with old.open("wb") as f:
+            inspect.write_status_snapshot(full_status(), f, "ndjson")
+        with new.open("wb") as f:
+            inspect.write_status_snapshot(
+                full_status(
+                    workload="blocked", units=("mysql/0", "mysql/1"), timestamp="t1"
+                ),
+                f,
+                "json",
+            )
+
+        changes = inspect.diff_status_snapshots(
+            inspect.load_status_snapshot(old), inspect.load_status_snapshot(new)
+        )
+        assert changes == [
+            (
+                "changed",
+                "unit/mysql/0",
+                "workload-status.status",
+                "active",
+                "blocked",
+            ),
+            ("added", "unit/mysql/1", "", None, None),
+        ]
+
+    def test_diff_identical(self, tmp_path):
+        path = tmp_path / "snapshot"
+        with path.open("wb") as f:
+            inspect.write_status_snapshot(full_status(), f, "ndjson")
+        entities = inspect.load_status_snapshot(path)
+        assert inspect.diff_status_snapshots(entities, entities) == []
+
+
+def test_aggregate_timings(tmp_path):
+    events = tmp_path / "events.jsonl"
+    lines = [
+        {"kind": "step", "name": "A", "duration": d, "invocation": str(i % 2)}
+        for i, d in enumerate(range(1, 11))
+    ]
+    lines.append({"kind": "step", "name": "B", "duration": 0.5, "outcome": "failed"})
+    lines.append({"kind": "juju", "name": "get_model", "duration": 100})
+    events.write_text(
+        "\n".join(json.dumps(line) for line in lines) + "\nnot json\n{}\n"
+    )
+
+    timings = inspect.aggregate_timings(inspect.load_events([events]), kind="step")
+    assert [t["name"] for t in timings] == ["A", "B"]
+    a, b = timings
+    assert (a["count"], a["runs"], a["errors"]) == (10, 2, 0)
+    assert (a["p50"], a["p90"], a["p99"], a["max"]) == (5, 9, 10, 10)
+    assert b["errors"] == 1
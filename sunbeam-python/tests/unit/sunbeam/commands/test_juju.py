@@ -45,67 +45,6 @@ def jhelper():
     yield AsyncMock()
 
 
-@pytest.fixture()
-def mock_open():
-    with patch.object(Path, "open") as p:
-        yield p
-
-
-class TestWriteJujuStatusStep:
-    def test_is_skip(self, jhelper):
-        with tempfile.NamedTemporaryFile() as tmpfile:
-            step = juju.WriteJujuStatusStep(jhelper, "openstack", tmpfile)
-            result = step.is_skip()
-
-        assert result.result_type == ResultType.COMPLETED
-
-    def test_is_skip_when_model_not_present(self, jhelper):
-        jhelper.get_model.side_effect = ModelNotFoundException("not found")
-        with tempfile.NamedTemporaryFile() as tmpfile:
-            step = juju.WriteJujuStatusStep(jhelper, "openstack", tmpfile)
-            result = step.is_skip()
-
-        assert result.result_type == ResultType.SKIPPED
-
-    def test_run(self, jhelper):
-        status_mock = Mock()
-        status_mock.to_json.return_value = (
-            '{"applications": {"controller": {"status": "active"}}}'
-        )
-        jhelper.get_model_status_full.return_value = status_mock
-        with tempfile.NamedTemporaryFile() as tmpfile:
-            step = juju.WriteJujuStatusStep(jhelper, "openstack", Path(tmpfile.name))
-            result = step.run()
-
-        jhelper.get_model_status_full.assert_called_once()
-        assert result.result_type == ResultType.COMPLETED
-
-
-class TestWriteCharmLogStep:
-    def test_is_skip(self, jhelper):
-        with tempfile.NamedTemporaryFile() as tmpfile:
-            step = juju.WriteCharmLogStep(jhelper, "openstack", tmpfile)
-            result = step.is_skip()
-
-        assert result.result_type == ResultType.COMPLETED
-
-    def test_is_skip_when_model_not_present(self, jhelper):
-        jhelper.get_model.side_effect = ModelNotFoundException("not found")
-        with tempfile.NamedTemporaryFile() as tmpfile:
-            step = juju.WriteCharmLogStep(jhelper, "openstack", tmpfile)
-            result = step.is_skip()
-
-        assert result.result_type == ResultType.SKIPPED
-
-    def test_run(self, mocker, snap, check_call, mock_open):
-        mocker.patch.object(juju, "Snap", return_value=snap)
-        with tempfile.NamedTemporaryFile() as tmpfile:
-            step = juju.WriteCharmLogStep(jhelper, "openstack", Path(tmpfile.name))
-            result = step.run()
-
-        assert result.result_type == ResultType.COMPLETED
-
-
 class TestJujuGrantModelAccessStep:
     def test_run(self, mocker, snap, jhelper, run):
         mocker.patch.object(juju, "Snap", return_value=snap)
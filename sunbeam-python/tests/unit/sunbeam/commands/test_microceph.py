@@ -13,18 +13,27 @@
 # limitations under the License.
 
 import asyncio
+import json
+import time
 import unittest
 from pathlib import Path
 from unittest.mock import AsyncMock, Mock, patch
 
 import pytest
 
-from sunbeam.clusterd.service import NodeNotExistInClusterException
+from sunbeam.clusterd.service import (
+    ConfigItemNotFoundException,
+    NodeNotExistInClusterException,
+)
 from sunbeam.commands.microceph import (
     AddMicrocephUnitStep,
     ConfigureMicrocephOSDStep,
     DeployMicrocephApplicationStep,
     RemoveMicrocephUnitStep,
+    enroll_osds,
+    load_microceph_answers,
+    parse_disks,
+    refresh_disk_inventories,
 )
 from sunbeam.commands.terraform import TerraformException
 from sunbeam.jobs.common import ResultType
@@ -350,4 +359,178 @@ class TestConfigureMicrocephOSDStep(unittest.TestCase):
 
         self.jhelper.run_action.assert_called_once()
         assert result.result_type == ResultType.FAILED
-        assert result.message == "Action failed..."
+        assert "Action failed..." in result.message
+
+    def test_run_batches_devices(self):
+        step = ConfigureMicrocephOSDStep(self.name, self.jhelper)
+        step.disks = ",".join(f"/dev/sd{letter}" for letter in "bcdefghij")
+        result = step.run()
+
+        assert self.jhelper.run_action.call_count == 3
+        assert result.result_type == ResultType.COMPLETED
+        assert len(result.message.added) == 9
+
+    def test_run_partial_failure(self):
+        def run_action(unit, model, action, action_params):
+            if "/dev/sdf" in action_params["device-id"]:
+                raise ActionFailedException("Disk busy")
+            return {}
+
+        self.jhelper.run_action.side_effect = run_action
+        step = ConfigureMicrocephOSDStep(self.name, self.jhelper)
+        step.disks = "/dev/sdb,/dev/sdc,/dev/sdd,/dev/sde,/dev/sdf"
+        result = step.run()
+
+        assert result.result_type == ResultType.FAILED
+        assert result.message.startswith("4/5 OSDs added")
+        assert "/dev/sdf: Disk busy" in result.message
+
+    def test_get_unpartitioned_disks_cached(self):
+        self.clientMock.cluster.get_config.return_value = json.dumps(
+            {"timestamp": time.time(), "unpartitioned-disks": ["/dev/sdb"]}
+        )
+        step = ConfigureMicrocephOSDStep(self.name, self.jhelper)
+        disks = step.get_unpartitioned_disks()
+
+        self.jhelper.run_action.assert_not_called()
+        assert disks == ["/dev/sdb"]
+
+    def test_get_unpartitioned_disks_stale(self):
+        self.clientMock.cluster.get_config.return_value = json.dumps(
+            {"timestamp": 0, "unpartitioned-disks": ["/dev/sdb"]}
+        )
+        self.jhelper.run_action.return_value = {
+            "unpartitioned-disks": json.dumps([{"path": "/dev/sdc"}])
+        }
+        step = ConfigureMicrocephOSDStep(self.name, self.jhelper)
+        disks = step.get_unpartitioned_disks()
+
+        self.jhelper.run_action.assert_called_once()
+        self.clientMock.cluster.update_config.assert_called_once()
+        assert disks == ["/dev/sdc"]
+
+    def test_run_invalidates_disk_inventory(self):
+        step = ConfigureMicrocephOSDStep(self.name, self.jhelper)
+        step.disks = "/dev/sdb"
+        step.run()
+
+        self.clientMock.cluster.delete_config.assert_called_once()
+
+    def test_prompt_does_not_list_disks_with_preseed(self):
+        self.clientMock.cluster.get_config.return_value = "{}"
+        step = ConfigureMicrocephOSDStep(self.name, self.jhelper)
+        with patch(
+            "sunbeam.commands.microceph.questions.read_preseed",
+            Mock(
+                return_value={
+                    "microceph_config": {self.name: {"osd_devices": "/dev/sdb"}}
+                }
+            ),
+        ):
+            step.preseed_file = Path("preseed.yaml")
+            step.prompt()
+
+        self.jhelper.run_action.assert_not_called()
+        assert step.disks == "/dev/sdb"
+
+    def test_prompt_writes_node_answers(self):
+        self.clientMock.cluster.get_config.return_value = json.dumps(
+            {"osd_devices": "/dev/sdc"}
+        )
+        step = ConfigureMicrocephOSDStep(self.name, self.jhelper, accept_defaults=True)
+        step.prompt()
+
+        assert step.disks == "/dev/sdc"
+        self.clientMock.cluster.get_config.assert_called_once_with(
+            f"TerraformVarsMicroceph-{self.name}"
+        )
+        self.clientMock.cluster.update_config.assert_called_once_with(
+            f"TerraformVarsMicroceph-{self.name}",
+            json.dumps({"osd_devices": "/dev/sdc"}),
+        )
+
+    def test_prompt_reads_legacy_answers(self):
+        self.clientMock.cluster.get_config.side_effect = [
+            ConfigItemNotFoundException("ConfigItem not found"),
+            json.dumps({"microceph_config": {self.name: {"osd_devices": "/dev/sdd"}}}),
+        ]
+        step = ConfigureMicrocephOSDStep(self.name, self.jhelper, accept_defaults=True)
+        step.prompt()
+
+        assert step.disks == "/dev/sdd"
+        self.clientMock.cluster.update_config.assert_called_once_with(
+            f"TerraformVarsMicroceph-{self.name}",
+            json.dumps({"osd_devices": "/dev/sdd"}),
+        )
+
+
+@pytest.mark.asyncio
+async def test_enroll_osds_bounded_concurrency():
+    in_flight = 0
+    max_in_flight = 0
+
+    async def run_action(unit, model, action, action_params):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0)
+        in_flight -= 1
+        return {}
+
+    jhelper = AsyncMock()
+    jhelper.run_action.side_effect = run_action
+    devices = {
+        f"microceph/{unit}": [f"/dev/sd{letter}" for letter in "bcd"]
+        for unit in range(4)
+    }
+    report = await enroll_osds(jhelper, devices, batch_size=1, concurrency=2)
+
+    assert jhelper.run_action.call_count == 12
+    assert max_in_flight == 2
+    assert len(report.added) == 12
+    assert report.to_dict()["microceph/3"]["/dev/sdd"]["status"] == "added"
+
+
+def test_load_microceph_answers():
+    client = Mock()
+    client.cluster.get_config.return_value = json.dumps({"osd_devices": "/dev/sdb"})
+    assert load_microceph_answers(client, "node-1") == {"osd_devices": "/dev/sdb"}
+    client.cluster.get_config.assert_called_once_with("TerraformVarsMicroceph-node-1")
+
+
+def test_load_microceph_answers_legacy():
+    client = Mock()
+    client.cluster.get_config.side_effect = [
+        ConfigItemNotFoundException("ConfigItem not found"),
+        json.dumps({"microceph_config": {"node-1": {"osd_devices": "/dev/sdd"}}}),
+    ]
+    assert load_microceph_answers(client, "node-1") == {"osd_devices": "/dev/sdd"}
+    client.cluster.get_config.assert_called_with("TerraformVarsMicroceph")
+
+
+def test_parse_disks():
+    disks = [{"path": "/dev/sdb"}, {"path": "/dev/sdb"}, {"path": "/dev/disk/by-id/"}]
+    assert parse_disks(json.dumps(disks)) == ["/dev/sdb"]
+    assert parse_disks(str(disks)) == ["/dev/sdb"]
+
+
+@pytest.mark.asyncio
+async def test_refresh_disk_inventories():
+    client = Mock()
+    jhelper = AsyncMock()
+
+    async def run_action(unit, model, action):
+        if unit == "microceph/1":
+            raise ActionFailedException("Action failed...")
+        return {"unpartitioned-disks": json.dumps([{"path": "/dev/sdb"}])}
+
+    jhelper.get_unit_from_machine.side_effect = lambda app, machine_id, model: Mock(
+        entity_id=f"microceph/{machine_id}"
+    )
+    jhelper.run_action.side_effect = run_action
+    client.cluster.get_config.side_effect = ConfigItemNotFoundException()
+    inventories = await refresh_disk_inventories(jhelper, client, ["0", "1"])
+
+    assert inventories["0"] == ["/dev/sdb"]
+    assert isinstance(inventories["1"], ActionFailedException)
+    client.cluster.update_config.assert_called_once()
@@ -40,6 +40,7 @@ def mock_run_sync(mocker):
 class TestConfigureMySQLStep(unittest.TestCase):
     def setUp(self):
         self.jhelper = AsyncMock()
+        self.jhelper.run_action.return_value = {"password": "secret"}
 
     def test_run_pristine_installation(self):
         with patch(
@@ -83,6 +84,25 @@ class TestConfigureMySQLStep(unittest.TestCase):
 
         assert result.result_type == ResultType.FAILED
 
+    def test_run_missing_password(self):
+        async def run_action(unit, model, action, params):
+            if unit == "nova-mysql/0":
+                return {}
+            return {"password": "secret"}
+
+        self.jhelper.get_leader_unit.side_effect = lambda app, model: f"{app}/0"
+        self.jhelper.run_action.side_effect = run_action
+        with patch(
+            "sunbeam.commands.mysql.get_mysqls",
+            Mock(return_value=["keystone-mysql", "nova-mysql"]),
+        ):
+            step = ConfigureMySQLStep(self.jhelper)
+            result = step.run()
+
+        assert result.result_type == ResultType.FAILED
+        assert "nova-mysql: No password for serverconfig" in result.message
+        self.jhelper.run_cmd_on_unit_payload.assert_called_once()
+
     def test_run_failed_to_set_config(self):
         self.jhelper.run_cmd_on_unit_payload.side_effect = JujuException(
             "failed to run cmd"
@@ -95,3 +115,57 @@ class TestConfigureMySQLStep(unittest.TestCase):
             result = step.run()
 
         assert result.result_type == ResultType.FAILED
+
+    def test_run_many_mysqls(self):
+        self.jhelper.get_leader_unit.side_effect = lambda app, model: f"{app}/0"
+        mysqls = ["keystone-mysql", "nova-mysql", "glance-mysql"]
+        with patch(
+            "sunbeam.commands.mysql.get_mysqls",
+            Mock(return_value=mysqls),
+        ):
+            step = ConfigureMySQLStep(self.jhelper)
+            result = step.run()
+
+        assert result.result_type == ResultType.COMPLETED
+        assert self.jhelper.run_cmd_on_unit_payload.call_count == 3
+        units = {
+            call.args[0] for call in self.jhelper.run_cmd_on_unit_payload.call_args_list
+        }
+        assert units == {f"{mysql}/0" for mysql in mysqls}
+
+    def test_run_aggregates_failures(self):
+        async def get_leader_unit(app, model):
+            if app != "keystone-mysql":
+                raise JujuException(f"no leader for {app}")
+            return f"{app}/0"
+
+        self.jhelper.get_leader_unit.side_effect = get_leader_unit
+        with patch(
+            "sunbeam.commands.mysql.get_mysqls",
+            Mock(return_value=["keystone-mysql", "nova-mysql", "glance-mysql"]),
+        ):
+            step = ConfigureMySQLStep(self.jhelper)
+            result = step.run()
+
+        assert result.result_type == ResultType.FAILED
+        assert "nova-mysql: no leader for nova-mysql" in result.message
+        assert "glance-mysql: no leader for glance-mysql" in result.message
+        self.jhelper.run_cmd_on_unit_payload.assert_called_once()
+
+    def test_run_applies_all_settings_at_once(self):
+        with patch(
+            "sunbeam.commands.mysql.get_mysqls",
+            Mock(return_value=["mysql"]),
+        ):
+            step = ConfigureMySQLStep(
+                self.jhelper,
+                settings={"max_connections": 500, "innodb_lock_wait_timeout": 120},
+            )
+            result = step.run()
+
+        assert result.result_type == ResultType.COMPLETED
+        cmd = self.jhelper.run_cmd_on_unit_payload.call_args.args[2]
+        assert (
+            "'set global max_connections = 500; "
+            "set global innodb_lock_wait_timeout = 120'" in cmd
+        )
@@ -25,6 +25,9 @@ from sunbeam.commands.openstack import (
     DeployControlPlaneStep,
     PatchLoadBalancerServicesStep,
     ResizeControlPlaneStep,
+    affected_applications,
+    compute_scale,
+    determine_target_topology,
 )
 from sunbeam.commands.terraform import TerraformException
 from sunbeam.jobs.common import ResultType
@@ -35,6 +38,16 @@ from sunbeam.jobs.juju import (
 )
 
 TOPOLOGY = "single"
+APPLICATIONS = [
+    "traefik",
+    "mysql",
+    "keystone",
+    "keystone-mysql",
+    "keystone-mysql-router",
+    "rabbitmq",
+    "cinder-ceph",
+    "designate",
+]
 DATABASE = "single"
 
 
@@ -53,14 +66,61 @@ def mock_run_sync(mocker):
     loop.close()
 
 
+@pytest.mark.parametrize(
+    "nodes,ram,topology",
+    [
+        (1, 16 * 1024 * 1024, "single"),
+        (1, 64 * 1024 * 1024, "multi"),
+        (9, 16 * 1024 * 1024, "multi"),
+        (10, 16 * 1024 * 1024, "large"),
+    ],
+)
+def test_determine_target_topology(mocker, nodes, ram, topology):
+    mocker.patch("sunbeam.commands.openstack.get_host_total_ram", return_value=ram)
+    members = [{"name": f"node-{i}", "role": ["compute"]} for i in range(nodes)]
+    members.append({"name": "storage-0", "role": ["storage"]})
+    client = Mock()
+    client.cluster.get_cluster_summary.return_value = {
+        "members": members,
+        "roles": {"compute": nodes, "storage": 1},
+    }
+
+    assert determine_target_topology(client) == topology
+    client.cluster.get_cluster_summary.assert_called_once()
+
+
 class TestDeployControlPlaneStep(unittest.TestCase):
     def __init__(self, methodName: str = "runTest") -> None:
         super().__init__(methodName)
+        self.modify_config = patch(
+            "sunbeam.commands.openstack.modify_config",
+            Mock(side_effect=lambda client, key, fn: fn({})),
+        )
 
     def setUp(self):
+        self.modify_config_mock = self.modify_config.start()
         self.jhelper = AsyncMock()
         self.tfhelper = Mock(path=Path())
 
+    def tearDown(self):
+        self.modify_config.stop()
+
+    @patch("sunbeam.commands.openstack.Client")
+    def test_run_keeps_stored_tfvars(self, client):
+        client.return_value.cluster.list_nodes_by_role.return_value = []
+        self.modify_config_mock.side_effect = lambda client, key, fn: fn(
+            {"os-api-scale": 3, "ceph-offer-url": "admin/controller.microceph"}
+        )
+
+        step = DeployControlPlaneStep(self.tfhelper, self.jhelper, TOPOLOGY, DATABASE)
+        result = step.run()
+
+        tfvars = self.tfhelper.write_tfvars.call_args.args[0]
+        assert tfvars["os-api-scale"] == 3
+        assert not tfvars["enable-ceph"]
+        assert "ceph-offer-url" not in tfvars
+        assert result.result_type == ResultType.COMPLETED
+
     @patch("sunbeam.commands.openstack.Client")
     def test_run_pristine_installation(self, client):
         self.jhelper.get_application.side_effect = ApplicationNotFoundException(
@@ -151,16 +211,26 @@ class TestResizeControlPlaneStep(unittest.TestCase):
             "sunbeam.commands.openstack.read_config",
             Mock(return_value={"topology": "single", "database": "single"}),
         )
+        self.modify_config = patch(
+            "sunbeam.commands.openstack.modify_config",
+            Mock(side_effect=lambda client, key, fn: fn({})),
+        )
 
     def setUp(self):
-        self.client.start()
-        self.read_config.start()
+        client = self.client.start()
+        client.return_value.cluster.get_cluster_summary.return_value = {
+            "members": [{"name": "node-1", "role": ["control", "compute", "storage"]}],
+            "roles": {"control": 1, "compute": 1, "storage": 1},
+        }
+        self.read_config_mock = self.read_config.start()
+        self.modify_config.start()
         self.jhelper = AsyncMock()
         self.tfhelper = Mock(path=Path())
 
     def tearDown(self):
         self.client.stop()
         self.read_config.stop()
+        self.modify_config.stop()
 
     def test_run_pristine_installation(self):
         self.jhelper.get_application.side_effect = ApplicationNotFoundException(
@@ -213,6 +283,41 @@ class TestResizeControlPlaneStep(unittest.TestCase):
         assert result.result_type == ResultType.FAILED
         assert "Cannot resize control plane to large" in result.message
 
+    def test_run_already_scaled(self):
+        self.read_config_mock.return_value = {
+            "topology": "single",
+            "database": "single",
+            "scale": compute_scale("single", 1, 1),
+        }
+
+        step = ResizeControlPlaneStep(self.tfhelper, self.jhelper, "single", False)
+        result = step.run()
+
+        self.tfhelper.apply.assert_not_called()
+        self.jhelper.wait_until_active.assert_not_called()
+        assert result.result_type == ResultType.COMPLETED
+
+    def test_run_waits_on_rescaled_applications(self):
+        self.read_config_mock.return_value = {
+            "topology": "single",
+            "database": "single",
+            "scale": {**compute_scale("single", 1, 1), "ingress-scale": 3},
+        }
+        self.jhelper.get_application_names.return_value = [
+            "traefik",
+            "mysql",
+            "keystone",
+        ]
+
+        step = ResizeControlPlaneStep(self.tfhelper, self.jhelper, "single", False)
+        result = step.run()
+
+        self.tfhelper.apply.assert_called_once()
+        self.jhelper.wait_until_active.assert_called_once_with(
+            "openstack", ["traefik"], timeout=3600
+        )
+        assert result.result_type == ResultType.COMPLETED
+
     def test_run_force_incompatible_topology(self):
         step = ResizeControlPlaneStep(self.tfhelper, self.jhelper, "large", True)
         result = step.run()
@@ -221,6 +326,28 @@ class TestResizeControlPlaneStep(unittest.TestCase):
         assert result.result_type == ResultType.COMPLETED
 
 
+@pytest.mark.parametrize(
+    "changed,affected",
+    [
+        ([], []),
+        (["ingress-scale"], ["traefik", "designate"]),
+        (["ha-scale"], ["mysql", "keystone-mysql", "rabbitmq", "designate"]),
+        (
+            ["os-api-scale"],
+            ["keystone", "keystone-mysql-router", "cinder-ceph", "designate"],
+        ),
+        (["ceph-osd-replication-count"], ["cinder-ceph", "designate"]),
+        (
+            ["ingress-scale", "ha-scale"],
+            ["traefik", "mysql", "keystone-mysql", "rabbitmq", "designate"],
+        ),
+        (["enable-ceph"], APPLICATIONS),
+    ],
+)
+def test_affected_applications(changed, affected):
+    assert affected_applications(changed, APPLICATIONS) == affected
+
+
 class PatchLoadBalancerServicesStepTest(unittest.TestCase):
     """"""
 
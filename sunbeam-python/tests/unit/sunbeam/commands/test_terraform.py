@@ -0,0 +1,164 @@
+# Copyright 2023 Canonical Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import time
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import pytest
+
+from sunbeam.clusterd.service import (
+    ConfigItemNotFoundException,
+    TerraformLockConflictException,
+    TerraformLockNotFoundException,
+)
+from sunbeam.commands.terraform import (
+    LOCK_LEASE_TTL,
+    LockHeartbeat,
+    lock_expired,
+    lock_expiry,
+    lock_owner,
+    parse_lock_time,
+)
+
+
+def go_time(value: datetime) -> str:
+    """Format value like Go, with nanoseconds."""
+    return value.strftime("%Y-%m-%dT%H:%M:%S.%f") + "123Z"
+
+
+@pytest.fixture
+def cluster():
+    with patch("sunbeam.commands.terraform.clusterClient") as client:
+        yield client.return_value.cluster
+
+
+def test_parse_lock_time():
+    assert parse_lock_time("2023-07-10T12:00:01.123456789Z") == datetime(
+        2023, 7, 10, 12, 0, 1, 123456, tzinfo=timezone.utc
+    )
+
+
+def test_lock_expiry():
+    now = datetime.now(timezone.utc)
+    lock = {"Created": go_time(now - timedelta(hours=1))}
+    assert lock_expiry(lock) == parse_lock_time(lock["Created"]) + timedelta(
+        seconds=LOCK_LEASE_TTL
+    )
+    assert lock_expired(lock)
+    lock["Expires"] = go_time(now + timedelta(minutes=1))
+    assert not lock_expired(lock)
+    lock["Expires"] = "0001-01-01T00:00:00Z"
+    assert lock_expired(lock)
+
+
+def test_heartbeat_renews_new_lock(cluster):
+    heartbeat = LockHeartbeat("openstack-plan")
+    lock = {
+        "ID": "id",
+        "Who": heartbeat.owner,
+        "Created": go_time(datetime.now(timezone.utc)),
+    }
+    cluster.get_terraform_lock.return_value = lock
+    cluster.renew_terraform_lock.return_value = {**lock, "Expires": "later"}
+
+    assert heartbeat.beat()
+    assert heartbeat.beat()
+
+    cluster.get_terraform_lock.assert_called_once_with("openstack-plan")
+    cluster.renew_terraform_lock.assert_called_with(
+        "openstack-plan", {**lock, "Expires": "later"}
+    )
+
+
+def test_heartbeat_ignores_older_lock(cluster):
+    heartbeat = LockHeartbeat("openstack-plan")
+    created = datetime.now(timezone.utc) - timedelta(minutes=1)
+    cluster.get_terraform_lock.return_value = {
+        "ID": "id",
+        "Who": heartbeat.owner,
+        "Created": go_time(created),
+    }
+
+    assert not heartbeat.beat()
+    cluster.renew_terraform_lock.assert_not_called()
+
+
+def test_heartbeat_ignores_foreign_lock(cluster):
+    heartbeat = LockHeartbeat("openstack-plan")
+    cluster.get_terraform_lock.return_value = {
+        "ID": "id",
+        "Who": "someone@elsewhere",
+        "Created": go_time(datetime.now(timezone.utc) + timedelta(seconds=1)),
+    }
+
+    assert not heartbeat.beat()
+    cluster.renew_terraform_lock.assert_not_called()
+
+
+def test_lock_owner():
+    with patch("sunbeam.commands.terraform.socket.gethostname", return_value="node"):
+        with patch("sunbeam.commands.terraform.pwd.getpwuid") as getpwuid:
+            getpwuid.return_value.pw_name = "ubuntu"
+            assert lock_owner() == "ubuntu@node"
+            getpwuid.side_effect = KeyError
+            assert lock_owner() == "@node"
+
+
+def test_heartbeat_without_lock(cluster):
+    heartbeat = LockHeartbeat("openstack-plan")
+    cluster.get_terraform_lock.side_effect = ConfigItemNotFoundException("not found")
+
+    assert not heartbeat.beat()
+    cluster.renew_terraform_lock.assert_not_called()
+
+
+def test_heartbeat_thread(cluster):
+    cluster.get_terraform_lock.side_effect = ConfigItemNotFoundException("not found")
+    with LockHeartbeat("openstack-plan", interval=0.01) as heartbeat:
+        while cluster.get_terraform_lock.call_count < 2:
+            time.sleep(0.01)
+    assert not heartbeat._thread.is_alive()
+
+
+def test_heartbeat_survives_errors(cluster, caplog):
+    cluster.get_terraform_lock.side_effect = Exception("boom")
+    heartbeat = LockHeartbeat("openstack-plan", interval=0.01)
+    with heartbeat:
+        while cluster.get_terraform_lock.call_count < 2:
+            time.sleep(0.01)
+    assert "Failed to renew lock on plan openstack-plan" in caplog.text
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        TerraformLockNotFoundException("not locked"),
+        TerraformLockConflictException("held by someone else"),
+    ],
+)
+def test_heartbeat_stops_on_lost_lock(cluster, caplog, error):
+    created = datetime.now(timezone.utc) + timedelta(seconds=1)
+    cluster.get_terraform_lock.return_value = {
+        "ID": "1",
+        "Who": lock_owner(),
+        "Created": go_time(created),
+    }
+    cluster.renew_terraform_lock.side_effect = error
+    with LockHeartbeat("openstack-plan", interval=0.01) as heartbeat:
+        heartbeat._thread.join(timeout=5)
+        assert not heartbeat._thread.is_alive()
+    cluster.renew_terraform_lock.assert_called_once()
+    assert "Stopped renewing lock on plan openstack-plan" in caplog.text
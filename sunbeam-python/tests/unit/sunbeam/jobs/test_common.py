@@ -13,9 +13,17 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import json
 import unittest
+from unittest.mock import Mock
 
-from sunbeam.jobs.common import Role
+import pytest
+
+from sunbeam.clusterd.service import (
+    ConfigItemConflictException,
+    ConfigItemNotFoundException,
+)
+from sunbeam.jobs.common import Role, modify_config
 
 
 class TestRoles(unittest.TestCase):
@@ -35,5 +43,43 @@ class TestRoles(unittest.TestCase):
         self.assertTrue(Role.STORAGE.is_storage_node())
 
 
+class TestModifyConfig(unittest.TestCase):
+    def test_modify_retries_on_conflict(self):
+        client = Mock()
+        client.cluster.get_config_with_revision.side_effect = [
+            (json.dumps({"count": 1}), 3),
+            (json.dumps({"count": 2}), 4),
+        ]
+        client.cluster.swap_config.side_effect = [ConfigItemConflictException(), 5]
+
+        config = modify_config(client, "key", lambda c: {"count": c["count"] + 1})
+
+        assert config == {"count": 3}
+        client.cluster.swap_config.assert_called_with(
+            "key", json.dumps({"count": 3}), 4
+        )
+
+    def test_modify_creates_missing(self):
+        client = Mock()
+        client.cluster.get_config_with_revision.side_effect = (
+            ConfigItemNotFoundException()
+        )
+
+        modify_config(client, "key", lambda c: {**c, "count": 1})
+
+        client.cluster.swap_config.assert_called_once_with(
+            "key", json.dumps({"count": 1}), None
+        )
+
+    def test_modify_gives_up(self):
+        client = Mock()
+        client.cluster.get_config_with_revision.return_value = ("{}", 1)
+        client.cluster.swap_config.side_effect = ConfigItemConflictException()
+
+        with pytest.raises(ConfigItemConflictException):
+            modify_config(client, "key", lambda c: c, attempts=3)
+        assert client.cluster.swap_config.call_count == 3
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -123,6 +123,19 @@ def model(applications, units) -> Model:
 
     model.get_action_output.return_value = "action failed..."
 
+    model.add_observer = Mock()
+    model.is_connected = Mock(return_value=True)
+    model.get_status.return_value = Mock(
+        applications={
+            "microk8s": Mock(
+                units={"microk8s/0": Mock(leader=True)},
+            ),
+            "macrok8s": Mock(
+                units={"macrok8s/0": Mock(leader=False)},
+            ),
+        }
+    )
+
     return model
 
 
@@ -131,6 +144,8 @@ def jhelper_base(tmp_path: Path) -> juju.JujuHelper:
     jhelper = juju.JujuHelper.__new__(juju.JujuHelper)
     jhelper.data_location = tmp_path
     jhelper.controller = AsyncMock()  # type: ignore
+    jhelper._leaders = {}
+    jhelper._leadership_watchers = {}
     return jhelper
 
 
@@ -254,13 +269,56 @@ async def test_jhelper_get_leader_unit(
     assert applications.get.called_with(app)
 
 
+@pytest.mark.asyncio
+async def test_jhelper_get_leader_units_single_status_call(
+    jhelper: juju.JujuHelper, model: Model
+):
+    leaders = await jhelper.get_leader_units(["microk8s"], "control-plane")
+    assert leaders == {"microk8s": "microk8s/0"}
+    unit = await jhelper.get_leader_unit("microk8s", "control-plane")
+    assert unit == "microk8s/0"
+    model.get_status.assert_called_once_with(filters=["microk8s"])
+    model.add_observer.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_jhelper_get_leader_unit_invalidated(
+    jhelper: juju.JujuHelper, model: Model
+):
+    await jhelper.get_leader_unit("microk8s", "control-plane")
+    observer = model.add_observer.call_args.args[0]
+    assert model.add_observer.call_args.kwargs == {"entity_type": "unit"}
+    await observer(
+        Mock(type="change", data={"application": "macrok8s"}), None, None, model
+    )
+    await jhelper.get_leader_unit("microk8s", "control-plane")
+    assert model.get_status.call_count == 1
+    await observer(
+        Mock(type="change", data={"application": "microk8s"}), None, None, model
+    )
+    await jhelper.get_leader_unit("microk8s", "control-plane")
+    assert model.get_status.call_count == 2
+    model.add_observer.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_jhelper_get_leader_unit_watcher_disconnected(
+    jhelper: juju.JujuHelper, model: Model
+):
+    await jhelper.get_leader_unit("microk8s", "control-plane")
+    model.is_connected.return_value = False
+    await jhelper.get_leader_unit("microk8s", "control-plane")
+    assert model.get_status.call_count == 2
+    assert model.add_observer.call_count == 2
+
+
 @pytest.mark.asyncio
 async def test_jhelper_get_leader_unit_missing_application(jhelper: juju.JujuHelper):
     model = "control-plane"
     app = "mysql"
     with pytest.raises(
         juju.ApplicationNotFoundException,
-        match=f"Application missing from model: {model!r}",
+        match=f"Application {app!r} is missing from model {model!r}",
     ):
         await jhelper.get_leader_unit(app, model)
 
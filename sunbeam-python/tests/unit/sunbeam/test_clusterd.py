@@ -13,6 +13,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import json
 from unittest.mock import MagicMock
 
 import pytest
@@ -65,9 +66,25 @@ class TestClusterdSteps:
         mocker.patch.object(service, "Snap", return_value=snap)
         list_node_step = ClusterListNodeStep()
         list_node_step.client = MagicMock()
+        list_node_step.client.cluster.get_cluster_summary.return_value = {
+            "members": [
+                {
+                    "name": "node-1",
+                    "address": "10.0.0.10:7000",
+                    "status": "ONLINE",
+                    "role": ["control", "compute"],
+                    "machineid": 0,
+                },
+            ],
+            "roles": {"control": 1, "compute": 1},
+        }
         result = list_node_step.run()
         assert result.result_type == ResultType.COMPLETED
-        list_node_step.client.cluster.get_cluster_members.assert_called_once()
+        assert result.message == {
+            "node-1": {"status": "ONLINE", "roles": ["control", "compute"]}
+        }
+        list_node_step.client.cluster.get_cluster_summary.assert_called_once()
+        list_node_step.client.cluster.list_nodes.assert_not_called()
 
     def test_update_node_step(self, mocker, snap):
         mocker.patch.object(service, "Snap", return_value=snap)
@@ -571,6 +588,264 @@ class TestClusterService:
         nodes_from_mock = [node.get("name") for node in json_data.get("metadata")]
         assert nodes_from_mock == nodes_from_call
 
+    def test_list_nodes_by_role_match_any(self, mocker, snap):
+        json_data = {
+            "type": "sync",
+            "status": "Success",
+            "status_code": 200,
+            "operation": "",
+            "error_code": 0,
+            "error": "",
+            "metadata": [{"name": "node-1", "role": ["control"], "machineid": 0}],
+        }
+        mock_session = MagicMock()
+        mock_session.request.return_value = self._mock_response(
+            status=200, json_data=json_data
+        )
+        mocker.patch.object(service, "Snap", return_value=snap)
+
+        cs = ClusterService(mock_session)
+        nodes = cs.list_nodes_by_role(["control", "compute"], match_any=True)
+        assert nodes == json_data["metadata"]
+        url = mock_session.request.call_args.kwargs["url"]
+        assert url.endswith("/1.0/nodes?role=control&role=compute&match=any")
+
+    def test_count_nodes_by_role(self, mocker, snap):
+        json_data = {
+            "type": "sync",
+            "status": "Success",
+            "status_code": 200,
+            "operation": "",
+            "error_code": 0,
+            "error": "",
+            "metadata": {"roles": {"control": 3, "compute": 5}, "nodes": 6},
+        }
+        mock_session = MagicMock()
+        mock_session.request.return_value = self._mock_response(
+            status=200, json_data=json_data
+        )
+        mocker.patch.object(service, "Snap", return_value=snap)
+
+        cs = ClusterService(mock_session)
+        counts = cs.count_nodes_by_role(["control", "compute"], match_any=True)
+        assert counts == json_data["metadata"]
+        url = mock_session.request.call_args.kwargs["url"]
+        assert url.endswith("/1.0/nodecounts?role=control&role=compute&match=any")
+        cs.count_nodes_by_role()
+        url = mock_session.request.call_args.kwargs["url"]
+        assert url.endswith("/1.0/nodecounts")
+
+    def test_get_cluster_summary(self, mocker, snap):
+        summary = {
+            "members": [
+                {
+                    "name": "node-1",
+                    "address": "10.0.0.10:7000",
+                    "status": "ONLINE",
+                    "role": ["control"],
+                    "machineid": 0,
+                }
+            ],
+            "roles": {"control": 1},
+        }
+        json_data = {
+            "type": "sync",
+            "status": "Success",
+            "status_code": 200,
+            "operation": "",
+            "error_code": 0,
+            "error": "",
+            "metadata": summary,
+        }
+        mock_session = MagicMock()
+        mock_session.request.return_value = self._mock_response(
+            status=200, json_data=json_data
+        )
+        mocker.patch.object(service, "Snap", return_value=snap)
+
+        cs = ClusterService(mock_session)
+        assert cs.get_cluster_summary() == summary
+        url = mock_session.request.call_args.kwargs["url"]
+        assert url.endswith("/1.0/summary")
+
+    def test_watch_config(self, mocker, snap):
+        def sync(revision):
+            return self._mock_response(
+                status=200,
+                json_data={
+                    "type": "sync",
+                    "status": "Success",
+                    "status_code": 200,
+                    "operation": "",
+                    "error_code": 0,
+                    "error": "",
+                    "metadata": {"revision": revision},
+                },
+            )
+
+        mock_session = MagicMock()
+        # Timed out unchanged, then changed twice
+        mock_session.request.side_effect = [sync(2), sync(5), sync(7)]
+        mocker.patch.object(service, "Snap", return_value=snap)
+
+        cs = ClusterService(mock_session)
+        watch = cs.watch_config("tflock-", prefix=True, revision=2, timeout=10)
+        assert next(watch) == 5
+        assert next(watch) == 7
+        calls = mock_session.request.call_args_list
+        assert [call.kwargs["params"]["revision"] for call in calls] == [2, 2, 5]
+        assert calls[0].kwargs["params"]["prefix"] == "true"
+        assert calls[0].kwargs["timeout"] == 10 + 10
+
+    def test_iter_config(self, mocker, snap):
+        def sync(items, next):
+            return self._mock_response(
+                status=200,
+                json_data={
+                    "type": "sync",
+                    "status": "Success",
+                    "status_code": 200,
+                    "operation": "",
+                    "error_code": 0,
+                    "error": "",
+                    "metadata": {"items": items, "next": next},
+                },
+            )
+
+        mock_session = MagicMock()
+        mock_session.request.side_effect = [
+            sync(
+                [
+                    {"key": "tfstate-a", "value": "1"},
+                    {"key": "tfstate-b", "value": "2"},
+                ],
+                "tfstate-b",
+            ),
+            sync([{"key": "tfstate-c", "value": "3"}], ""),
+        ]
+        mocker.patch.object(service, "Snap", return_value=snap)
+
+        cs = ClusterService(mock_session)
+        items = cs.iter_config("tfstate-", values=True, page_size=2)
+        assert [item["key"] for item in items] == [
+            "tfstate-a",
+            "tfstate-b",
+            "tfstate-c",
+        ]
+        calls = mock_session.request.call_args_list
+        assert calls[0].kwargs["params"] == {
+            "prefix": "tfstate-",
+            "limit": 2,
+            "values": "true",
+        }
+        assert calls[1].kwargs["params"]["after"] == "tfstate-b"
+
+    def test_list_terraform_plans_and_locks(self, mocker, snap):
+        def sync(items):
+            return self._mock_response(
+                status=200,
+                json_data={
+                    "type": "sync",
+                    "status": "Success",
+                    "status_code": 200,
+                    "operation": "",
+                    "error_code": 0,
+                    "error": "",
+                    "metadata": {"items": items, "next": ""},
+                },
+            )
+
+        mock_session = MagicMock()
+        mock_session.request.side_effect = [
+            sync([{"key": "tfstate-microk8s-plan"}, {"key": "tfstate-openstack-plan"}]),
+            sync([{"key": "tflock-openstack-plan"}]),
+        ]
+        mocker.patch.object(service, "Snap", return_value=snap)
+
+        cs = ClusterService(mock_session)
+        assert cs.list_terraform_plans() == ["microk8s-plan", "openstack-plan"]
+        assert cs.list_terraform_locks() == ["openstack-plan"]
+        calls = mock_session.request.call_args_list
+        assert [call.kwargs["params"]["prefix"] for call in calls] == [
+            "tfstate-",
+            "tflock-",
+        ]
+
+    def test_swap_config(self, mocker, snap):
+        mock_response = self._mock_response(
+            status=200,
+            json_data={
+                "type": "sync",
+                "status": "Success",
+                "status_code": 200,
+                "operation": "",
+                "error_code": 0,
+                "error": "",
+                "metadata": None,
+            },
+        )
+        mock_response.headers = {"ETag": '"8"'}
+        mock_session = MagicMock()
+        mock_session.request.return_value = mock_response
+        mocker.patch.object(service, "Snap", return_value=snap)
+
+        cs = ClusterService(mock_session)
+        assert cs.swap_config("Topology", "{}", 7) == 8
+        headers = mock_session.request.call_args.kwargs["headers"]
+        assert headers == {"If-Match": '"7"'}
+        cs.swap_config("Topology", "{}", None)
+        headers = mock_session.request.call_args.kwargs["headers"]
+        assert headers == {"If-None-Match": "*"}
+
+    def test_swap_config_conflict(self, mocker, snap):
+        mock_response = self._mock_response(
+            status=412,
+            json_data={
+                "type": "error",
+                "status": "",
+                "status_code": 0,
+                "operation": "",
+                "error_code": 412,
+                "error": "ConfigItem revision mismatch",
+                "metadata": None,
+            },
+            raise_for_status=HTTPError("Precondition Failed"),
+        )
+        mock_session = MagicMock()
+        mock_session.request.return_value = mock_response
+        mocker.patch.object(service, "Snap", return_value=snap)
+
+        cs = ClusterService(mock_session)
+        with pytest.raises(service.ConfigItemConflictException):
+            cs.swap_config("Topology", "{}", 7)
+
+    @pytest.mark.parametrize(
+        "status,json_data,exception",
+        [
+            (
+                404,
+                {"type": "error", "error_code": 404, "error": "ConfigItem not found"},
+                service.TerraformLockNotFoundException,
+            ),
+            # Lock held by someone else, answered with the bare lock.
+            (409, {"ID": "other"}, service.TerraformLockConflictException),
+        ],
+    )
+    def test_renew_terraform_lock_lost(
+        self, mocker, snap, status, json_data, exception
+    ):
+        mock_response = self._mock_response(status=status, json_data=json_data)
+        mock_response.raise_for_status.side_effect = HTTPError(
+            "Error", response=mock_response
+        )
+        mock_session = MagicMock()
+        mock_session.request.return_value = mock_response
+        mocker.patch.object(service, "Snap", return_value=snap)
+
+        cs = ClusterService(mock_session)
+        with pytest.raises(exception):
+            cs.renew_terraform_lock("openstack-plan", {"ID": "mine"})
+
     def test_update_node_info(self, mocker, snap):
         json_data = {
             "type": "sync",
@@ -610,3 +885,66 @@ class TestClusterUpdateJujuControllerStep:
             ["10.0.0.6:17070", "[fd42:5eda:f578:7bba:216:3eff:fe3d:7ef6]:17070"],
             "10.0.0.0/24",
         ) == ["10.0.0.6:17070"]
+
+
+class TestRequestLogging:
+    """Unit tests for the clusterd request/response logging policy."""
+
+    def test_summarize_small_body(self):
+        body = '{"name": "node-1", "role": ["control"]}'
+        assert service.summarize_body(body) == body
+
+    def test_summarize_redacts_secrets(self):
+        body = json.dumps(
+            {"name": "admin", "password": "s3cr3t", "nested": [{"token": "t"}]}
+        )
+        summary = service.summarize_body(body)
+        assert "s3cr3t" not in summary
+        assert json.loads(summary) == {
+            "name": "admin",
+            "password": service.REDACTED,
+            "nested": [{"token": service.REDACTED}],
+        }
+
+    def test_summarize_large_body(self):
+        body = b"x" * 2048
+        summary = service.summarize_body(body, limit=1024)
+        assert summary.startswith("<2048 bytes sha256:")
+        assert "xxx" not in summary
+
+    def test_summarize_unparsable_secret(self):
+        summary = service.summarize_body("password=s3cr3t")
+        assert summary.startswith("<15 bytes sha256:")
+
+    def test_log_body_limit(self):
+        assert service.log_body_limit("/1.0/config/CloudConfig") == 0
+        assert service.log_body_limit("1.0/terraformstate/plan") == 0
+        assert service.log_body_limit("1.0/nodes") == service.DEFAULT_LOG_BODY_LIMIT
+
+    def test_request_logging(self, mocker, snap, caplog):
+        mocker.patch.object(service, "Snap", return_value=snap)
+        kubeconfig = "apiVersion: v1\nclusters: []\n" * 100
+        mock_response = MagicMock()
+        mock_response.content = json.dumps({"metadata": kubeconfig}).encode()
+        mock_response.json.return_value = {"metadata": kubeconfig}
+        mock_session = MagicMock()
+        mock_session.request.return_value = mock_response
+
+        cs = ClusterService(mock_session)
+        with caplog.at_level("DEBUG", logger=service.__name__):
+            assert cs.get_config("TestConfig") == kubeconfig
+            cs.update_config("TestConfig", kubeconfig)
+
+        assert "apiVersion" not in caplog.text
+        assert "bytes sha256:" in caplog.text
+
+    def test_request_logging_is_lazy(self, mocker, snap, caplog):
+        mocker.patch.object(service, "Snap", return_value=snap)
+        summarize = mocker.patch.object(service, "summarize_body")
+        mock_session = MagicMock()
+
+        cs = ClusterService(mock_session)
+        with caplog.at_level("INFO", logger=service.__name__):
+            cs.update_config("TestConfig", "value")
+
+        summarize.assert_not_called()
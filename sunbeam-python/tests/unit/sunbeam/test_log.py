@@ -0,0 +1,163 @@
+# Copyright (c) 2023 Canonical Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import ast
+import atexit
+import json
+import logging
+from logging.handlers import QueueHandler
+from pathlib import Path
+
+import click
+import pytest
+
+import sunbeam
+from sunbeam import log
+
+# Attributes holding subprocess output, potentially megabytes of text.
+SUBPROCESS_OUTPUT = {"stdout", "stderr", "output"}
+
+
+@pytest.fixture()
+def root_logger():
+    logger = logging.getLogger()
+    handlers = list(logger.handlers)
+    level = logger.level
+    yield logger
+    for handler in logger.handlers:
+        if handler not in handlers:
+            logger.removeHandler(handler)
+    logger.setLevel(level)
+
+
+def write_run(path: Path, run: str, size: int, backups: int = 0):
+    (path / f"sunbeam-{run}.log").write_bytes(b"x" * size)
+    for backup in range(1, backups + 1):
+        (path / f"sunbeam-{run}.log.{backup}").write_bytes(b"x" * size)
+
+
+class TestPrepareLogfile:
+    def test_prune_by_count(self, tmp_path):
+        for run in range(5):
+            write_run(tmp_path, f"2023010{run}-000000.000000", 10)
+        logfile = log.prepare_logfile(tmp_path, "sunbeam", max_files=3)
+        assert sorted(p.name for p in tmp_path.iterdir()) == [
+            "sunbeam-20230103-000000.000000.log",
+            "sunbeam-20230104-000000.000000.log",
+        ]
+        assert logfile.name.startswith("sunbeam-")
+        assert not logfile.exists()
+
+    def test_prune_by_size_with_backups(self, tmp_path):
+        write_run(tmp_path, "20230101-000000.000000", 10)
+        write_run(tmp_path, "20230102-000000.000000", 30, backups=2)
+        write_run(tmp_path, "20230103-000000.000000", 10)
+        log.prepare_logfile(tmp_path, "sunbeam", max_size=50)
+        # The rotated run does not fit, it is removed with everything older.
+        assert sorted(p.name for p in tmp_path.iterdir()) == [
+            "sunbeam-20230103-000000.000000.log",
+        ]
+
+
+def test_setup_root_logging_queue(tmp_path, root_logger):
+    logfile = tmp_path / "sunbeam.log"
+    listener = log.setup_root_logging(logfile)
+    try:
+        assert any(isinstance(h, QueueHandler) for h in root_logger.handlers)
+        logging.getLogger("sunbeam.test").debug("stdout=%s", "payload")
+    finally:
+        listener.stop()
+        atexit.unregister(listener.stop)
+    assert "sunbeam.test DEBUG stdout=payload" in logfile.read_text()
+
+
+def _eager_log_call(node: ast.AST) -> bool:
+    if not isinstance(node, ast.Call) or not node.args:
+        return False
+    func = node.func
+    if not isinstance(func, ast.Attribute) or not isinstance(func.value, ast.Name):
+        return False
+    return func.value.id == "LOG" and isinstance(
+        node.args[0], (ast.JoinedStr, ast.BinOp)
+    )
+
+
+def test_no_eager_subprocess_output_logging():
+    """Subprocess output must be logged with lazy %s formatting."""
+    offenders = []
+    for path in Path(sunbeam.__file__).parent.rglob("*.py"):
+        for node in ast.walk(ast.parse(path.read_text())):
+            if not _eager_log_call(node):
+                continue
+            attributes = {
+                n.attr for n in ast.walk(node.args[0]) if isinstance(n, ast.Attribute)
+            }
+            if attributes & SUBPROCESS_OUTPUT:
+                offenders.append(f"{path.name}:{node.lineno}")
+    assert offenders == []
+
+
+@pytest.fixture()
+def event_log(tmp_path):
+    path = tmp_path / log.EVENT_LOG_FILE
+    listener = log.setup_event_logging(path)
+    atexit.unregister(listener.stop)
+    events = []
+
+    def read():
+        listener.stop()
+        events.extend(json.loads(line) for line in path.read_text().splitlines())
+        return events
+
+    yield read
+    for handler in list(log.EVENT_LOG.handlers):
+        log.EVENT_LOG.removeHandler(handler)
+    log.EVENT_LOG.propagate = True
+
+
+class TestTimedEvent:
+    def test_disabled(self, tmp_path):
+        with log.timed_event("step", "Disabled") as event:
+            pass
+        assert "duration" not in event
+
+    def test_records(self, event_log):
+        with log.timed_event("clusterd", "GET /1.0/nodes") as event:
+            event["status"] = 200
+        with pytest.raises(ValueError):
+            with log.timed_event("subprocess", "juju status"):
+                raise ValueError()
+        with pytest.raises(click.ClickException):
+            with log.timed_event("step", "FailingStep") as event:
+                event["outcome"] = "failed"
+                raise click.ClickException("failed")
+
+        events = event_log()
+        assert [(e["kind"], e["name"], e["outcome"]) for e in events] == [
+            ("clusterd", "GET /1.0/nodes", "success"),
+            ("subprocess", "juju status", "error"),
+            ("step", "FailingStep", "failed"),
+        ]
+        assert events[0]["status"] == 200
+        assert events[1]["error"] == "ValueError"
+        assert {e["invocation"] for e in events} == {log.INVOCATION_ID}
+        assert all(e["duration"] >= 0 for e in events)
+
+    def test_system_exit(self, event_log):
+        for code in (0, 1):
+            with pytest.raises(SystemExit):
+                with log.timed_event("command", "cluster bootstrap"):
+                    raise SystemExit(code)
+        assert [e["outcome"] for e in event_log()] == ["success", "error"]
@@ -0,0 +1,118 @@
+# Copyright (c) 2023 Canonical Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import json
+
+import pytest
+
+from sunbeam import log, tracing
+
+TRACE_ID = "0af7651916cd43dd8448eb211c80319c"
+
+
+@pytest.fixture()
+def spans(tmp_path):
+    path = tmp_path / tracing.TRACE_FILE
+    tracing.setup_tracing(path, trace_id=TRACE_ID)
+
+    def read():
+        tracing.shutdown_tracing()
+        spans = {}
+        for line in path.read_text().splitlines():
+            request = json.loads(line)
+            for resource in request["resourceSpans"]:
+                for scope in resource["scopeSpans"]:
+                    for span in scope["spans"]:
+                        spans[span["name"]] = span
+        return spans
+
+    yield read
+    tracing.shutdown_tracing()
+
+
+def attributes(span):
+    return {a["key"]: list(a["value"].values())[0] for a in span["attributes"]}
+
+
+def test_disabled():
+    with tracing.span("noop") as span:
+        assert span is None
+    with log.timed_event("step", "Noop") as event:
+        assert "duration" not in event
+
+
+def test_parent_child_across_run_sync(spans):
+    async def get_model(name):
+        with log.timed_event("juju", f"get_model {name}"):
+            await asyncio.sleep(0)
+
+    async def get_models():
+        await asyncio.gather(get_model("a"), get_model("b"))
+
+    loop = asyncio.new_event_loop()
+    try:
+        with log.timed_event("command", "cluster join"):
+            with log.timed_event("step", "JoinStep") as event:
+                loop.run_until_complete(get_models())
+                event["outcome"] = "completed"
+            with log.timed_event("clusterd", "GET /1.0/nodes") as event:
+                event["status"] = 200
+    finally:
+        loop.close()
+
+    traced = spans()
+    command = traced["command cluster join"]
+    step = traced["step JoinStep"]
+    assert "parentSpanId" not in command
+    assert step["parentSpanId"] == command["spanId"]
+    assert traced["juju get_model a"]["parentSpanId"] == step["spanId"]
+    assert traced["juju get_model b"]["parentSpanId"] == step["spanId"]
+    assert traced["clusterd GET /1.0/nodes"]["parentSpanId"] == command["spanId"]
+    assert {span["traceId"] for span in traced.values()} == {TRACE_ID}
+    assert traced["juju get_model a"]["kind"] == tracing.SPAN_KIND_CLIENT
+    assert step["kind"] == tracing.SPAN_KIND_INTERNAL
+    assert attributes(step)["outcome"] == "completed"
+    assert attributes(traced["clusterd GET /1.0/nodes"])["status"] == "200"
+    assert int(step["startTimeUnixNano"]) <= int(step["endTimeUnixNano"])
+
+
+def test_error_status(spans):
+    with pytest.raises(RuntimeError):
+        with log.timed_event("subprocess", "terraform apply"):
+            raise RuntimeError("boom")
+    with log.timed_event("step", "FailedStep") as event:
+        event["outcome"] = "failed"
+    with pytest.raises(SystemExit):
+        with log.timed_event("command", "configure"):
+            raise SystemExit(0)
+
+    traced = spans()
+    assert traced["subprocess terraform apply"]["status"] == {
+        "code": tracing.STATUS_CODE_ERROR,
+        "message": "RuntimeError: boom",
+    }
+    assert traced["step FailedStep"]["status"]["code"] == tracing.STATUS_CODE_ERROR
+    assert traced["command configure"]["status"]["code"] == tracing.STATUS_CODE_OK
+
+
+def test_export_batches(tmp_path):
+    path = tmp_path / tracing.TRACE_FILE
+    exporter = tracing.FileSpanExporter(path, max_buffered=2)
+    for name in ("a", "b", "c"):
+        exporter.export(tracing.Span(trace_id=TRACE_ID, name=name))
+    assert len(path.read_text().splitlines()) == 1
+    exporter.flush()
+    assert len(path.read_text().splitlines()) == 2